@@ -0,0 +1,126 @@
+"""
+Parallel, batched, resumable deletion of a family account.
+
+    python account_deletion.py <family_id> [--workers 5]
+
+Each child table is paged through with a key-only projection and its rows
+are deleted in batches (25 deletes per request on DynamoDB), all tables at once.
+Finished tables are recorded on the profile (`deleted_tables`), and the
+profile and email index row go last, so an interrupted run can simply be
+started again and picks up where it stopped.
+"""
+import argparse
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Callable, Dict
+
+from family_cache import record_write
+from family_data import EMAIL_INDEX_TABLE, FAMILY_TABLE_KEYS, iter_family_items, normalize_email
+from storage import StorageBackend, get_storage
+
+CHILD_TABLES = [table_name for table_name in FAMILY_TABLE_KEYS if table_name != "FamilyProfiles"]
+
+
+def _mark_deleting(storage, family_id):
+    """Flag the profile and return the tables a previous run already emptied."""
+    profile = storage.update(
+        'FamilyProfiles', {'family_id': family_id},
+        set_values={'account_status': 'DELETING'},
+        must_exist=True
+    )
+    return set(profile.get('deleted_tables', set()))
+
+
+def _mark_table_done(storage, family_id, table_name):
+    storage.update('FamilyProfiles', {'family_id': family_id}, add_values={'deleted_tables': {table_name}})
+
+
+def _delete_table_rows(storage, table_name, family_id, on_deleted):
+    keys = FAMILY_TABLE_KEYS[table_name]
+
+    def deleted_keys():
+        # Only the key attributes are read, so each page holds as many rows as possible
+        for item in iter_family_items(storage, table_name, family_id, attributes=list(keys)):
+            yield {key: item[key] for key in keys}
+            on_deleted(table_name)
+
+    storage.batch_delete(table_name, deleted_keys())
+
+
+def delete_family_account(storage: StorageBackend, family_id: str, workers: int = len(CHILD_TABLES),
+                          progress: Callable[[Dict[str, int], int], None] = None,
+                          poll_seconds: float = 0.25) -> Dict[str, int]:
+    """
+    Delete every row belonging to `family_id`, then its profile and email index row.
+
+    Args:
+        storage: StorageBackend, e.g. storage.get_storage()
+        family_id (str): Family to delete
+        workers (int): Tables deleted concurrently
+        progress: Called on the caller's thread with (rows deleted per table,
+            tables finished) while the deletion runs
+        poll_seconds (float): How often `progress` is called
+
+    Returns:
+        Dict of rows deleted per table in this run
+    """
+    profile = storage.get('FamilyProfiles', {'family_id': family_id})
+    if profile is None:
+        return {}
+
+    already_done = _mark_deleting(storage, family_id)
+    remaining = [table_name for table_name in CHILD_TABLES if table_name not in already_done]
+
+    counts = {table_name: 0 for table_name in CHILD_TABLES}
+    counts_lock = threading.Lock()
+
+    def on_deleted(table_name):
+        with counts_lock:
+            counts[table_name] += 1
+
+    def delete_table(table_name):
+        _delete_table_rows(storage, table_name, family_id, on_deleted)
+        _mark_table_done(storage, family_id, table_name)
+
+    finished = len(already_done & set(CHILD_TABLES))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="account-delete") as pool:
+        # In the caller's context, so request_metrics counts the deletes for the rerun that started them
+        pending = {pool.submit(contextvars.copy_context().run, delete_table, table_name) for table_name in remaining}
+        while pending:
+            done, pending = wait(pending, timeout=poll_seconds, return_when=FIRST_EXCEPTION)
+            for future in done:
+                future.result()  # re-raise; finished tables are already checkpointed
+                finished += 1
+            if progress:
+                with counts_lock:
+                    progress(dict(counts), finished)
+
+    # Profile and login go last so an interrupted deletion can be resumed
+    if profile.get('email'):
+        storage.delete(EMAIL_INDEX_TABLE, {'email': normalize_email(profile['email'])})
+    storage.delete('FamilyProfiles', {'family_id': family_id})
+    counts['FamilyProfiles'] = 1
+    # The profile (and its data version) is gone, so no cached answer is reused either
+    record_write(storage, family_id)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete (or resume deleting) a family account")
+    parser.add_argument('family_id')
+    parser.add_argument('--workers', type=int, default=len(CHILD_TABLES))
+    args = parser.parse_args()
+
+    def print_progress(counts, finished):
+        print(f"  {finished}/{len(CHILD_TABLES)} tables done, {sum(counts.values()):,} rows deleted", end="\r")
+
+    start = time.perf_counter()
+    deleted = delete_family_account(get_storage(), args.family_id, workers=args.workers, progress=print_progress)
+    print()
+    if not deleted:
+        print(f"Family {args.family_id} not found (already deleted?)")
+    for table_name, count in deleted.items():
+        print(f"{table_name}: {count:,} rows")
+    print(f"Finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,121 @@
+"""
+Per-session agents, built on demand and evicted when idle or least recently used.
+
+A Strands agent keeps its conversation in memory and refuses a second
+concurrent invocation, so one module-level MasterAgent shared by every
+session mixes families' histories and makes a session wait on (or fail
+against) another session's turn. Instead each chat session leases its own
+agent from an AgentPool:
+
+    with master_pool.lease(session_key(family_id, session)) as agent:
+        agent(query)
+
+Agents are cheap to build (about a millisecond): the Bedrock models and the
+decorated tools are created once at import and shared by every agent; only
+the conversation is per agent. A lease holds that session's lock only, so
+sessions never block each other, and two turns of one session run one after
+the other. The pool keeps at most AGENT_POOL_MAX_AGENTS agents, dropping the
+least recently used idle one to make room, and drops agents unused for
+AGENT_POOL_IDLE_SECONDS. An evicted session simply starts a new conversation.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable
+
+AGENT_POOL_MAX_AGENTS = int(os.getenv('AGENT_POOL_MAX_AGENTS', '100'))
+AGENT_POOL_IDLE_SECONDS = float(os.getenv('AGENT_POOL_IDLE_SECONDS', '1800'))
+
+
+def session_key(family_id: str, session: str = None) -> str:
+    """Pool key of a chat session; the family is part of it, so agents are never shared across families."""
+    return f"{family_id}:{session}" if session else family_id
+
+
+class _PooledAgent:
+    def __init__(self, agent):
+        self.agent = agent
+        self.lock = threading.Lock()
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class AgentPool:
+    """
+    Agents keyed by session, built by `factory` on first use.
+
+    Args:
+        factory: Builds a new agent (called without arguments)
+        max_agents: Live agents kept; beyond that the least recently used idle one is dropped
+        idle_seconds: Agents unused this long are dropped
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_agents: int = AGENT_POOL_MAX_AGENTS,
+                 idle_seconds: float = AGENT_POOL_IDLE_SECONDS):
+        self.factory = factory
+        self.max_agents = max_agents
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[Hashable, _PooledAgent]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'reused': 0, 'evicted_lru': 0, 'evicted_idle': 0, 'discarded': 0}
+
+    def _evict(self, now):
+        # Callers hold self._lock. Agents in use are never evicted, so the pool
+        # can briefly hold more than max_agents while they all are.
+        for key, entry in list(self._entries.items()):
+            if not entry.leases and now - entry.last_used > self.idle_seconds:
+                del self._entries[key]
+                self._stats['evicted_idle'] += 1
+        for key, entry in list(self._entries.items()):
+            if len(self._entries) < self.max_agents:
+                break
+            if not entry.leases:
+                del self._entries[key]
+                self._stats['evicted_lru'] += 1
+
+    def _checkout(self, key) -> _PooledAgent:
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and not entry.leases and now - entry.last_used > self.idle_seconds:
+                del self._entries[key]
+                self._stats['evicted_idle'] += 1
+                entry = None
+            if entry is None:
+                self._evict(now)
+                # Building takes about a millisecond; doing it under the pool lock keeps one agent per key
+                entry = self._entries[key] = _PooledAgent(self.factory())
+                self._stats['created'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._stats['reused'] += 1
+            entry.leases += 1
+            return entry
+
+    def _checkin(self, entry: _PooledAgent):
+        with self._lock:
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+
+    @contextmanager
+    def lease(self, key: Hashable):
+        """The session's agent for the duration of the block; turns of one session are serialized."""
+        entry = self._checkout(key)
+        try:
+            with entry.lock:
+                yield entry.agent
+        finally:
+            self._checkin(entry)
+
+    def discard(self, key: Hashable):
+        """Drop the session's agent (e.g. on logout); a turn still using it finishes normally."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats['discarded'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'live': len(self._entries), 'in_use': sum(1 for entry in self._entries.values() if entry.leases),
+                    'max_agents': self.max_agents, **self._stats}
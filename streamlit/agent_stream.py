@@ -0,0 +1,72 @@
+"""
+Token streaming from the Strands agents to the chat UI.
+
+The agents are built with forward_stream as their callback_handler. While
+a TokenStream is active in the calling context (streaming_to), every text
+delta a model produces is put on it as (agent name, text), including the
+deltas of sub-agents that MasterAgent runs as tools, which Strands passes up
+as "tool_stream" events. The UI thread iterates the stream while the turn
+runs on another thread; without an active stream the callback does nothing.
+
+The stream also timestamps the first chunk, so time to first token is
+measured from when the turn started, next to its total latency.
+"""
+import contextvars
+import queue
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+_current_stream = contextvars.ContextVar('agent_stream', default=None)
+
+_DONE = object()
+
+
+class TokenStream:
+    """Text chunks of one turn, in the order the agents produced them."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._started = time.perf_counter()
+        self.first_token_ms: Optional[float] = None
+
+    def put(self, source: str, text: str):
+        if self.first_token_ms is None:
+            self.first_token_ms = (time.perf_counter() - self._started) * 1000
+        self._queue.put((source, text))
+
+    def close(self):
+        """No more chunks; ends iteration once the queued ones are read."""
+        self._queue.put(_DONE)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+
+@contextmanager
+def streaming_to(stream: Optional[TokenStream]):
+    """Send agent text produced in this context to `stream` (None mutes it)."""
+    token = _current_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _current_stream.reset(token)
+
+
+def forward_stream(**event):
+    """Strands callback_handler: put text deltas on the active TokenStream."""
+    stream = _current_stream.get()
+    if stream is None:
+        return
+    if event.get('type') == 'tool_stream':
+        # A sub-agent running as a tool: its own callback event, wrapped
+        event = event['tool_stream_event']['data']
+        if not isinstance(event, dict):
+            return
+    text = event.get('data')
+    if isinstance(text, str) and text:
+        stream.put(getattr(event.get('agent'), 'name', None) or 'agent', text)
@@ -0,0 +1,222 @@
+"""
+Answers to repeated finance questions, reused until the family's data changes.
+
+Families ask the same thing again and again (the premium phone plan
+question is in memory_store.json three times), and every time it cost a
+full financial agent run. query_router keeps the financial agent's answers
+here and answers a repeat without running any agent:
+
+    key        the family and the question normalized: lowercased, punctuation
+               and filler words (STOPWORDS) dropped, "$1,200" read as 1200;
+               the numbers in a question must match exactly, so a $100
+               question is never answered with the $200 one's answer
+    similar    a question whose words are at least ANSWER_CACHE_SIMILARITY
+               alike (Jaccard, shared / all) to a cached one of the family is
+               a hit. The default, 1.0, only reuses the same normalized
+               question: below it, questions that differ in one key word
+               ("laptop" / "phone", "buy" / "not buy") match. With an
+               `embed` callable (ANSWER_CACHE_EMBEDDING_MODEL in query_router)
+               questions are compared by embedding instead, at
+               ANSWER_CACHE_EMBEDDING_SIMILARITY (cosine)
+    version    an answer is stored with the family's data version
+               (family_cache.data_version, a counter on the FamilyProfiles
+               row that every write path bumps, in any process) taken
+               before it was computed, and the month; one from an older
+               version or month is stale: dropped, and the question
+               recomputed. A family without a profile (None) is not cached
+    bounds     entries expire after ANSWER_CACHE_TTL_SECONDS and are evicted
+               LRU past ANSWER_CACHE_MAX_ENTRIES
+
+ANSWER_CACHE_TTL_SECONDS=0 turns the cache off.
+"""
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600'))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '256'))
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '1.0'))
+ANSWER_CACHE_EMBEDDING_MODEL = os.getenv('ANSWER_CACHE_EMBEDDING_MODEL', '')
+ANSWER_CACHE_EMBEDDING_SIMILARITY = float(os.getenv('ANSWER_CACHE_EMBEDDING_SIMILARITY', '0.95'))
+
+STOPWORDS = frozenset("""
+    a an the and or but if so to of for in on at by with from about into than then that thats this these those
+    is are was were be been being am do does did doing have has had having will would should shall can could
+    may might must i me my we us our ours you your it its he she they them their there here what which who
+    whom how just please really very also any some more most much per
+""".split())
+_NUMBER_SEPARATOR = re.compile(r'(?<=\d),(?=\d{3})')
+_TERM = re.compile(r'\d+(?:\.\d+)?|[a-z]+')
+
+HIT, MISS, STALE, OFF = "hit", "miss", "stale", "off"
+# Answers that are no answer (two of the phone plan runs in memory_store.json); asking again may work
+UNCACHEABLE_MARKERS = ("This response was filtered for safety",)
+
+
+def normalize(question: str) -> Tuple[FrozenSet[str], Tuple[float, ...]]:
+    """The words (without STOPWORDS) and the numbers, in order, of `question`."""
+    terms = _TERM.findall(_NUMBER_SEPARATOR.sub('', question.lower()))
+    words = frozenset(term for term in terms if term.isalpha() and term not in STOPWORDS)
+    numbers = tuple(float(term) for term in terms if not term.isalpha())
+    return words, numbers
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class _Entry:
+    text: str
+    version: int
+    year_month: str
+    expires_at: float
+    words: FrozenSet[str]
+    numbers: Tuple[float, ...]
+    vector: Optional[List[float]] = None
+
+
+@dataclass(frozen=True)
+class CacheLookup:
+    """What a lookup found: `outcome` is hit, miss, stale (the match was from older data) or off."""
+    outcome: str
+    text: Optional[str] = None
+    similarity: float = 0.0
+
+
+class AnswerCache:
+    """
+    Thread-safe TTL + LRU cache of answers per family, matched by similarity.
+
+    Args:
+        embed: Callable turning a list of texts into vectors, or None to
+            compare questions by their words.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 similarity: float = ANSWER_CACHE_SIMILARITY,
+                 embed: Callable[[Sequence[str]], List[List[float]]] = None,
+                 embedding_similarity: float = ANSWER_CACHE_EMBEDDING_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.embed = embed
+        self.embedding_similarity = embedding_similarity
+        self._entries = OrderedDict()  # (family_id, words, numbers) -> _Entry
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def _vector(self, question: str) -> Optional[List[float]]:
+        if self.embed is None:
+            return None
+        try:
+            return self.embed([question])[0]
+        except Exception:
+            # Embedding is best effort; the words still match
+            return None
+
+    def _score(self, entry: _Entry, words, numbers, vector) -> Optional[float]:
+        """How alike the question is to `entry`, or None when it is not a match."""
+        if entry.numbers != numbers:
+            return None
+        if vector is not None and entry.vector is not None:
+            score, threshold = _cosine(vector, entry.vector), self.embedding_similarity
+        else:
+            score, threshold = _jaccard(words, entry.words), self.similarity
+        return score if score >= threshold else None
+
+    def lookup(self, family_id: str, question: str, version: Optional[int]) -> CacheLookup:
+        """The cached answer to `question`, if one was given at the family's data `version` this month."""
+        if not self.enabled or version is None:
+            return CacheLookup(OFF)
+        words, numbers = normalize(question)
+        with self._lock:
+            known = any(key[0] == family_id for key in self._entries)
+        # Embed outside the lock, and only when there is something to compare with
+        vector = self._vector(question) if known else None
+        now, year_month = time.monotonic(), datetime.now().strftime('%Y-%m')
+        with self._lock:
+            best_key, best_score, stale = None, 0.0, False
+            for key, entry in list(self._entries.items()):
+                if key[0] != family_id:
+                    continue
+                if entry.expires_at <= now:
+                    del self._entries[key]
+                    self.expired += 1
+                    continue
+                score = self._score(entry, words, numbers, vector)
+                if entry.version != version or entry.year_month != year_month:
+                    # Computed before a write (or last month); no question can reuse it
+                    del self._entries[key]
+                    stale = stale or score is not None
+                elif score is not None and (best_key is None or score > best_score):
+                    best_key, best_score = key, score
+            if best_key is None:
+                if stale:
+                    self.stale += 1
+                    return CacheLookup(STALE)
+                self.misses += 1
+                return CacheLookup(MISS)
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return CacheLookup(HIT, text=self._entries[best_key].text, similarity=round(best_score, 3))
+
+    def store(self, family_id: str, question: str, text: str, version: Optional[int]):
+        """
+        Cache `text` as the answer to `question`. `version` is the family's
+        data version from before the answer was computed, so an answer that
+        raced a write is stale at the next lookup.
+        """
+        if not self.enabled or version is None or not text or any(marker in text for marker in UNCACHEABLE_MARKERS):
+            return
+        words, numbers = normalize(question)
+        entry = _Entry(text=text, version=version, year_month=datetime.now().strftime('%Y-%m'),
+                       expires_at=time.monotonic() + self.ttl_seconds, words=words, numbers=numbers,
+                       vector=self._vector(question))
+        key = (family_id, words, numbers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'similarity': self.similarity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
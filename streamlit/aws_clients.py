@@ -0,0 +1,218 @@
+import os
+import threading
+from typing import Any, Dict
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from request_metrics import instrument_bedrock, instrument_dynamodb
+
+# Load environment variables from .env file
+load_dotenv()
+
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+
+# --- Shared AWS clients ---
+# One boto3 session, one DynamoDB resource, one low-level DynamoDB client (for
+# Decimal-free reads, see item_codec.py) and one bedrock-runtime client per
+# process, created on first use. The agents, tools and the Streamlit UI all
+# share these connection pools instead of each module opening its own. The
+# DynamoDB ones report per-request capacity and latency, the bedrock-runtime
+# one its model calls (request_metrics.py).
+
+DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '50'))
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', '20'))
+AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', '5'))
+
+DYNAMODB_CONFIG = Config(
+    max_pool_connections=DYNAMODB_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=10,
+    retries={'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS},
+)
+BEDROCK_CONFIG = Config(
+    max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=5,
+    # Long multi-tool generations stream for a while before finishing
+    read_timeout=120,
+    retries={'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS},
+    user_agent_extra='strands-agents',
+)
+
+_lock = threading.Lock()
+_session = None
+_dynamodb = None
+_dynamodb_client = None
+_bedrock_runtime = None
+_call_stats = {}
+
+
+def get_session() -> boto3.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.Session(
+                aws_access_key_id=AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                region_name=AWS_REGION
+            )
+        return _session
+
+
+def get_dynamodb():
+    """Shared DynamoDB resource, created on first call."""
+    global _dynamodb
+    if _dynamodb is None:
+        session = get_session()
+        with _lock:
+            if _dynamodb is None:
+                dynamodb = session.resource('dynamodb', config=DYNAMODB_CONFIG)
+                _track_calls(dynamodb.meta.client, 'dynamodb')
+                instrument_dynamodb(dynamodb.meta.client)
+                _dynamodb = dynamodb
+    return _dynamodb
+
+
+def get_dynamodb_client():
+    """
+    Shared low-level DynamoDB client, created on first call. Unlike
+    get_dynamodb().meta.client, boto3 doesn't convert its items to Python
+    types, so storage.DynamoDBBackend decodes them itself.
+    """
+    global _dynamodb_client
+    if _dynamodb_client is None:
+        session = get_session()
+        with _lock:
+            if _dynamodb_client is None:
+                client = session.client('dynamodb', config=DYNAMODB_CONFIG)
+                _track_calls(client, 'dynamodb', 'dynamodb-client')
+                instrument_dynamodb(client)
+                _dynamodb_client = client
+    return _dynamodb_client
+
+
+def get_bedrock_runtime():
+    """Shared bedrock-runtime client, created on first call."""
+    global _bedrock_runtime
+    if _bedrock_runtime is None:
+        session = get_session()
+        with _lock:
+            if _bedrock_runtime is None:
+                client = session.client('bedrock-runtime', config=BEDROCK_CONFIG)
+                _track_calls(client, 'bedrock-runtime')
+                instrument_bedrock(client)
+                _bedrock_runtime = client
+    return _bedrock_runtime
+
+
+# --- Prompt caching ---
+# Every model call of an agent starts with the same tool specs and system
+# prompt, and one chat turn makes several calls. With a cache config,
+# BedrockModel puts Bedrock cache points after the tool specs, after the
+# system prompt and at the end of the conversation, so later calls read that
+# prefix from the cache (a tenth of the input price; writing it costs a
+# quarter more) instead of paying for it again. Bedrock only caches a prefix
+# of at least 1,024 tokens on Claude 3.7 Sonnet; a shorter one is simply not
+# cached. The tokens each call read from and wrote to the cache are recorded
+# by request_metrics.model_usage_hooks.
+BEDROCK_PROMPT_CACHE = os.getenv('BEDROCK_PROMPT_CACHE', 'on') != 'off'
+
+
+def prompt_cache_config():
+    """The cache_config for an agent's BedrockModel; None when BEDROCK_PROMPT_CACHE=off."""
+    if not BEDROCK_PROMPT_CACHE:
+        return None
+    from strands.models import CacheConfig
+
+    return CacheConfig(strategy="auto", tools_ttl=True)
+
+
+class _SharedClientSession:
+    """The shared session, except that client('bedrock-runtime') returns the shared client."""
+
+    def __init__(self, session: boto3.Session):
+        self._session = session
+
+    def client(self, service_name, *args, **kwargs):
+        if service_name == 'bedrock-runtime':
+            return get_bedrock_runtime()
+        return self._session.client(service_name, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def create_bedrock_model(**model_config):
+    """
+    BedrockModel that sends its requests through the shared bedrock-runtime
+    client, so every agent reuses one connection pool. BedrockModel takes a
+    session, not a client, and creates its client from it; the session it is
+    given hands out the shared one, so no client is created per model.
+    """
+    from strands.models import BedrockModel
+
+    return BedrockModel(boto_session=_SharedClientSession(get_session()), **model_config)
+
+
+def _track_calls(client, service, label=None):
+    stats = {'requests': 0, 'errors': 0, 'in_flight': 0, 'peak_in_flight': 0}
+    stats_lock = threading.Lock()
+    _call_stats[label or service] = (stats, stats_lock)
+
+    def started(**kwargs):
+        with stats_lock:
+            stats['requests'] += 1
+            stats['in_flight'] += 1
+            stats['peak_in_flight'] = max(stats['peak_in_flight'], stats['in_flight'])
+
+    def finished(**kwargs):
+        with stats_lock:
+            stats['in_flight'] -= 1
+
+    def failed(**kwargs):
+        with stats_lock:
+            stats['in_flight'] -= 1
+            stats['errors'] += 1
+
+    client.meta.events.register(f'before-call.{service}', started)
+    client.meta.events.register(f'after-call.{service}', finished)
+    client.meta.events.register(f'after-call-error.{service}', failed)
+
+
+def _pool_usage(client) -> Dict[str, int]:
+    """Connection counts from the client's urllib3 pools (0s if unavailable)."""
+    try:
+        manager = client._endpoint.http_session._manager
+        pools = [manager.pools[key] for key in manager.pools.keys()]
+    except (AttributeError, KeyError):
+        return {'hosts': 0, 'connections_opened': 0, 'idle_connections': 0}
+    return {
+        'hosts': len(pools),
+        'connections_opened': sum(pool.num_connections for pool in pools),
+        'idle_connections': sum(pool.pool.qsize() for pool in pools if pool.pool is not None),
+    }
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Request and connection pool usage for each shared client created so far."""
+    clients = {}
+    if _dynamodb is not None:
+        clients['dynamodb'] = _dynamodb.meta.client
+    if _dynamodb_client is not None:
+        clients['dynamodb-client'] = _dynamodb_client
+    if _bedrock_runtime is not None:
+        clients['bedrock-runtime'] = _bedrock_runtime
+
+    stats = {}
+    for service, client in clients.items():
+        counters, counters_lock = _call_stats[service]
+        with counters_lock:
+            stats[service] = dict(counters)
+        stats[service]['max_pool_connections'] = client.meta.config.max_pool_connections
+        stats[service].update(_pool_usage(client))
+    return stats
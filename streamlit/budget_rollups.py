@@ -0,0 +1,366 @@
+"""
+Per-family, per-month budget rollups maintained on write.
+
+    python budget_rollups.py [family_id ...] [--workers 8] [--create-table]
+
+BudgetRollups holds one item per (family_id, year_month) with the month's
+budget totals (total_allocated / total_spent / total_remaining), the same
+amounts per category ("allocated#Food", ...) and the month's expense total,
+so Reports and the overview tool read a month with a single get instead of
+summing every BudgetAllocations row.
+
+Budget and expense saves go through this module and only ever ADD to the
+amounts, so saves from several family members at once never overwrite each
+other's numbers (no read-modify-write):
+
+    save_expense   one transaction: the ExpenseTransactions item (written
+                   once; a repeat raises ConditionFailedError), ADD to its
+                   BudgetAllocations row's spent/remaining and ADD to the
+                   month's rollup
+    save_budget    one transaction: SET the allocation, ADD the change in
+                   allocated to remaining and to the rollup, conditional on
+                   the allocation read just before; a concurrent save of the
+                   same row makes it re-read and retry. Spend recorded by
+                   expenses is kept
+
+The first ADD of a month creates its rollup, and an expense in a category
+without a budget creates the row with allocated_amount 0. A month without a
+rollup item is read by summing its rows. Every save keeps
+remaining_amount = allocated_amount - spent_amount. The rebuild job (this
+module's CLI, no family ids = every family) recomputes rollups from the raw
+tables in parallel; it also writes that remaining back to any budget row
+where it is off (rows saved before budget saves were one transaction).
+Run it once with --create-table before deploying, so months written before
+rollups existed are filled in.
+
+Parallel save benchmark and consistency check: python debug/bench_budget_spend.py
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from family_cache import record_write
+from storage import (
+    ConditionFailedError, StorageBackend, TransactPut, TransactUpdate, decimal_to_float, get_storage,
+    to_storage_types
+)
+
+ROLLUP_TABLE = 'BudgetRollups'
+BUDGET_TABLE = 'BudgetAllocations'
+EXPENSE_TABLE = 'ExpenseTransactions'
+
+# BudgetAllocations attribute -> (month total, per-category attribute prefix)
+BUDGET_AMOUNTS = {
+    'allocated_amount': ('total_allocated', 'allocated'),
+    'spent_amount': ('total_spent', 'spent'),
+    'remaining_amount': ('total_remaining', 'remaining'),
+}
+BUDGET_ATTRIBUTES = ('category', 'category_month', 'year_month', *BUDGET_AMOUNTS)
+# Tries of a budget save whose row another save changed in between
+BUDGET_SAVE_ATTEMPTS = 8
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _month_of(budget_row):
+    return budget_row.get('year_month') or budget_row['category_month'].rsplit('#', 1)[-1]
+
+
+def _budget_amounts(budget_row) -> Dict[str, Decimal]:
+    """Rollup attributes one BudgetAllocations row adds to (none for a missing row)."""
+    if not budget_row:
+        return {}
+    category = budget_row.get('category', 'Unknown')
+    amounts = {}
+    for field, (total, prefix) in BUDGET_AMOUNTS.items():
+        value = to_storage_types(budget_row.get(field, 0))
+        amounts[total] = value
+        # Top-level attributes rather than a map, so ADD can update them in place
+        amounts[f"{prefix}#{category}"] = value
+    return amounts
+
+
+def _empty_rollup(family_id, year_month):
+    return {
+        'family_id': family_id,
+        'year_month': year_month,
+        'total_allocated': Decimal(0),
+        'total_spent': Decimal(0),
+        'total_remaining': Decimal(0),
+        'expense_total': Decimal(0),
+        'expense_count': Decimal(0),
+        'updated_at': _now(),
+    }
+
+
+def _build_rollups(family_id, budget_rows, expense_rows) -> Dict[str, Dict[str, Any]]:
+    """Rollup items by month, summed from raw rows (Decimal arithmetic, like ADD)."""
+    rollups = {}
+    for row in budget_rows:
+        year_month = _month_of(row)
+        rollup = rollups.setdefault(year_month, _empty_rollup(family_id, year_month))
+        for name, value in _budget_amounts(row).items():
+            rollup[name] = rollup.get(name, Decimal(0)) + value
+    for row in expense_rows:
+        year_month = row['transaction_date_id'][:7]
+        rollup = rollups.setdefault(year_month, _empty_rollup(family_id, year_month))
+        rollup['expense_total'] += to_storage_types(row.get('amount', 0))
+        rollup['expense_count'] += 1
+    return rollups
+
+
+def _repair_remaining(storage, family_id, budget_rows):
+    """
+    The rows with remaining_amount = allocated_amount - spent_amount, writing
+    that back to any row where it is off. The write is conditional on the
+    amounts read; a row a save changed meanwhile is left for the next rebuild.
+    """
+    repaired = []
+    for row in budget_rows:
+        amounts = {name: row.get(name) for name in BUDGET_AMOUNTS}
+        remaining = (amounts['allocated_amount'] or Decimal(0)) - (amounts['spent_amount'] or Decimal(0))
+        if amounts['remaining_amount'] != remaining:
+            key = {'family_id': family_id, 'category_month': row['category_month']}
+            try:
+                storage.transact_write([TransactUpdate(BUDGET_TABLE, key, set_values={'remaining_amount': remaining},
+                                                       expected=amounts)])
+            except ConditionFailedError:
+                pass
+            row = {**row, 'remaining_amount': remaining}
+        repaired.append(row)
+    return repaired
+
+
+def _compute_rollups(storage, family_id, months=None, repair=False):
+    """
+    Rollups recomputed from BudgetAllocations and ExpenseTransactions; all
+    months, or just `months`. With `repair`, budget rows whose remaining is
+    off are corrected too (see _repair_remaining).
+    """
+    budget_rows = storage.query(BUDGET_TABLE, family_id, attributes=BUDGET_ATTRIBUTES)
+    if months is not None:
+        months = set(months)
+        # Budget sort keys start with the category, so the month can only be filtered here
+        budget_rows = (row for row in budget_rows if _month_of(row) in months)
+    if repair:
+        # Read in full before writing any row back
+        budget_rows = _repair_remaining(storage, family_id, list(budget_rows))
+    expense_attributes = ('transaction_date_id', 'amount')
+    if months is None:
+        expense_rows = storage.query(EXPENSE_TABLE, family_id, attributes=expense_attributes)
+        return _build_rollups(family_id, budget_rows, expense_rows)
+
+    # Transactions sort by date, so each month is its own range query
+    expense_rows = chain.from_iterable(
+        storage.query(EXPENSE_TABLE, family_id, begins_with=year_month, attributes=expense_attributes)
+        for year_month in sorted(months)
+    )
+    rollups = _build_rollups(family_id, budget_rows, expense_rows)
+    return {year_month: rollups.get(year_month) or _empty_rollup(family_id, year_month) for year_month in months}
+
+
+# --- Write path ---
+
+def _budget_key(family_id, category, year_month):
+    return {'family_id': family_id, 'category_month': f"{category}#{year_month}"}
+
+
+def _rollup_update(family_id, year_month, category, allocated, spent, extra=None):
+    """Rollup ADDs for a change in one category's allocated and spent amounts (remaining follows)."""
+    deltas = {}
+    for (total, prefix), value in zip(BUDGET_AMOUNTS.values(), (allocated, spent, allocated - spent)):
+        deltas[total] = value
+        deltas[f"{prefix}#{category}"] = value
+    # ADD creates the rollup if this is the month's first write
+    return TransactUpdate(ROLLUP_TABLE, {'family_id': family_id, 'year_month': year_month},
+                          set_values={'updated_at': _now()}, add_values={**deltas, **(extra or {})})
+
+
+def expense_writes(item: Dict[str, Any]) -> List[Any]:
+    """The all-or-nothing writes that record one ExpenseTransactions item."""
+    family_id = item['family_id']
+    category = item.get('category', 'Unknown')
+    year_month = item['transaction_date_id'][:7]
+    amount = to_storage_types(item['amount'])
+    return [
+        # The condition makes a retried save fail instead of counting the amount twice
+        TransactPut(EXPENSE_TABLE, item, if_not_exists=True),
+        # Adding 0 to allocated_amount gives an unbudgeted category's new row an allocation of 0
+        TransactUpdate(BUDGET_TABLE, _budget_key(family_id, category, year_month),
+                       set_values={'category': category, 'year_month': year_month},
+                       add_values={'allocated_amount': Decimal(0), 'spent_amount': amount,
+                                   'remaining_amount': -amount}),
+        _rollup_update(family_id, year_month, category, Decimal(0), amount,
+                       extra={'expense_total': amount, 'expense_count': Decimal(1)}),
+    ]
+
+
+def save_expense(storage: StorageBackend, item: Dict[str, Any]):
+    """
+    Write an ExpenseTransactions item and add its amount to the category's
+    budget row and the month's rollup, in one transaction.
+
+    Raises:
+        ConditionFailedError: The transaction id is already taken; nothing was written
+    """
+    storage.transact_write(expense_writes(item))
+
+
+def save_budget(storage: StorageBackend, family_id: str, category: str, year_month: str,
+                allocated_amount, untracked_spent=0):
+    """
+    Set a category's allocation for the month, keeping the spend its expenses recorded.
+
+    Args:
+        untracked_spent: Spending not entered as expenses, added to spent_amount
+    """
+    key = _budget_key(family_id, category, year_month)
+    allocated = to_storage_types(allocated_amount)
+    untracked = to_storage_types(untracked_spent)
+    for attempt in range(BUDGET_SAVE_ATTEMPTS):
+        old = storage.get(BUDGET_TABLE, key, attributes=('allocated_amount',))
+        previous = (old or {}).get('allocated_amount')
+        change = allocated - (previous or Decimal(0))
+        try:
+            # Applies only if the allocation is still the one read, so the change ADDed is exact
+            storage.transact_write([
+                TransactUpdate(BUDGET_TABLE, key,
+                               set_values={'category': category, 'year_month': year_month,
+                                           'allocated_amount': allocated},
+                               add_values={'spent_amount': untracked, 'remaining_amount': change - untracked},
+                               expected={'allocated_amount': previous}),
+                _rollup_update(family_id, year_month, category, change, untracked),
+            ])
+            return
+        except ConditionFailedError:
+            if attempt == BUDGET_SAVE_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def add_imported_spend(storage: StorageBackend, items: Iterable[Dict[str, Any]]):
+    """
+    Add bulk-imported ExpenseTransactions items to their budget rows, one ADD
+    per category and month. Pass only items that did not exist before the
+    import; rollups of the touched months are rebuilt by the caller.
+    """
+    totals = {}
+    for item in items:
+        group = (item['family_id'], item.get('category', 'Unknown'), item['transaction_date_id'][:7])
+        totals[group] = totals.get(group, Decimal(0)) + to_storage_types(item['amount'])
+    for (family_id, category, year_month), amount in totals.items():
+        storage.update(BUDGET_TABLE, _budget_key(family_id, category, year_month),
+                       set_values={'category': category, 'year_month': year_month},
+                       add_values={'allocated_amount': Decimal(0), 'spent_amount': amount,
+                                   'remaining_amount': -amount})
+
+
+# --- Read path ---
+
+def read_rollup(storage: StorageBackend, family_id: str, year_month: str) -> Dict[str, Any]:
+    """
+    The month's rollup with float numbers. A month without one (written
+    before rollups existed and not rebuilt yet, or with no rows) is summed
+    from its rows instead, so it never reads as zeros.
+    """
+    rollup = storage.get(ROLLUP_TABLE, {'family_id': family_id, 'year_month': year_month}, numbers=float)
+    if rollup is not None:
+        return rollup
+    return decimal_to_float(_compute_rollups(storage, family_id, [year_month])[year_month])
+
+
+def rollup_categories(rollup: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-category amounts of a rollup as budget-row-shaped dicts, sorted by category."""
+    categories = {}
+    for name, value in rollup.items():
+        prefix, separator, category = name.partition('#')
+        if separator and prefix in ('allocated', 'spent', 'remaining'):
+            categories.setdefault(category, {'category': category})[f"{prefix}_amount"] = value
+    return [categories[category] for category in sorted(categories)]
+
+
+# --- Rebuild job ---
+
+def rebuild_family_rollups(storage: StorageBackend, family_id: str, months: Iterable[str] = None) -> int:
+    """
+    Recompute a family's rollups from the raw tables and overwrite them,
+    first correcting the remaining_amount of budget rows where it is off.
+
+    Args:
+        months: Only these YYYY-MM months; default every month with rows,
+            deleting rollups of months that no longer have any
+
+    Returns:
+        Number of rollups written
+    """
+    rollups = _compute_rollups(storage, family_id, months, repair=True)
+    if months is None:
+        stale = [
+            {'family_id': family_id, 'year_month': item['year_month']}
+            for item in storage.query(ROLLUP_TABLE, family_id, attributes=('year_month',))
+            if item['year_month'] not in rollups
+        ]
+        storage.batch_delete(ROLLUP_TABLE, stale)
+    written = storage.batch_put(ROLLUP_TABLE, rollups.values())
+    # Repaired rows change what the family's answers were computed from
+    record_write(storage, family_id, BUDGET_TABLE)
+    return written
+
+
+def rebuild_rollups(storage: StorageBackend, family_ids: Sequence[str] = None, workers: int = 8) -> Dict[str, int]:
+    """
+    Rebuild every month of the given families (default: all of FamilyProfiles), `workers` families at a time.
+
+    Returns:
+        Dict of rollups written per family
+    """
+    if family_ids is None:
+        family_ids = [item['family_id'] for item in storage.scan('FamilyProfiles', attributes=('family_id',))]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="rollup-rebuild") as pool:
+        return dict(zip(family_ids, pool.map(lambda family_id: rebuild_family_rollups(storage, family_id),
+                                             family_ids)))
+
+
+def create_rollup_table(dynamodb):
+    existing_tables = dynamodb.meta.client.list_tables()['TableNames']
+    if ROLLUP_TABLE in existing_tables:
+        print(f"Table '{ROLLUP_TABLE}' already exists.")
+        return
+    table = dynamodb.create_table(
+        TableName=ROLLUP_TABLE,
+        KeySchema=[
+            {'AttributeName': 'family_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'year_month', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'family_id', 'AttributeType': 'S'},
+            {'AttributeName': 'year_month', 'AttributeType': 'S'},
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    table.wait_until_exists()
+    print(f"Table '{ROLLUP_TABLE}' created.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild monthly budget rollups from the raw tables")
+    parser.add_argument('family_ids', nargs='*', help="Families to rebuild (default: every family)")
+    parser.add_argument('--workers', type=int, default=8, help="Families rebuilt concurrently")
+    parser.add_argument('--create-table', action='store_true', help=f"Create the DynamoDB {ROLLUP_TABLE} table if missing")
+    args = parser.parse_args()
+
+    if args.create_table:
+        from aws_clients import get_dynamodb
+        create_rollup_table(get_dynamodb())
+
+    start = time.perf_counter()
+    written = rebuild_rollups(get_storage(), args.family_ids or None, workers=args.workers)
+    print(f"Rebuilt {sum(written.values()):,} monthly rollups for {len(written):,} families "
+          f"in {time.perf_counter() - start:.1f}s")
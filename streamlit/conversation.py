@@ -0,0 +1,298 @@
+"""
+Bounded conversation history for the agents.
+
+Strands' default conversation manager keeps the last 40 messages verbatim,
+so a chat's prompt grows with every turn until the window is full, and
+MasterAgent re-sends each finance analysis twice per turn (the sub-agent's
+tool result and its own reply, which repeats it). BoundedConversationManager
+keeps the input of every model call flat instead:
+
+    keep_turns    the last K turns stay verbatim (a turn is a user message and
+                  everything up to the next one, tool calls included)
+    summary       older turns are folded, a few at a time, into a running
+                  summary held in the first user/assistant pair of messages;
+                  the summary is extended with each folded turn, never rebuilt
+    compaction    once a turn is over, its tool results are cut to a short
+                  excerpt (the reply that follows them carries the answer)
+    token_budget  before every model call, history above the budget is
+                  reduced: compact, fold, shorten the summary, and as a last
+                  resort truncate the longest blocks of the current turn
+
+Tokens are estimated at CHARS_PER_TOKEN characters per token over the
+message text, tool inputs and tool results; the system prompt and tool
+specs are not part of the budget. The default summarizer is extractive (no
+model call); model_summarizer() updates the summary with a small model
+instead (CONVERSATION_SUMMARY_MODEL).
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from strands.agent.conversation_manager import ConversationManager
+from strands.hooks import BeforeModelCallEvent
+
+logger = logging.getLogger(__name__)
+
+CONVERSATION_KEEP_TURNS = int(os.getenv('CONVERSATION_KEEP_TURNS', '4'))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '8000'))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv('CONVERSATION_SUMMARY_TOKENS', '800'))
+CONVERSATION_SUMMARY_MODEL = os.getenv('CONVERSATION_SUMMARY_MODEL', '')
+
+CHARS_PER_TOKEN = 4
+SUMMARY_HEADER = "Summary of our earlier conversation:"
+SUMMARY_ACK = "Understood, I'll keep that context in mind."
+# What a finished turn's tool result is cut to, and the shortest a truncated block gets
+TOOL_RESULT_EXCERPT_CHARS = 300
+COMPACTED_NOTE = " [shortened; see the reply that followed]"
+TRUNCATED_NOTE = " … [truncated to fit the context budget]"
+MIN_BLOCK_CHARS = 400
+
+Turn = List[Dict[str, Any]]
+
+
+# --- Token estimates ---
+
+def _block_chars(block: Dict[str, Any]) -> int:
+    if 'text' in block:
+        return len(block['text'])
+    if 'toolUse' in block:
+        return len(json.dumps(block['toolUse'].get('input', {}), default=str)) + len(block['toolUse'].get('name', ''))
+    if 'toolResult' in block:
+        return sum(_block_chars(part) for part in block['toolResult'].get('content', []))
+    if 'json' in block:
+        return len(json.dumps(block['json'], default=str))
+    return 0
+
+
+def _chars(messages) -> int:
+    return sum(_block_chars(block) for message in messages for block in message['content'])
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough token count of `messages` (text, tool inputs and tool results)."""
+    return _chars(messages) // CHARS_PER_TOKEN
+
+
+# --- Turns ---
+
+def _is_turn_start(message) -> bool:
+    return message['role'] == 'user' and not any('toolResult' in block for block in message['content'])
+
+
+def _has_summary(messages) -> bool:
+    return bool(messages) and messages[0]['content'][0].get('text', '').startswith(SUMMARY_HEADER)
+
+
+def _split(messages):
+    """(summary text or None, turns): the summary pair, then the history cut at each user prompt."""
+    summary = None
+    if _has_summary(messages):
+        summary = messages[0]['content'][0]['text'][len(SUMMARY_HEADER):].strip()
+        messages = messages[2:]
+    turns = []
+    for message in messages:
+        if _is_turn_start(message) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return summary, turns
+
+
+def _join(summary, turns):
+    messages = []
+    if summary:
+        messages.append({'role': 'user', 'content': [{'text': f"{SUMMARY_HEADER}\n{summary}"}]})
+        messages.append({'role': 'assistant', 'content': [{'text': SUMMARY_ACK}]})
+    for turn in turns:
+        messages.extend(turn)
+    return messages
+
+
+def _turn_text(turn: Turn, role: str) -> str:
+    return " ".join(
+        block['text'] for message in turn if message['role'] == role
+        for block in message['content'] if 'text' in block
+    ).strip()
+
+
+def _excerpt(text: str, chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= chars else text[:chars].rstrip() + " …"
+
+
+# --- Summarizers ---
+# A summarizer takes the current summary (or "") and the turns being folded,
+# oldest first, and returns the new summary.
+
+def extractive_summarizer(max_tokens: int = CONVERSATION_SUMMARY_TOKENS) -> Callable[[str, List[Turn]], str]:
+    """One line per folded turn (the question and the start of the answer); oldest lines drop off past max_tokens."""
+    def summarize(summary: str, turns: List[Turn]) -> str:
+        lines = summary.splitlines() if summary else []
+        for turn in turns:
+            question = _turn_text(turn, 'user').split("Query:", 1)[-1]
+            lines.append(f"- User: {_excerpt(question, 200)} | Answer: {_excerpt(_turn_text(turn, 'assistant'), 300)}")
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_tokens * CHARS_PER_TOKEN:
+            lines.pop(0)
+        return "\n".join(lines)
+    return summarize
+
+
+def model_summarizer(model, max_tokens: int = CONVERSATION_SUMMARY_TOKENS) -> Callable[[str, List[Turn]], str]:
+    """Have `model` (a small one) extend the summary with the folded turns; extractive if that fails."""
+    fallback = extractive_summarizer(max_tokens)
+
+    def summarize(summary: str, turns: List[Turn]) -> str:
+        from strands import Agent
+
+        transcript = "\n\n".join(
+            f"User: {_excerpt(_turn_text(turn, 'user'), 1500)}\nAssistant: {_excerpt(_turn_text(turn, 'assistant'), 3000)}"
+            for turn in turns
+        )
+        prompt = (f"Current summary:\n{summary or '(none)'}\n\nNew exchanges:\n{transcript}\n\n"
+                  f"Return the updated summary in at most {max_tokens * 3 // 4} words. Keep amounts, decisions, "
+                  f"goals and the user's stress level; drop pleasantries.")
+        try:
+            agent = Agent(model=model, callback_handler=None,
+                          system_prompt="You maintain a running summary of a household finance chat.")
+            return str(agent(prompt)).strip()
+        except Exception as e:
+            logger.warning("summary model failed, falling back to extractive: %s", e)
+            return fallback(summary, turns)
+    return summarize
+
+
+def default_summarizer():
+    if CONVERSATION_SUMMARY_MODEL:
+        from aws_clients import create_bedrock_model
+
+        return model_summarizer(create_bedrock_model(model_id=CONVERSATION_SUMMARY_MODEL))
+    return extractive_summarizer()
+
+
+# --- Conversation manager ---
+
+class BoundedConversationManager(ConversationManager):
+    """
+    Last `keep_turns` turns verbatim, older ones in a running summary, and
+    at most `token_budget` estimated tokens of history per model call.
+
+    Args:
+        keep_turns: Turns kept verbatim after each invocation
+        token_budget: Hard cap on the history sent with any model call
+        fold_turns: Turns folded into the summary at once, so the summary
+            changes every few turns rather than every turn
+        summarizer: See "Summarizers"; default_summarizer() if None
+    """
+
+    def __init__(self, keep_turns: int = CONVERSATION_KEEP_TURNS, token_budget: int = CONVERSATION_TOKEN_BUDGET,
+                 fold_turns: int = 2, summarizer: Callable[[str, List[Turn]], str] = None):
+        super().__init__()
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.fold_turns = fold_turns
+        self.summarizer = summarizer or default_summarizer()
+        self.stats = {'folded_turns': 0, 'compacted_results': 0, 'truncated_blocks': 0, 'over_budget_calls': 0}
+
+    def register_hooks(self, registry, **kwargs):
+        super().register_hooks(registry, **kwargs)
+        registry.add_callback(BeforeModelCallEvent, self._before_model_call)
+
+    # Strands calls this after every invocation
+    def apply_management(self, agent, **kwargs):
+        summary, turns = _split(agent.messages)
+        self._compact(turns, finished=len(turns))
+        if len(turns) > self.keep_turns + self.fold_turns - 1:
+            summary, turns = self._fold(summary, turns, len(turns) - self.keep_turns)
+        agent.messages[:] = _join(summary, turns)
+        self._enforce_budget(agent, in_progress=False)
+
+    # Strands calls this on a context window overflow (with e), when the budget
+    # above was not enough; fold one more turn, or halve the last one
+    def reduce_context(self, agent, e: Optional[Exception] = None, **kwargs):
+        summary, turns = _split(agent.messages)
+        before = estimate_tokens(agent.messages)
+        if len(turns) > 1:
+            summary, turns = self._fold(summary, turns, 1)
+            agent.messages[:] = _join(summary, turns)
+        else:
+            self._truncate(turns, estimate_tokens(agent.messages) // 2)
+            agent.messages[:] = _join(summary, turns)
+        if e is not None and estimate_tokens(agent.messages) >= before:
+            raise e
+
+    def _before_model_call(self, event: BeforeModelCallEvent):
+        self._enforce_budget(event.agent, in_progress=True)
+
+    def _enforce_budget(self, agent, in_progress: bool):
+        if estimate_tokens(agent.messages) <= self.token_budget:
+            return
+        self.stats['over_budget_calls'] += 1
+        summary, turns = _split(agent.messages)
+        # The last turn is the one being answered while in progress; the others are over
+        finished = len(turns) - 1 if in_progress else len(turns)
+
+        def over():
+            return estimate_tokens(_join(summary, turns)) > self.token_budget
+
+        self._compact(turns, finished)
+        while over() and len(turns) > 1:
+            summary, turns = self._fold(summary, turns, 1)
+        while over() and summary and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        if over():
+            self._truncate(turns, self.token_budget - estimate_tokens(_join(summary, [])))
+        agent.messages[:] = _join(summary, turns)
+        if over():
+            logger.warning("conversation over its %d token budget after reduction (%d)", self.token_budget,
+                           estimate_tokens(agent.messages))
+
+    def _fold(self, summary, turns, count):
+        folded, turns = turns[:count], turns[count:]
+        summary = self.summarizer(summary or "", folded)
+        self.stats['folded_turns'] += len(folded)
+        self.removed_message_count += sum(len(turn) for turn in folded)
+        return summary, turns
+
+    def _compact(self, turns, finished):
+        """Cut the tool results of the first `finished` turns to an excerpt."""
+        for turn in turns[:finished]:
+            for message in turn:
+                for block in message['content']:
+                    result = block.get('toolResult')
+                    if result is None:
+                        continue
+                    text = " ".join(part['text'] if 'text' in part else json.dumps(part.get('json'), default=str)
+                                    for part in result.get('content', []))
+                    if len(text) > TOOL_RESULT_EXCERPT_CHARS and not text.endswith(COMPACTED_NOTE):
+                        block['toolResult'] = {
+                            'toolUseId': result['toolUseId'], 'status': result.get('status', 'success'),
+                            'content': [{'text': _excerpt(text, TOOL_RESULT_EXCERPT_CHARS) + COMPACTED_NOTE}],
+                        }
+                        self.stats['compacted_results'] += 1
+
+    def _truncate(self, turns, budget_tokens):
+        """Shorten the longest text and tool-result blocks until the turns fit `budget_tokens`."""
+        blocks = []
+        for turn in turns:
+            for message in turn:
+                for block in message['content']:
+                    if 'text' in block:
+                        blocks.append((block, 'text'))
+                    elif 'toolResult' in block:
+                        for part in block['toolResult'].get('content', []):
+                            if 'text' in part:
+                                blocks.append((part, 'text'))
+        blocks.sort(key=lambda entry: -len(entry[0][entry[1]]))
+        for block, key in blocks:
+            excess = _chars(_join(None, turns)) - budget_tokens * CHARS_PER_TOKEN
+            if excess <= 0:
+                break
+            keep = max(MIN_BLOCK_CHARS, len(block[key]) - excess - len(TRUNCATED_NOTE))
+            if keep < len(block[key]) - len(TRUNCATED_NOTE):
+                block[key] = block[key][:keep] + TRUNCATED_NOTE
+                self.stats['truncated_blocks'] += 1
+
+
+def new_conversation_manager(**kwargs) -> BoundedConversationManager:
+    """The conversation manager every agent gets; one per agent, since it works on that agent's history."""
+    return BoundedConversationManager(**kwargs)
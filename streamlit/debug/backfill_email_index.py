@@ -0,0 +1,108 @@
+"""
+Backfill FamilyEmailIndex from existing FamilyProfiles.
+
+    python debug/backfill_email_index.py [--segments 4] [--create-table] [--dry-run]
+
+Scans FamilyProfiles in parallel segments (projecting only family_id and
+email), following every page, and batch-writes email -> family_id rows.
+Rows are upserted, so re-running is safe; an email used by two different
+families is reported and only the first family seen is indexed.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_clients import get_dynamodb
+from family_data import EMAIL_INDEX_TABLE, normalize_email
+
+
+def create_email_index_table(dynamodb):
+    existing_tables = dynamodb.meta.client.list_tables()['TableNames']
+    if EMAIL_INDEX_TABLE in existing_tables:
+        print(f"Table '{EMAIL_INDEX_TABLE}' already exists.")
+        return
+    table = dynamodb.create_table(
+        TableName=EMAIL_INDEX_TABLE,
+        KeySchema=[{'AttributeName': 'email', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'email', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    table.wait_until_exists()
+    print(f"Table '{EMAIL_INDEX_TABLE}' created.")
+
+
+def scan_segment(dynamodb, segment, total_segments):
+    """Return (email, family_id) pairs from one parallel-scan segment."""
+    table = dynamodb.Table('FamilyProfiles')
+    scan_kwargs = {
+        'ProjectionExpression': 'family_id, email',
+        'Segment': segment,
+        'TotalSegments': total_segments,
+    }
+    pairs = []
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if item.get('email'):
+                pairs.append((normalize_email(item['email']), item['family_id']))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return pairs
+        scan_kwargs['ExclusiveStartKey'] = last_key
+
+
+def backfill_email_index(dynamodb, segments=4, dry_run=False):
+    """Fill FamilyEmailIndex from FamilyProfiles and return a summary dict."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        results = pool.map(lambda segment: scan_segment(dynamodb, segment, segments), range(segments))
+        pairs = [pair for segment_pairs in results for pair in segment_pairs]
+
+    mapping = {}
+    conflicts = []
+    for email, family_id in pairs:
+        if email in mapping and mapping[email] != family_id:
+            conflicts.append((email, mapping[email], family_id))
+            continue
+        mapping[email] = family_id
+
+    written = 0
+    if not dry_run:
+        index_table = dynamodb.Table(EMAIL_INDEX_TABLE)
+        with index_table.batch_writer(overwrite_by_pkeys=['email']) as batch:
+            for email, family_id in mapping.items():
+                batch.put_item(Item={'email': email, 'family_id': family_id})
+                written += 1
+
+    return {
+        'profiles_scanned': len(pairs),
+        'emails_indexed': written,
+        'conflicts': conflicts,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the FamilyEmailIndex login table")
+    parser.add_argument('--segments', type=int, default=4, help="Parallel scan segments")
+    parser.add_argument('--create-table', action='store_true', help=f"Create {EMAIL_INDEX_TABLE} if missing")
+    parser.add_argument('--dry-run', action='store_true', help="Scan and report without writing")
+    args = parser.parse_args()
+
+    dynamodb = get_dynamodb()
+    if args.create_table:
+        create_email_index_table(dynamodb)
+
+    summary = backfill_email_index(dynamodb, segments=args.segments, dry_run=args.dry_run)
+    print(f"Scanned {summary['profiles_scanned']} profiles, "
+          f"indexed {summary['emails_indexed']} emails in {summary['seconds']:.1f}s")
+    for email, kept, skipped in summary['conflicts']:
+        print(f"Conflict: {email} is used by {kept} and {skipped}; kept {kept}")
+
+
+if __name__ == "__main__":
+    main()
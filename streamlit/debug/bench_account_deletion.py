@@ -0,0 +1,66 @@
+"""
+Benchmark: account deletion cost in DynamoDB calls and wall-clock time.
+
+    python debug/bench_account_deletion.py [rows_per_table] [latency_ms]
+
+Seeds one family with `rows_per_table` rows in every child table, deletes it
+with account_deletion.delete_family_account and counts the calls made per
+operation, which should be about rows / 25 BatchWriteItem requests.
+"""
+import sys
+import time
+from collections import Counter
+from decimal import Decimal
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from account_deletion import CHILD_TABLES, delete_family_account
+from family_data import FAMILY_TABLE_KEYS
+
+FAMILY_ID = "FAMBENCH"
+
+
+def seed(dynamodb, rows_per_table):
+    dynamodb.Table('FamilyProfiles').put_item(Item={'family_id': FAMILY_ID, 'email': 'bench@example.com'})
+    for table_name in CHILD_TABLES:
+        sort_key = FAMILY_TABLE_KEYS[table_name][1]
+        with dynamodb.Table(table_name).batch_writer() as batch:
+            for i in range(rows_per_table):
+                batch.put_item(Item={'family_id': FAMILY_ID, sort_key: f"{i:08d}",
+                                     'amount': Decimal('12.50'), 'note': 'x' * 200})
+
+
+def main():
+    rows_per_table = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with local_dynamodb() as dynamodb:
+        seed(dynamodb, rows_per_table)
+        storage = local_storage(dynamodb, latency_ms)
+        calls = Counter()
+        # Writes use the resource's client, reads the backend's low-level one
+        for client in (dynamodb.meta.client, storage.client):
+            client.meta.events.register(
+                'before-call.dynamodb', lambda model, **kwargs: calls.update([model.name])
+            )
+        add_latency(dynamodb, latency_ms)
+
+        start = time.perf_counter()
+        deleted = delete_family_account(storage, FAMILY_ID)
+        elapsed = time.perf_counter() - start
+        leftover = sum(
+            len(dynamodb.Table(table_name).query(
+                KeyConditionExpression='family_id = :fid',
+                ExpressionAttributeValues={':fid': FAMILY_ID})['Items'])
+            for table_name in CHILD_TABLES
+        )
+
+    total_rows = sum(deleted.values())
+    print(f"Deleted {total_rows:,} rows across {len(deleted)} tables in {elapsed:.1f}s "
+          f"({latency_ms:.0f} ms simulated round trip), {leftover} left behind")
+    for operation, count in sorted(calls.items()):
+        print(f"  {operation:16s} {count:6d} calls")
+    print(f"  rows / 25 = {total_rows / 25:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark: chat sessions sharing one MasterAgent vs. one agent per session.
+
+    python debug/bench_agent_pool.py [--sessions 8] [--families 4] [--turns 5] [--model-s 0.2]
+
+Every session (a thread) sends `turns` master-routed messages one after the
+other, all sessions at once, with the models replaced by stub_model's
+ScriptedModel (each call takes `model-s`). Compared:
+
+    shared          one module-level agent, as before: concurrent turns fail
+                    with Strands' ConcurrencyException
+    shared + lock   the same agent with turns serialized: no failures, but
+                    sessions queue behind each other and share one history
+    pool            query_router.master_pool (agent_pool.py): one agent per
+                    session, built from the shared models and tools
+
+and checks the histories afterwards: the longest one, and how many agents
+hold another family's messages (must be 0 for the pool). A second pool run
+with max_agents below the session count, and only that many sessions
+active at a time, shows LRU eviction (agents in use are never evicted).
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+
+from stub_model import ScriptedModel, text_reply, tool_reply
+
+import emotional_agent
+import household_agent
+import master_agent
+import query_router
+from agent_pool import AgentPool, session_key
+
+
+def install_models(model_s):
+    household_agent.model = ScriptedModel([text_reply("Family Financial Status: fine")], first_token_s=model_s)
+    emotional_agent.emotional_model = ScriptedModel([text_reply("You're doing great")], first_token_s=model_s)
+
+    def master_reply(messages, tool_specs, system_prompt):
+        last = messages[-1]['content'][0]
+        if 'toolResult' in last:
+            return text_reply("Here is what the finance agent found.")
+        return tool_reply("financial_agent", {"input": last.get('text', '')})
+
+    master_agent.model = ScriptedModel([master_reply], first_token_s=model_s)
+
+
+def families_seen(agent):
+    text = repr(agent.messages)
+    return {part.split("\\n")[0] for part in text.split("Family ID: ")[1:]}
+
+
+def run_sessions(sessions, turns, ask, workers=None):
+    """Run the sessions' turns, `workers` sessions at a time (all by default); returns (seconds, failures)."""
+    failures = []
+
+    def session_turns(family_id, session):
+        for turn in range(turns):
+            try:
+                ask(family_id, session, f"Family ID: {family_id}\n\nQuery: what can you do? ({turn})")
+            except Exception as e:
+                failures.append(type(e).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers or len(sessions)) as pool:
+        list(pool.map(lambda args: session_turns(*args), sessions))
+    return time.perf_counter() - start, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared MasterAgent vs. per-session agent pool")
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--families', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=5)
+    parser.add_argument('--model-s', type=float, default=0.2)
+    args = parser.parse_args()
+    install_models(args.model_s)
+    sessions = [(f"FAM{i % args.families:03d}", f"s{i}") for i in range(args.sessions)]
+    failed = False
+
+    def report(name, seconds, failures, agents):
+        longest = max((len(agent.messages) for agent in agents), default=0)
+        leaking = sum(len(families_seen(agent)) > 1 for agent in agents)
+        print(f"  {name:14s} {seconds:6.2f} s  {len(failures):3d} failed turns  "
+              f"longest history {longest:4d} messages  {leaking} of {len(agents)} agents mix families")
+        return leaking
+
+    print(f"{args.sessions} sessions of {args.families} families, {args.turns} master turns each, "
+          f"{args.model_s:.1f} s per model call (2 master + 1 sub-agent call per turn)")
+
+    shared = master_agent.new_master_agent()
+    seconds, failures = run_sessions(sessions, args.turns, lambda family_id, session, query: shared(query))
+    report("shared", seconds, failures, [shared])
+
+    shared = master_agent.new_master_agent()
+    lock = threading.Lock()
+
+    def ask_locked(family_id, session, query):
+        with lock:
+            shared(query)
+    seconds, failures = run_sessions(sessions, args.turns, ask_locked)
+    report("shared + lock", seconds, failures, [shared])
+
+    for name, pool, workers in (("pool", AgentPool(master_agent.new_master_agent), None),
+                                ("pool, max 4", AgentPool(master_agent.new_master_agent, max_agents=4), 4)):
+        agents = []
+
+        def ask_pooled(family_id, session, query):
+            with pool.lease(session_key(family_id, session)) as agent:
+                if agent not in agents:
+                    agents.append(agent)
+                agent(query)
+        seconds, failures = run_sessions(sessions, args.turns, ask_pooled, workers)
+        failed |= bool(failures) or bool(report(name, seconds, failures, agents))
+        print(f"      {pool.stats()}")
+
+    # What the chat uses
+    print(f"query_router.master_pool: max {query_router.master_pool.max_agents} agents, "
+          f"idle after {query_router.master_pool.idle_seconds:.0f} s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
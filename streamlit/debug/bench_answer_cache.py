@@ -0,0 +1,191 @@
+"""
+Benchmark: repeated finance questions with and without query_router's answer cache, offline.
+
+    python debug/bench_answer_cache.py [--first-token-s 0.2]
+
+Replays a family's chat through query_router.answer_query with the
+financial agent's model replaced by stub_model's ScriptedModel, scripted
+to call its four analysis tools one per cycle (as in bench_prompt_cache)
+and then answer "Answer #n", n counting the answers it wrote. The chat is
+the premium phone plan question from memory_store.json as asked there
+(three times), reworded slightly, for $200 instead of $100, two pairs of
+questions that differ in one key word only (NEAR_MISSES; each must be a
+miss), then the phone plan question again after an expense is added the way
+streamlit.py adds one, and once more, and the same again after another
+process (a second Streamlit worker or a CLI) adds an expense: only the stored
+data version changes, this process's caches are not told.
+
+Each turn's answer_cache outcome must be the expected one (chat_script), a
+hit must make no model calls and return the answer last computed for the
+same normalized question, and the turn after the write must recompute. Printed per turn:
+the outcome, model calls and duration, then the totals against the same
+chat with the cache off. Exits 1 if a check fails.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+
+from stub_model import ScriptedModel, text_reply
+from bench_prompt_cache import FINANCIAL_STEPS, FAMILY_ID, scripted
+from bench_tool_output import FAMILIES, seed
+
+import household_agent
+import query_router
+from answer_cache import HIT, MISS, OFF, STALE, AnswerCache, normalize
+from budget_rollups import save_expense
+from family_cache import DATA_VERSION_ATTRIBUTE, family_cache, record_write
+from query_router import answer_query
+from request_metrics import recent_requests
+from storage import MemoryBackend, set_storage
+
+MEMORY_STORE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'memory_store.json')
+QUESTION = re.compile(r'Decision for query: "(.*?)"')
+# Same words and amounts but one, which changes the question (word overlap 0.86 and 0.83)
+NEAR_MISSES = [
+    ("Can I afford a new laptop for $1,500 this month?", "Can I afford a new phone for $1,500 this month?"),
+    ("Should I buy a new car for $20000?", "Should I not buy a new car for $20000?"),
+]
+
+
+def asked_questions():
+    """The questions household_demo_user asked, in order, from memory_store.json."""
+    with open(MEMORY_STORE) as f:
+        memories = json.load(f)
+    return [match.group(1) for memory in memories if memory['user_id'] == "household_demo_user"
+            for match in [QUESTION.search(memory['content'])] if match]
+
+
+def chat_script():
+    """(label, question or None for the write, expected outcome) for each turn."""
+    asked = asked_questions()
+    phone = asked[0]
+    return [(f"memory_store.json #{index + 1}", question, MISS if index == 0 else HIT)
+            for index, question in enumerate(asked)] + [
+        ("reworded", "my spouse suggests upgrading our family phone plan to a premium package that costs $100 "
+                     "more per month - should we make this change", HIT),
+        ("$200 instead", phone.replace("$100", "$200"), MISS),
+    ] + [
+        (f"near miss {index + 1}{part}", question, MISS)
+        for index, pair in enumerate(NEAR_MISSES) for part, question in zip("ab", pair)
+    ] + [
+        ("expense added", None, None),
+        ("asked again", phone, STALE),
+        ("and again", phone, HIT),
+        ("added elsewhere", None, None),
+        ("asked again", phone, STALE),
+        ("and again", phone, HIT),
+    ]
+
+
+def _save_groceries(storage):
+    save_expense(storage, {
+        'family_id': FAMILY_ID, 'transaction_date_id': f"{datetime.now():%Y-%m-%d}#TXN{uuid.uuid4().hex[:6].upper()}",
+        'amount': 42, 'category': "Food", 'description': "Groceries", 'transaction_date': f"{datetime.now():%Y-%m-%d}"
+    })
+
+
+def add_expense(storage):
+    # As streamlit.py's save_expense_transaction does it
+    _save_groceries(storage)
+    record_write(storage, FAMILY_ID, 'ExpenseTransactions', 'BudgetAllocations')
+
+
+def add_expense_elsewhere(storage):
+    # What another process's record_write leaves in storage; this process's caches are not told
+    _save_groceries(storage)
+    storage.update('FamilyProfiles', {'family_id': FAMILY_ID}, add_values={DATA_VERSION_ATTRIBUTE: 1})
+
+
+WRITES = {"expense added": add_expense, "added elsewhere": add_expense_elsewhere}
+
+
+def install_model(first_token_s):
+    answers = []
+
+    def answer(messages, tool_specs, system_prompt):
+        reply = scripted(FINANCIAL_STEPS, None)(messages, tool_specs, system_prompt)
+        if reply.get('text', "") is None:
+            answers.append(f"Answer #{len(answers) + 1}")
+            return text_reply(answers[-1])
+        return reply
+
+    household_agent.model = ScriptedModel([answer], first_token_s=first_token_s)
+    return answers
+
+
+def run_chat(cache, first_token_s):
+    """Per turn: (label, outcome, model calls, ms, answer text), on a freshly seeded family."""
+    storage = MemoryBackend()
+    seed(storage, FAMILY_ID, *FAMILIES['typical'])
+    set_storage(storage)
+    family_cache.clear()
+    query_router.answer_cache = cache
+    install_model(first_token_s)
+    session = f"bench{uuid.uuid4().hex[:8]}"
+    turns = []
+    for label, question, _ in chat_script():
+        if question is None:
+            WRITES[label](storage)
+            turns.append((label, None, 0, 0.0, None))
+            continue
+        before = len(household_agent.model.requests)
+        started = time.perf_counter()
+        answer = answer_query(question, FAMILY_ID, session=session, bench="answer_cache")
+        duration_ms = (time.perf_counter() - started) * 1000
+        outcome = recent_requests(limit=1, kind="agent_turn", session=session)[0].get('answer_cache')
+        turns.append((label, outcome, len(household_agent.model.requests) - before, duration_ms,
+                      answer.text.split("\n\n")[0]))
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repeated finance questions with and without the answer cache")
+    parser.add_argument('--first-token-s', type=float, default=0.2,
+                        help="stub model latency per call, before its first token")
+    args = parser.parse_args()
+
+    # Explicit TTL: bench_prompt_cache, imported above, turns the cache off by default
+    cache = AnswerCache(ttl_seconds=3600)
+    cached = run_chat(cache, args.first_token_s)
+    uncached = run_chat(AnswerCache(ttl_seconds=0), args.first_token_s)
+
+    failures = 0
+    computed = {}  # the normalized question -> the answer last computed for it
+    print(f"{'turn':22s} {'answer cache':>12s} {'model calls':>11s} {'ms':>7s}  answer")
+    for (label, question, expected), (_, outcome, calls, ms, text) in zip(chat_script(), cached):
+        if question is None:
+            print(f"{label:22s} {'(write)':>12s}")
+            continue
+        normalized = normalize(question)
+        problems = []
+        if outcome != expected:
+            problems.append(f"expected {expected}")
+        if outcome == HIT and (calls or text != computed.get(normalized)):
+            problems.append("the hit ran the model or changed the answer")
+        if outcome != HIT:
+            computed[normalized] = text
+        print(f"{label:22s} {outcome:>12s} {calls:11d} {ms:7.0f}  {text}"
+              + (f"  FAIL: {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+    if any(outcome not in (OFF, None) for _, outcome, *_ in uncached):
+        print("FAIL: the cache-off run used the cache")
+        failures += 1
+
+    for name, turns in (("cache on", cached), ("cache off", uncached)):
+        print(f"  {name:10s} {sum(calls for _, _, calls, _, _ in turns):4d} model calls "
+              f"{sum(ms for _, _, _, ms, _ in turns) / 1000:6.1f} s")
+    print(f"  {cache.stats()}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
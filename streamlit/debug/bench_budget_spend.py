@@ -0,0 +1,150 @@
+"""
+Benchmark: budget spend accounting under parallel expense saves.
+
+    python debug/bench_budget_spend.py [expenses] [--workers 8] [--latency-ms 5]
+
+Several "family members" (threads) save expenses into the same few budget
+categories at once, two ways:
+
+    read-modify-write   put the transaction, get the budget row, put it back
+                        with spent/remaining moved by the amount
+    save_expense        one transaction: conditional put + ADD to the budget
+                        row + ADD to the month rollup (budget_rollups.py)
+
+and then compare every category's spent_amount / remaining_amount with the
+sum of its transactions. Read-modify-write loses updates when two members
+hit the same category; save_expense must not. It also re-saves a few items
+to check that a retried save is rejected instead of counted twice.
+
+Runs on the in-memory and SQLite backends with parallel writers, and on
+local DynamoDB with a simulated round trip; moto's transactions are not
+thread-safe, so that run uses a single writer (3 round trips per expense
+vs. 1).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_dynamodb import local_dynamodb, local_storage
+from budget_rollups import ROLLUP_TABLE, _compute_rollups, save_budget, save_expense
+from storage import ConditionFailedError, MemoryBackend, SQLiteBackend
+
+FAMILY_ID = "FAMSPEND"
+YEAR_MONTH = "2026-10"
+CATEGORIES = ["Food", "Transportation", "Entertainment"]
+MEMBERS = ["Parent1", "Parent2", "Child1", "Child2"]
+ALLOCATED = Decimal(5000)
+
+
+def make_expenses(count):
+    rng = random.Random(15)
+    return [{
+        'family_id': FAMILY_ID,
+        'transaction_date_id': f"{YEAR_MONTH}-{rng.randint(1, 28):02d}#TXN{i:06d}",
+        'amount': Decimal(rng.randint(100, 9999)) / 100,
+        'category': rng.choice(CATEGORIES),
+        'family_member': rng.choice(MEMBERS),
+        'transaction_date': YEAR_MONTH,
+    } for i in range(count)]
+
+
+def read_modify_write(storage, item):
+    # What a naive "keep spent_amount in sync" would do: two members can read the same row
+    storage.put('ExpenseTransactions', item)
+    key = {'family_id': FAMILY_ID, 'category_month': f"{item['category']}#{YEAR_MONTH}"}
+    row = storage.get('BudgetAllocations', key)
+    row['spent_amount'] += item['amount']
+    row['remaining_amount'] = row['allocated_amount'] - row['spent_amount']
+    storage.put('BudgetAllocations', row)
+
+
+def check(storage, expenses):
+    """Problems found comparing budget rows (and, for save_expense, the rollup) with the transactions."""
+    problems = []
+    for category in CATEGORIES:
+        expected = sum((item['amount'] for item in expenses if item['category'] == category), Decimal(0))
+        row = storage.get('BudgetAllocations', {'family_id': FAMILY_ID, 'category_month': f"{category}#{YEAR_MONTH}"})
+        if row['spent_amount'] != expected or row['remaining_amount'] != ALLOCATED - expected:
+            problems.append(f"{category}: spent {row['spent_amount']}, remaining {row['remaining_amount']}, "
+                            f"transactions total {expected}")
+    return problems
+
+
+def run(storage, expenses, workers, write):
+    for category in CATEGORIES:
+        save_budget(storage, FAMILY_ID, category, YEAR_MONTH, ALLOCATED)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda item: write(storage, item), expenses))
+    seconds = time.perf_counter() - start
+    problems = check(storage, expenses)
+    if write is save_expense:
+        retried = 0
+        for item in expenses[:5]:
+            try:
+                save_expense(storage, item)
+            except ConditionFailedError:
+                retried += 1
+        if retried != 5:
+            problems.append(f"{5 - retried} of 5 repeated saves were counted again")
+        problems += check(storage, expenses)
+        rollup = storage.get(ROLLUP_TABLE, {'family_id': FAMILY_ID, 'year_month': YEAR_MONTH})
+        rebuilt = _compute_rollups(storage, FAMILY_ID)[YEAR_MONTH]
+        problems += [f"rollup {name}: {rollup.get(name)} vs rebuilt {value}"
+                     for name, value in rebuilt.items() if name != 'updated_at' and rollup.get(name, 0) != value]
+    return seconds, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel expense saves: read-modify-write vs. atomic ADD")
+    parser.add_argument('expenses', type=int, nargs='?', default=2000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    args = parser.parse_args()
+    expenses = make_expenses(args.expenses)
+
+    failures = 0
+
+    def report(backend, name, workers, result, count=len(expenses)):
+        nonlocal failures
+        seconds, problems = result
+        expected_to_fail = name == "read-modify-write"
+        if expected_to_fail:
+            verdict = "lost updates" if problems else ("ok" if workers == 1 else "no lost updates (lucky)")
+        else:
+            verdict = "FAIL" if problems else "ok"
+        print(f"  {backend:9s} {name:18s} {workers:2d} writers {seconds:7.2f} s "
+              f"{count / seconds:8,.0f} expenses/s  {verdict}")
+        for problem in problems[:5]:
+            print(f"      {problem}")
+        failures += bool(problems) and not expected_to_fail
+
+    print(f"{len(expenses):,} expenses from {len(MEMBERS)} members into {len(CATEGORIES)} categories")
+    for name, write in (("read-modify-write", read_modify_write), ("save_expense", save_expense)):
+        report('memory', name, args.workers, run(MemoryBackend(), expenses, args.workers, write))
+        with tempfile.TemporaryDirectory() as directory:
+            storage = SQLiteBackend(os.path.join(directory, 'spend.db'))
+            report('sqlite', name, args.workers, run(storage, expenses, args.workers, write))
+
+    # moto's transactions are not thread-safe at all, so DynamoDB runs a single writer;
+    # the difference there is round trips per expense (3 vs. 1), though moto also
+    # copies every table a transaction touches, which DynamoDB does not
+    print(f"local DynamoDB, {args.latency_ms:.0f} ms simulated round trip (moto copies tables per transaction)")
+    sample = expenses[:max(1, len(expenses) // 10)]
+    for name, write in (("read-modify-write", read_modify_write), ("save_expense", save_expense)):
+        with local_dynamodb(latency_ms=args.latency_ms) as dynamodb:
+            report('dynamodb', name, 1, run(local_storage(dynamodb, args.latency_ms), sample, 1, write),
+                   len(sample))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
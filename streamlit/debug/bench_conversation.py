@@ -0,0 +1,117 @@
+"""
+Benchmark: input tokens per turn over a long chat, default vs. bounded history.
+
+    python debug/bench_conversation.py [--turns 50] [--words 300] [--tight-budget 2500]
+
+One MasterAgent session of `turns` master-routed messages, with the models
+replaced by stub_model's ScriptedModel, which reports input tokens as an
+estimate of each request. Every turn the master calls the financial agent,
+which answers in `words` words, and then replies with about as many.
+Compared:
+
+    sliding window   Strands' default (last 40 messages verbatim)
+    bounded          conversation.BoundedConversationManager as the agents get it
+    bounded, tight   the same with token_budget=`tight-budget`, to show the
+                     hard cap holding when recent turns alone exceed it
+
+Printed per run: the input tokens of turns 1, 5, 10, 25 and the last
+(master and financial agent calls together), the growth from turns 11-20 to
+the last ten (on average), the spread of turns 11 onward (max / min; the
+bounded runs fold two turns at a time, so they alternate between two
+levels), and the largest history sent with any master call. The bounded
+runs fail if they send any history over their budget, and from 30 turns
+on if they grow by more than 5% or spread by more than 25%.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+
+from stub_model import ScriptedModel, text_reply, tool_reply
+from strands.agent.conversation_manager import SlidingWindowConversationManager
+
+import household_agent
+import master_agent
+from conversation import BoundedConversationManager, estimate_tokens
+
+SHOWN_TURNS = (1, 5, 10, 25)
+
+
+def words(label, count):
+    return " ".join(f"{label}{i}" for i in range(count))
+
+
+def install_models(count):
+    household_agent.model = ScriptedModel([text_reply("Family Financial Status: " + words("fin", count))])
+
+    def master_reply(messages, tool_specs, system_prompt):
+        last = messages[-1]['content'][0]
+        if 'toolResult' in last:
+            return text_reply("Here is what the finance agent found: " + words("master", count))
+        return tool_reply("financial_agent", {"input": last.get('text', '')})
+
+    master_agent.model = ScriptedModel([master_reply])
+
+
+def run_session(manager, turns):
+    """Per-turn input tokens and the largest history (estimated) any master call carried."""
+    agent = master_agent.new_master_agent(conversation_manager=manager)
+    models = (master_agent.model, household_agent.model)
+    per_turn, largest_history = [], 0
+    for turn in range(1, turns + 1):
+        seen = [len(model.requests) for model in models]
+        agent(f"Family ID: FAMBENCH\n\nQuery: can we afford item {turn} this month?")
+        new = [request for model, start in zip(models, seen) for request in model.requests[start:]]
+        per_turn.append(sum(request['input_tokens'] for request in new))
+        largest_history = max([largest_history] + [
+            estimate_tokens(request['messages']) for request in master_agent.model.requests[seen[0]:]])
+    return per_turn, largest_history, len(agent.messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn input tokens: default vs. bounded conversation history")
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--tight-budget', type=int, default=2500)
+    args = parser.parse_args()
+    install_models(args.words)
+    shown = [turn for turn in SHOWN_TURNS if turn < args.turns] + [args.turns]
+
+    runs = [
+        ("sliding window", SlidingWindowConversationManager()),
+        ("bounded", BoundedConversationManager()),
+        ("bounded, tight", BoundedConversationManager(token_budget=args.tight_budget)),
+    ]
+
+    print(f"{args.turns} master turns, {args.words}-word answers; input tokens per turn (master + financial agent)")
+    print(f"  {'manager':15s} " + " ".join(f"{'turn ' + str(turn):>9s}" for turn in shown)
+          + f" {'growth':>7s} {'spread':>7s} {'largest history':>16s}  messages kept")
+    failures = 0
+    for name, manager in runs:
+        per_turn, largest_history, kept = run_session(manager, args.turns)
+        tail = per_turn[10:] or per_turn
+        growth = sum(per_turn[-10:]) / sum(tail[:10]) * len(tail[:10]) / len(per_turn[-10:]) - 1
+        spread = max(tail) / min(tail) - 1
+        problems = []
+        if isinstance(manager, BoundedConversationManager):
+            # Only meaningful once the summary is full, well before turn 30
+            if args.turns >= 30 and growth > 0.05:
+                problems.append(f"grows by {growth:.0%}")
+            if args.turns >= 30 and spread > 0.25:
+                problems.append(f"turns 11+ vary by {spread:.0%}")
+            if largest_history > manager.token_budget:
+                problems.append(f"history of {largest_history} tokens over the {manager.token_budget} budget")
+        print(f"  {name:15s} " + " ".join(f"{per_turn[turn - 1]:9d}" for turn in shown)
+              + f" {growth:7.0%} {spread:7.0%} {largest_history:16d}  {kept:13d}"
+              + (f"  FAIL: {'; '.join(problems)}" if problems else ""))
+        if isinstance(manager, BoundedConversationManager):
+            print(f"  {'':15s} {manager.stats}")
+        failures += bool(problems)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
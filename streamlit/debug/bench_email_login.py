@@ -0,0 +1,78 @@
+"""
+Benchmark: login by FamilyProfiles scan vs the FamilyEmailIndex lookup.
+
+    python debug/bench_email_login.py [families] [latency_ms] [logins]
+
+Seeds `families` profiles into the local stand-in, backfills the index, then
+times both lookups for a sample of emails. The scan follows every page, which
+is what the old unpaginated scan would have needed to be correct.
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from backfill_email_index import backfill_email_index
+from family_data import lookup_family_id
+
+
+def seed_profiles(dynamodb, families):
+    with dynamodb.Table('FamilyProfiles').batch_writer() as batch:
+        for i in range(families):
+            batch.put_item(Item={
+                'family_id': f"FAM{i:06d}", 'family_name': f"Family {i}",
+                'email': f"family{i}@example.com", 'password': 'x' * 64,
+                'total_monthly_income': Decimal('5800'), 'family_size': 4,
+                'location': 'Singapore', 'risk_tolerance': 'Moderate'
+            })
+
+
+def login_by_scan(dynamodb, email):
+    table = dynamodb.Table('FamilyProfiles')
+    scan_kwargs = {'FilterExpression': 'email = :email', 'ExpressionAttributeValues': {':email': email}}
+    calls = 0
+    while True:
+        response = table.scan(**scan_kwargs)
+        calls += 1
+        if response['Items']:
+            return response['Items'][0], calls
+        if 'LastEvaluatedKey' not in response:
+            return None, calls
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def login_by_index(storage, email):
+    family_id = lookup_family_id(storage, email)
+    item = storage.get('FamilyProfiles', {'family_id': family_id})
+    return item, 2
+
+
+def main():
+    families = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    logins = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with local_dynamodb() as dynamodb:
+        print(f"Seeding {families} family profiles...")
+        seed_profiles(dynamodb, families)
+        summary = backfill_email_index(dynamodb)
+        print(f"Backfilled {summary['emails_indexed']} emails in {summary['seconds']:.1f}s")
+
+        add_latency(dynamodb, latency_ms)
+        storage = local_storage(dynamodb, latency_ms)
+        emails = [f"family{random.randrange(families)}@example.com" for _ in range(logins)]
+
+        for name, login, target in [("Scan", login_by_scan, dynamodb), ("Email index", login_by_index, storage)]:
+            start = time.perf_counter()
+            calls = 0
+            for email in emails:
+                item, used = login(target, email)
+                assert item is not None and item['email'] == email
+                calls += used
+            elapsed_ms = (time.perf_counter() - start) / logins * 1000
+            print(f"{name:12s} {elapsed_ms:10.1f} ms/login  {calls / logins:6.1f} DynamoDB calls/login")
+
+
+if __name__ == "__main__":
+    main()
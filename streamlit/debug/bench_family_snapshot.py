@@ -0,0 +1,85 @@
+"""
+Benchmark: sequential family reads vs the parallel snapshot loader.
+
+    python debug/bench_family_snapshot.py [latency_ms] [runs]
+
+The sequential path issues the four reads get_family_financial_overview used
+to make one after another; the snapshot path sends them together, so its
+wall-clock time should land near a single round trip.
+"""
+import sys
+import time
+from decimal import Decimal
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from family_cache import family_cache
+from family_data import SNAPSHOT_READERS, load_family_snapshot
+
+FAMILY_ID = "FAMBENCH"
+YEAR_MONTH = time.strftime('%Y-%m')
+
+
+def seed_family(dynamodb):
+    dynamodb.Table('FamilyProfiles').put_item(Item={
+        'family_id': FAMILY_ID, 'family_name': 'Bench Family',
+        'total_monthly_income': Decimal('5800'), 'family_size': 4
+    })
+    for category in ["Housing", "Food", "Transportation", "Utilities", "Entertainment"]:
+        dynamodb.Table('BudgetAllocations').put_item(Item={
+            'family_id': FAMILY_ID, 'category_month': f"{category}#{YEAR_MONTH}",
+            'category': category, 'allocated_amount': Decimal('500'),
+            'spent_amount': Decimal('200'), 'remaining_amount': Decimal('300'),
+            'year_month': YEAR_MONTH
+        })
+    for i in range(3):
+        dynamodb.Table('FinancialGoals').put_item(Item={
+            'family_id': FAMILY_ID, 'goal_id': f"GOAL{i}", 'goal_name': f"Goal {i}",
+            'target_amount': Decimal('10000'), 'current_amount': Decimal('2500'),
+            'monthly_allocation': Decimal('400'), 'priority': i + 1, 'status': 'Active'
+        })
+    for i, liquidity in enumerate(["High", "High", "Medium", "Low"]):
+        dynamodb.Table('FamilyAssets').put_item(Item={
+            'family_id': FAMILY_ID, 'asset_type_id': f"Savings#SAV{i}",
+            'asset_name': f"Account {i}", 'asset_type': 'Savings',
+            'current_value': Decimal('8500'), 'liquidity': liquidity
+        })
+
+
+def time_it(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 40
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with local_dynamodb() as dynamodb:
+        seed_family(dynamodb)
+        add_latency(dynamodb, latency_ms)
+        storage = local_storage(dynamodb, latency_ms)
+
+        # Both paths measure cold reads, not the shared cache
+        def sequential():
+            family_cache.clear()
+            for reader in SNAPSHOT_READERS.values():
+                reader(storage, FAMILY_ID, YEAR_MONTH)
+
+        def parallel():
+            family_cache.clear()
+            load_family_snapshot(storage, FAMILY_ID, year_month=YEAR_MONTH)
+
+        parallel()  # warm up the pool threads
+        sequential_ms = time_it(sequential, runs)
+        parallel_ms = time_it(parallel, runs)
+
+    print(f"Simulated round trip: {latency_ms:.0f} ms, {runs} runs each")
+    print(f"Sequential reads:   {sequential_ms:8.1f} ms/snapshot")
+    print(f"Parallel snapshot:  {parallel_ms:8.1f} ms/snapshot")
+    print(f"Speed-up:           {sequential_ms / parallel_ms:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: current heart rate from a full-table scan vs. a time-series query.
+
+    python debug/bench_heart_rate.py [days] [latency_ms]
+
+Loads `days` days of synthetic samples (one every 3 seconds) into the old
+single-key table layout and into HeartRateSamples, then times the old
+get_current_heart_rate path (scan everything, strptime every dateTime,
+filter to the window) against recent_samples(), plus one nearest_sample()
+lookup. Checks that both paths agree. moto evaluates a Query by walking the whole partition, so
+the query timings here still grow with history; on DynamoDB they don't.
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage, create_table
+from heart_rate import FITBIT_TIME_FORMAT, fitbit_epoch, nearest_sample, recent_samples, sample_item
+from storage import HEART_RATE_TABLE
+
+MEMBER_ID = "bench"
+WINDOW_SECONDS = 10
+SAMPLE_EVERY = 3
+
+
+def make_entries(days):
+    start = datetime(2025, 2, 20)
+    count = days * 86400 // SAMPLE_EVERY
+    return [
+        {'dateTime': (start + timedelta(seconds=i * SAMPLE_EVERY)).strftime(FITBIT_TIME_FORMAT),
+         'value': {'bpm': 60 + (i * 7) % 50, 'confidence': 2}}
+        for i in range(count)
+    ]
+
+
+def old_current_heart_rate(table, window_seconds):
+    # The previous emotional_agent code, with the scan's pages followed
+    items = []
+    kwargs = {}
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    for entry in items:
+        entry['dt_obj'] = datetime.strptime(entry['dateTime'], FITBIT_TIME_FORMAT)
+    latest_time = max(entry['dt_obj'] for entry in items)
+    recent = [e for e in items if (latest_time - e['dt_obj']).total_seconds() <= window_seconds]
+    return sum(float(e['value']['bpm']) for e in recent) / len(recent)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    entries = make_entries(days)
+
+    with local_dynamodb() as dynamodb:
+        old_table = create_table(dynamodb, 'test_table', 'dateTime')
+        with old_table.batch_writer() as batch:
+            for entry in entries:
+                batch.put_item(Item={'dateTime': entry['dateTime'],
+                                     'value': {'bpm': Decimal(entry['value']['bpm']), 'confidence': Decimal(2)}})
+        storage = local_storage(dynamodb)
+        storage.batch_put(HEART_RATE_TABLE, (sample_item(MEMBER_ID, entry) for entry in entries))
+        if latency_ms:
+            add_latency(dynamodb, latency_ms)
+            add_latency(storage.client, latency_ms)
+
+        old_bpm, old_ms = timed(lambda: old_current_heart_rate(old_table, WINDOW_SECONDS))
+        samples, new_ms = timed(lambda: recent_samples(storage, MEMBER_ID, WINDOW_SECONDS))
+        new_bpm = sum(sample['bpm'] for sample in samples) / len(samples)
+
+        target = entries[len(entries) // 2]['dateTime']
+        nearest, nearest_ms = timed(lambda: nearest_sample(storage, MEMBER_ID, fitbit_epoch(target) + 1))
+
+    print(f"{len(entries):,} samples ({days} days), {latency_ms:.0f} ms simulated round trip")
+    print(f"  current bpm, scan + strptime   {old_ms:10.1f} ms  -> {old_bpm:.1f}")
+    print(f"  current bpm, recent_samples    {new_ms:10.1f} ms  -> {new_bpm:.1f}  ({old_ms / new_ms:,.0f}x)")
+    print(f"  nearest_sample                 {nearest_ms:10.1f} ms  -> "
+          f"{'ok' if nearest and nearest['epoch'] == fitbit_epoch(target) else 'WRONG'}")
+    print("results match" if abs(old_bpm - new_bpm) < 1e-9 else "RESULTS DIFFER")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: Fitbit heart-rate load, json.load + one put_item per sample vs.
+the streaming loader, plus an interrupted-and-resumed load.
+
+    python debug/bench_heart_rate_import.py [samples] [latency_ms] [workers]
+
+Writes `samples` synthetic entries (1% repeated timestamps) as a JSON array
+and as NDJSON, loads them into the local DynamoDB stand-in both ways and
+reports samples/s. The resume check makes the storage fail partway
+through, runs the loader again and verifies every unique sample is stored
+exactly once.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from heart_rate import FITBIT_TIME_FORMAT, sample_item
+from heart_rate_import import checkpoint_path_for, load_heart_rate
+from storage import HEART_RATE_TABLE, MemoryBackend
+
+MEMBER_ID = "bench"
+
+
+def make_entries(count):
+    start = datetime(2025, 2, 20)
+    entries = []
+    for i in range(count):
+        # Every 100th sample repeats the previous timestamp, as overlapping exports do
+        seconds = (i - 1 if i % 100 == 99 else i) * 3
+        entries.append({'dateTime': (start + timedelta(seconds=seconds)).strftime(FITBIT_TIME_FORMAT),
+                        'value': {'bpm': 60 + (i * 7) % 50, 'confidence': 2}})
+    return entries
+
+
+def old_upload(storage, path):
+    # The previous debug/heartratetable.upload_json_to_table: whole file in memory, one put per sample
+    with open(path) as f:
+        entries = json.load(f)
+    for entry in entries:
+        storage.put(HEART_RATE_TABLE, sample_item(MEMBER_ID, entry))
+    return len(entries)
+
+
+class FailingBackend(MemoryBackend):
+    """Raises on the n-th batch write, like a dropped connection mid-load."""
+
+    def __init__(self, fail_on_batch):
+        super().__init__()
+        self.fail_on_batch = fail_on_batch
+        self.batches = 0
+
+    def batch_put(self, table_name, items):
+        self.batches += 1
+        if self.batches == self.fail_on_batch:
+            raise ConnectionError("simulated interruption")
+        return super().batch_put(table_name, items)
+
+
+def check_resume(path, unique):
+    storage = FailingBackend(fail_on_batch=5)
+    try:
+        load_heart_rate(storage, MEMBER_ID, path, workers=4, batch_size=200)
+        return "FAIL: load was not interrupted"
+    except ConnectionError:
+        pass
+    if not os.path.exists(checkpoint_path_for(path)):
+        return "FAIL: no checkpoint after the interruption"
+    result = load_heart_rate(storage, MEMBER_ID, path, workers=4, batch_size=200)
+    stored = len(list(storage.query(HEART_RATE_TABLE, MEMBER_ID)))
+    if stored != unique or os.path.exists(checkpoint_path_for(path)):
+        return f"FAIL: {stored:,} samples stored, expected {unique:,}"
+    return f"ok (resumed after {result.resumed_from:,} entries, {stored:,} samples stored)"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    entries = make_entries(count)
+    unique = len({entry['dateTime'] for entry in entries})
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'export.json')
+        ndjson_path = os.path.join(directory, 'export.ndjson')
+        with open(json_path, 'w') as f:
+            json.dump(entries, f, indent=2)
+        with open(ndjson_path, 'w') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in entries)
+
+        print(f"{count:,} entries ({unique:,} unique timestamps), "
+              f"{latency_ms:.0f} ms simulated DynamoDB round trip, {workers} writers")
+        runs = [
+            ("json.load + put_item per sample", lambda storage: old_upload(storage, json_path)),
+            ("streaming loader, JSON array",
+             lambda storage: load_heart_rate(storage, MEMBER_ID, json_path, workers=workers).entries_read),
+            ("streaming loader, NDJSON",
+             lambda storage: load_heart_rate(storage, MEMBER_ID, ndjson_path, workers=workers).entries_read),
+        ]
+        for name, run in runs:
+            with local_dynamodb(latency_ms=latency_ms) as dynamodb:
+                storage = local_storage(dynamodb)
+                start = time.perf_counter()
+                read = run(storage)
+                seconds = time.perf_counter() - start
+                stored = len(list(storage.query(HEART_RATE_TABLE, MEMBER_ID, attributes=['epoch'])))
+            print(f"  {name:34s} {seconds:8.2f} s  {read / seconds:10,.0f} samples/s  {stored:,} stored")
+
+        print(f"  resume after interruption: {check_resume(json_path, unique)}")
+
+
+if __name__ == "__main__":
+    main()
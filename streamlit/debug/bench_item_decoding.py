@@ -0,0 +1,95 @@
+"""
+Micro-benchmark: decoding DynamoDB query results into Python / pandas.
+
+    python debug/bench_item_decoding.py [items] [runs]
+
+Builds `items` low-level ExpenseTransactions items ({"amount": {"N": ...}})
+like a query response holds them and times the old path (boto3's
+TypeDeserializer to Decimals, then decimal_to_float) against item_codec's
+direct decoding, both to dicts and to a DataFrame. No AWS or moto needed.
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+import pandas as pd
+from boto3.dynamodb.types import TypeDeserializer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from item_codec import decode_frame, decode_item
+from storage import decimal_to_float
+
+CATEGORIES = ["Housing", "Food", "Transportation", "Healthcare", "Utilities", "Other"]
+
+
+def make_raw_items(count):
+    random.seed(7)
+    items = []
+    for i in range(count):
+        day = f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
+        items.append({
+            'family_id': {'S': 'FAMBENCH'},
+            'transaction_date_id': {'S': f"{day}#TXN{i:08d}"},
+            'amount': {'N': f"{random.uniform(1, 400):.2f}"},
+            'category': {'S': random.choice(CATEGORIES)},
+            'subcategory': {'S': 'General'},
+            'description': {'S': f"Purchase {i}"},
+            'family_member': {'S': 'Parent1'},
+            'necessity_level': {'S': 'Important'},
+            'transaction_date': {'S': day},
+        })
+    return items
+
+
+def boto3_then_float(raw_items):
+    deserializer = TypeDeserializer()
+    # What resource-level queries do per item, followed by the app's conversion
+    return [
+        decimal_to_float({name: deserializer.deserialize(value) for name, value in raw.items()})
+        for raw in raw_items
+    ]
+
+
+def time_it(fn, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    raw_items = make_raw_items(count)
+
+    # Same values either way
+    assert boto3_then_float(raw_items[:100]) == [decode_item(raw) for raw in raw_items[:100]]
+    expected = pd.DataFrame.from_records(boto3_then_float(raw_items[:100]))
+    pd.testing.assert_frame_equal(decode_frame(raw_items[:100]), expected)
+
+    cases = [
+        ("dicts: TypeDeserializer + decimal_to_float", lambda: boto3_then_float(raw_items)),
+        ("dicts: decode_item(numbers=Decimal)", lambda: [decode_item(raw, Decimal) for raw in raw_items]),
+        ("dicts: decode_item (float)", lambda: [decode_item(raw) for raw in raw_items]),
+        ("frame: from_records(boto3 + decimal_to_float)",
+         lambda: pd.DataFrame.from_records(boto3_then_float(raw_items))),
+        ("frame: decode_frame", lambda: decode_frame(raw_items)),
+        ("frame: decode_frame, 2 columns",
+         lambda: decode_frame(raw_items, columns=['category', 'amount'])),
+    ]
+    print(f"{count:,} items, best of {runs} runs")
+    baseline = {}
+    for name, fn in cases:
+        elapsed = time_it(fn, runs)
+        kind = name.split(':')[0]
+        baseline.setdefault(kind, elapsed)
+        print(f"  {name:48s} {elapsed:9.1f} ms  {baseline[kind] / elapsed:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: one turn that needs both sub-agents, sequential vs. side by side.
+
+    python debug/bench_parallel_agents.py [--finance-s 2.4] [--emotional-s 1.2] [--model-call-s 0.8] [--turns 3]
+
+MasterAgent's tool loop runs the financial agent, then the emotional agent,
+and spends its own model calls deciding and relaying (about
+query_router.MASTER_CALLS_DEFAULT of them). query_router's parallel mode
+runs both sub-agents at once and merges their answers without a model call.
+The sub-agents are replaced by stand-ins that sleep for the given model
+time, so this measures the orchestration only; real turns vary with the
+answers. Also runs a financial-only turn, whose heart-rate stress line is
+read alongside the financial agent (20 ms simulated DynamoDB read).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+# Every turn runs its agents, as a repeated question would without query_router's answer cache
+os.environ.setdefault('ANSWER_CACHE_TTL_SECONDS', '0')
+
+import query_router
+from query_router import MASTER_CALLS_DEFAULT, ROUTE_BOTH, ROUTE_FINANCIAL, answer_query, router
+
+MIXED_MESSAGE = "I'm stressed about paying the mortgage this month"
+FINANCIAL_MESSAGE = "Can we afford a $1,200 laptop for school?"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs. concurrent sub-agents for one turn")
+    parser.add_argument('--finance-s', type=float, default=2.4)
+    parser.add_argument('--emotional-s', type=float, default=1.2)
+    parser.add_argument('--model-call-s', type=float, default=0.8)
+    parser.add_argument('--turns', type=int, default=3)
+    args = parser.parse_args()
+
+    def financial_answer(query):
+        time.sleep(args.finance_s)
+        return "**Family Financial Status:** ..."
+
+    def emotional_answer(query):
+        time.sleep(args.emotional_s)
+        return "Your heart rate is a little high ..."
+
+    def stress_note():
+        time.sleep(0.02)
+        return "**Emotional:** Your heart rate averages 72 bpm (Moderate Stress)."
+
+    query_router.financial_answer = financial_answer
+    query_router.emotional_answer = emotional_answer
+    query_router.stress_note = stress_note
+    router.parallel = True
+    failures = 0
+
+    def sequential():
+        # What MasterAgent's loop waits for: its own calls plus each sub-agent in turn
+        time.sleep(MASTER_CALLS_DEFAULT * args.model_call_s)
+        financial_answer(MIXED_MESSAGE)
+        emotional_answer(MIXED_MESSAGE)
+
+    print(f"sub-agents: finance {args.finance_s:.1f} s, emotional {args.emotional_s:.1f} s; "
+          f"master model call {args.model_call_s:.1f} s x {MASTER_CALLS_DEFAULT}")
+    for name, turn in (("MasterAgent, sequential", sequential),
+                       ("both, side by side", lambda: answer_query(MIXED_MESSAGE, "FAMBENCH")),
+                       ("financial + stress line", lambda: answer_query(FINANCIAL_MESSAGE, "FAMBENCH"))):
+        timings = []
+        for _ in range(args.turns):
+            start = time.perf_counter()
+            answer = turn()
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:24s} {min(timings):6.2f} s per turn")
+        if answer is not None:
+            expected = ROUTE_BOTH if name.startswith("both") else ROUTE_FINANCIAL
+            if answer.route.target != expected or "Emotional" not in answer.text:
+                print(f"      FAIL: routed to {answer.route.target}, merged text {answer.text!r}")
+                failures += 1
+            else:
+                print(f"      parts: {answer.agents_ms}")
+    print(f"  floor: max of the sub-agents {max(args.finance_s, args.emotional_s):.2f} s, "
+          f"sum {args.finance_s + args.emotional_s:.2f} s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
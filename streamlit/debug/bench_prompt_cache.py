@@ -0,0 +1,170 @@
+"""
+Benchmark: Bedrock prompt caching of the agents' static prefix, offline.
+
+    python debug/bench_prompt_cache.py [--rounds 3] [--min-tokens 1024]
+
+Runs chat turns of every route through query_router.answer_query with the
+models replaced by stub_model's ScriptedModel, scripted to make the model
+calls a real turn makes (the financial agent calls its four analysis tools
+one per cycle, the emotional agent reads the heart rate, the master calls
+the financial agent), against a seeded in-memory family. Then:
+
+    prefix   every recorded request is formatted with the agent's real
+             BedrockModel (cache_config from aws_clients.prompt_cache_config)
+             exactly as it would be sent; the tool specs and system prompt,
+             with their cache points, must be byte-identical across all of
+             that agent's calls, in every turn and every agent instance
+    points   each request must carry the toolConfig and system cache points
+             (and the conversation one in its last user message)
+    tracked  the stubs act like Bedrock's cache for that prefix (prefixes
+             under --min-tokens are not cached, as on Bedrock); the cache
+             reads and writes request_metrics recorded for the turns must
+             add up to what the stubs reported
+
+Also prints what the prefix costs with and without the cache, pricing cache
+reads at 0.1x and writes at 1.25x the input price. Exits 1 if a check fails;
+with BEDROCK_PROMPT_CACHE=off the points check fails by design.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+# Every turn runs its agents, as a repeated question would without query_router's answer cache
+os.environ.setdefault('ANSWER_CACHE_TTL_SECONDS', '0')
+
+from stub_model import ScriptedModel, text_reply, tool_reply
+from bench_tool_output import FAMILIES, seed
+
+import emotional_agent
+import household_agent
+import master_agent
+from heart_rate import HEART_RATE_MEMBER_ID
+from query_router import answer_query, router
+from request_metrics import recent_requests
+from storage import MemoryBackend, set_storage
+
+FAMILY_ID = "TYPICAL"
+MESSAGES = [
+    "Can we afford a $1,200 laptop for school?",
+    "Am I stressed right now?",
+    "I'm stressed about paying the mortgage",
+    "What can you do?",
+]
+FINANCIAL_STEPS = [
+    ("get_family_financial_overview", {"family_id": FAMILY_ID}),
+    ("check_spending_capacity", {"family_id": FAMILY_ID, "amount": 1200, "category": "Education"}),
+    ("get_alternative_funding_sources", {"family_id": FAMILY_ID, "required_amount": 1200}),
+    ("assess_goal_impact", {"family_id": FAMILY_ID, "expense_amount": 1200}),
+]
+EMOTIONAL_STEPS = [("get_current_heart_rate", {})]
+CACHE_READ_PRICE, CACHE_WRITE_PRICE = 0.1, 1.25
+
+
+def scripted(steps, answer):
+    """Reply with each tool call of `steps` in turn, then `answer`; counts the tool results since the prompt."""
+    def reply(messages, tool_specs, system_prompt):
+        done = 0
+        for message in reversed(messages):
+            if message['role'] == 'user' and not any('toolResult' in block for block in message['content']):
+                break
+            done += sum('toolResult' in block for block in message['content'])
+        if done < len(steps):
+            return tool_reply(*steps[done])
+        return text_reply(answer)
+    return reply
+
+
+def prefix_of(request):
+    """The part of a formatted Converse request Bedrock caches ahead of the conversation."""
+    return json.dumps({'toolConfig': request.get('toolConfig'), 'system': request.get('system')}).encode()
+
+
+def has_point(blocks):
+    return bool(blocks) and 'cachePoint' in blocks[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt caching of the agents' static prefix, on stub models")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--min-tokens', type=int, default=1024)
+    args = parser.parse_args()
+
+    storage = MemoryBackend()
+    seed(storage, FAMILY_ID, *FAMILIES['typical'])
+    now = int(time.time())
+    for second in range(10):
+        storage.put('HeartRateSamples', {'member_id': HEART_RATE_MEMBER_ID, 'epoch': now - second,
+                                         'bpm': 88, 'confidence': 2})
+    set_storage(storage)
+
+    stubs = {
+        'MasterAgent': (master_agent, 'model', scripted(
+            [("financial_agent", {"input": "What can the family do?"})], "Here is the plan.")),
+        'financial_agent': (household_agent, 'model', scripted(FINANCIAL_STEPS, "Family Financial Status: ok")),
+        'emotional_agent': (emotional_agent, 'emotional_model', scripted(EMOTIONAL_STEPS, "You seem calm.")),
+    }
+    real_models = {}
+    for name, (module, attribute, reply) in stubs.items():
+        real_models[name] = getattr(module, attribute)
+        setattr(module, attribute, ScriptedModel([reply], cache_min_tokens=args.min_tokens))
+    router.parallel = True
+
+    for round_number in range(args.rounds):
+        for message in MESSAGES:
+            answer_query(message, FAMILY_ID, session=f"bench{os.getpid()}", bench="prompt_cache")
+    turns = recent_requests(kind="agent_turn", bench="prompt_cache")
+
+    failures = 0
+    stub_reads = stub_writes = 0
+    print(f"{args.rounds} rounds of {len(MESSAGES)} routed turns; cache points from "
+          f"{type(real_models['MasterAgent'].config.get('cache_config')).__name__}")
+    print(f"  {'agent':16s} {'calls':>5s} {'prefixes':>8s} {'prefix tok':>10s} {'points':>7s} "
+          f"{'written':>8s} {'read':>8s} {'prefix cost':>12s}")
+    for name, (module, attribute, _) in stubs.items():
+        stub = getattr(module, attribute)
+        real = real_models[name]
+        prefixes, missing_points = set(), 0
+        for request in stub.requests:
+            formatted = real.format_request(request['messages'], request['tool_specs'],
+                                            request['system_prompt_content'])
+            prefixes.add(prefix_of(formatted))
+            last_user = [message for message in formatted['messages'] if message['role'] == 'user'][-1]
+            missing_points += not (has_point(formatted.get('toolConfig', {}).get('tools'))
+                                   and has_point(formatted.get('system')) and has_point(last_user['content']))
+        reads = sum(request['cache_read_tokens'] for request in stub.requests)
+        writes = sum(request['cache_write_tokens'] for request in stub.requests)
+        stub_reads, stub_writes = stub_reads + reads, stub_writes + writes
+        prefix_tokens = max(len(prefix) // 4 for prefix in prefixes) if prefixes else 0
+        uncached = prefix_tokens * len(stub.requests)
+        cached = (reads * CACHE_READ_PRICE + writes * CACHE_WRITE_PRICE
+                  + (uncached - reads - writes))
+        problems = []
+        if len(prefixes) > 1:
+            problems.append(f"{len(prefixes)} different prefixes")
+        if missing_points:
+            problems.append(f"{missing_points} requests without all cache points")
+        note = "" if reads or writes else f"  (under {args.min_tokens} tokens: not cached)"
+        print(f"  {name:16s} {len(stub.requests):5d} {len(prefixes):8d} {prefix_tokens:10d} "
+              f"{len(stub.requests) - missing_points:3d}/{len(stub.requests):<3d} {writes:8d} {reads:8d} "
+              f"{cached / uncached if uncached else 1:11.0%}{note}"
+              + (f"  FAIL: {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+
+    tracked_reads = sum(turn['llm']['cache_read_tokens'] for turn in turns)
+    tracked_writes = sum(turn['llm']['cache_write_tokens'] for turn in turns)
+    tracked_calls = sum(len(turn['model_calls']) for turn in turns)
+    ok = (tracked_reads, tracked_writes) == (stub_reads, stub_writes)
+    print(f"  request_metrics: {len(turns)} turns, {tracked_calls} model calls, cache written {tracked_writes}, "
+          f"read {tracked_reads} tokens{'' if ok else f'  FAIL: stubs reported {stub_writes} / {stub_reads}'}")
+    print("  (prefix cost: the tool specs and system prompt of every call, relative to sending them uncached)")
+    failures += not ok
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
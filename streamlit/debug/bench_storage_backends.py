@@ -0,0 +1,104 @@
+"""
+Benchmark: the same family workload on each storage backend.
+
+    python debug/bench_storage_backends.py [transactions] [latency_ms]
+
+Runs a bulk import, a snapshot load, latest-10, one-month and date-range
+transaction queries and an account deletion against the in-memory, SQLite and local
+DynamoDB backends, checking that every backend returns the same results.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from bench_transaction_import import make_csv
+from account_deletion import delete_family_account
+from family_cache import family_cache
+from family_data import (
+    iter_family_items, iter_transactions, latest_transactions, load_family_snapshot, lookup_family_id
+)
+from storage import MemoryBackend, SQLiteBackend
+from transaction_import import import_transactions
+
+FAMILY_ID = "FAMBENCH"
+YEAR_MONTH = time.strftime('%Y-%m')
+
+
+def seed(storage):
+    storage.put('FamilyProfiles', {'family_id': FAMILY_ID, 'family_name': 'Bench Family',
+                                   'email': 'bench@example.com', 'total_monthly_income': Decimal('5800')})
+    storage.put('FamilyEmailIndex', {'email': 'bench@example.com', 'family_id': FAMILY_ID})
+    for category in ["Housing", "Food", "Transportation", "Utilities"]:
+        storage.put('BudgetAllocations', {
+            'family_id': FAMILY_ID, 'category_month': f"{category}#{YEAR_MONTH}", 'category': category,
+            'allocated_amount': Decimal('500'), 'spent_amount': Decimal('200'),
+            'remaining_amount': Decimal('300'), 'year_month': YEAR_MONTH
+        })
+    storage.put('FamilyAssets', {'family_id': FAMILY_ID, 'asset_type_id': 'Savings#SAV1',
+                                 'current_value': Decimal('8500'), 'liquidity': 'High'})
+
+
+def run_workload(storage, csv_text):
+    family_cache.clear()
+    timings = {}
+    results = {}
+
+    start = time.perf_counter()
+    seed(storage)
+    results['imported'] = import_transactions(storage, FAMILY_ID, io.StringIO(csv_text)).written
+    timings['import'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = load_family_snapshot(storage, FAMILY_ID, year_month=YEAR_MONTH)
+    results['snapshot'] = (snapshot.budget_totals(), len(snapshot.liquid_assets))
+    timings['snapshot'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    latest = latest_transactions(storage, FAMILY_ID, 10)
+    results['latest'] = [item['transaction_date_id'] for item in latest]
+    month = iter_transactions(storage, FAMILY_ID, month=YEAR_MONTH, attributes=['amount'])
+    results['month_total'] = sum(item['amount'] for item in month)
+    week = iter_transactions(storage, FAMILY_ID, start_date=f"{YEAR_MONTH}-01", end_date=f"{YEAR_MONTH}-07",
+                             attributes=['transaction_date'])
+    results['week_days'] = sorted({item['transaction_date'] for item in week})
+    results['login'] = lookup_family_id(storage, ' Bench@Example.com ')
+    timings['queries'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results['deleted'] = sum(delete_family_account(storage, FAMILY_ID).values())
+    results['left'] = len(list(iter_family_items(storage, 'ExpenseTransactions', FAMILY_ID)))
+    timings['delete'] = time.perf_counter() - start
+    return timings, results
+
+
+def main():
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    csv_text = make_csv(transactions)
+
+    runs = {}
+    runs['memory'] = run_workload(MemoryBackend(), csv_text)
+    with tempfile.TemporaryDirectory() as directory:
+        runs['sqlite'] = run_workload(SQLiteBackend(os.path.join(directory, 'bench.db')), csv_text)
+    with local_dynamodb() as dynamodb:
+        if latency_ms:
+            add_latency(dynamodb, latency_ms)
+        runs['dynamodb'] = run_workload(local_storage(dynamodb, latency_ms), csv_text)
+
+    print(f"{transactions:,} transactions, {latency_ms:.0f} ms simulated DynamoDB round trip")
+    print(f"{'backend':10s}" + "".join(f"{step:>12s}" for step in runs['memory'][0]))
+    for name, (timings, _) in runs.items():
+        print(f"{name:10s}" + "".join(f"{seconds * 1000:10.1f}ms" for seconds in timings.values()))
+
+    expected = runs['memory'][1]
+    for name, (_, results) in runs.items():
+        mismatched = [key for key in expected if results[key] != expected[key]]
+        print(f"{name:10s} {'matches memory' if not mismatched else 'DIFFERS: ' + ', '.join(mismatched)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: time to first token vs. total latency of a chat turn, per route.
+
+    python debug/bench_streaming.py [--first-token-s 0.8] [--token-s 0.02] [--words 150]
+
+Runs the real agents (query_router, master_agent, household_agent,
+emotional_agent) with their Bedrock models swapped for stub_model's
+ScriptedModel, so every model call waits `first_token-s` and then streams
+`words` words `token-s` apart; sub-agents answer without calling tools and
+heart-rate data comes from an in-memory backend. Each turn is started with
+query_router.start_answer and its stream read the way the chat reads it.
+"Blocking" is what the chat showed before: nothing until the whole turn is
+done. Also checks that the streamed text of single-agent turns is the
+final text, and that every turn streamed something.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+# Every turn runs its agents, as a repeated question would without query_router's answer cache
+os.environ.setdefault('ANSWER_CACHE_TTL_SECONDS', '0')
+
+from stub_model import ScriptedModel, text_reply, tool_reply
+
+import emotional_agent
+import household_agent
+import master_agent
+from heart_rate import HEART_RATE_MEMBER_ID
+from query_router import ROUTE_BOTH, ROUTE_EMOTIONAL, ROUTE_FINANCIAL, ROUTE_MASTER, router, start_answer
+from storage import MemoryBackend, set_storage
+
+MESSAGES = {
+    ROUTE_FINANCIAL: "Can we afford a $1,200 laptop for school?",
+    ROUTE_EMOTIONAL: "Am I stressed right now?",
+    ROUTE_BOTH: "I'm stressed about paying the mortgage",
+    ROUTE_MASTER: "What can you do?",
+}
+
+
+def words(label, count):
+    return " ".join(f"{label}{i}" for i in range(count))
+
+
+def install_models(args):
+    timing = {'first_token_s': args.first_token_s, 'token_s': args.token_s}
+    # The agent factories read these module globals on every build
+    household_agent.model = ScriptedModel([text_reply(words("fin", args.words))], **timing)
+    emotional_agent.emotional_model = ScriptedModel([text_reply(words("emo", args.words // 3))], **timing)
+
+    # The master calls the financial agent, then writes the reply from its result
+    def master_reply(messages, tool_specs, system_prompt):
+        last = messages[-1]['content'][0]
+        if 'toolResult' in last:
+            return text_reply(words("master", args.words))
+        return tool_reply("financial_agent", {"input": last.get('text', '')})
+
+    master_agent.model = ScriptedModel([master_reply], **timing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first token vs. total per route, stubbed models")
+    parser.add_argument('--first-token-s', type=float, default=0.8)
+    parser.add_argument('--token-s', type=float, default=0.02)
+    parser.add_argument('--words', type=int, default=150)
+    args = parser.parse_args()
+
+    storage = MemoryBackend()
+    now = int(time.time())
+    for second in range(10):
+        storage.put('HeartRateSamples', {'member_id': HEART_RATE_MEMBER_ID, 'epoch': now - second,
+                                         'bpm': 72, 'confidence': 2})
+    set_storage(storage)
+    install_models(args)
+    router.parallel = True
+
+    failures = 0
+    print(f"model: first token after {args.first_token_s:.1f} s, then {args.words} words {args.token_s * 1000:.0f} ms apart")
+    print(f"  {'route':10s} {'first token':>11s} {'total':>7s} {'blocking':>9s}  chunks")
+    for target, message in MESSAGES.items():
+        turn = start_answer(message, "FAMSTREAM")
+        chunks = list(turn)
+        answer = turn.result()
+        streamed = "".join(text for _, text in chunks)
+        problems = []
+        if answer.route.target != target:
+            problems.append(f"routed to {answer.route.target}")
+        if not chunks or answer.first_token_ms is None:
+            problems.append("nothing streamed")
+        if target in (ROUTE_FINANCIAL, ROUTE_EMOTIONAL) and streamed.strip() != answer.text.strip():
+            problems.append("streamed text differs from the answer")
+        sources = sorted({source for source, _ in chunks})
+        print(f"  {target:10s} {(answer.first_token_ms or 0) / 1000:10.2f}s {answer.duration_ms / 1000:6.2f}s "
+              f"{answer.duration_ms / 1000:8.2f}s  {len(chunks)} from {', '.join(sources)}"
+              f"{'  FAIL: ' + '; '.join(problems) if problems else ''}")
+        failures += bool(problems)
+    print("  (blocking: the whole turn passes before anything shows, so first token = total)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
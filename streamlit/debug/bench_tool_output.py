@@ -0,0 +1,160 @@
+"""
+Benchmark: tokens in the finance tools' results, per tool and per agent turn.
+
+    python debug/bench_tool_output.py [--baseline debug/tool_output_baseline.json] [--save FILE]
+
+Seeds three representative families in an in-memory backend (small: 3
+budget categories, 1 goal, 1 asset, 7 transactions this month; typical: 8,
+4, 5 and 60; large: 20, 10, 12 and 300) and calls every household_agent
+tool the way the finance agent does. Tokens are estimated at
+CHARS_PER_TOKEN characters a token.
+
+"Turn" is what the results cost the agent over a typical spending question
+(TURN_TOOLS, called one per cycle): a result is re-sent with every later
+model call, so the n-th of k results is sent k - n + 1 times.
+
+With --baseline, each count is compared to the saved one; the baseline
+shipped next to this script was saved from the tools as they were before
+tool_output.py (indent=2 JSON of whole rows). --save writes this run's
+counts. Fails if any tool result is over its cap in
+household_agent.TOOL_OUTPUT_CAPS, when that exists.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+
+from budget_rollups import rebuild_family_rollups
+from conversation import CHARS_PER_TOKEN
+from family_cache import family_cache
+from storage import MemoryBackend, set_storage
+import household_agent
+
+YEAR_MONTH = datetime.now().strftime('%Y-%m')
+CATEGORIES = ["Housing", "Food", "Transportation", "Utilities", "Healthcare", "Education", "Entertainment",
+              "Savings", "Insurance", "Childcare", "Clothing", "Personal Care", "Gifts", "Travel", "Pets",
+              "Subscriptions", "Home Maintenance", "Dining Out", "Sports", "Charity"]
+GOALS = ["Emergency Fund", "College Fund", "House Down Payment", "Retirement Top-up", "New Car", "Family Vacation",
+         "Home Renovation", "Wedding", "Debt Payoff", "Laptop Upgrade"]
+ASSETS = [("Checking Account", "Checking", "High"), ("Savings Account", "Savings", "High"),
+          ("Fixed Deposit", "Fixed Deposit", "Medium"), ("Brokerage", "Investment", "Medium"),
+          ("CPF Ordinary", "Retirement", "Low"), ("Money Market Fund", "Savings", "High"),
+          ("Bond Ladder", "Investment", "Medium"), ("Gold", "Commodity", "Low"),
+          ("Second Savings", "Savings", "High"), ("Child Trust", "Savings", "Low"),
+          ("Crypto Wallet", "Investment", "Low"), ("Cash Reserve", "Cash", "High")]
+FAMILIES = {"small": (3, 1, 1, 7), "typical": (8, 4, 5, 60), "large": (20, 10, 12, 300)}
+TURN_TOOLS = ("get_family_financial_overview", "check_spending_capacity", "get_alternative_funding_sources",
+              "assess_goal_impact")
+
+
+def seed(storage, family_id, categories, goals, assets, transactions):
+    storage.put('FamilyProfiles', {
+        'family_id': family_id, 'family_name': f"{family_id.title()} Family",
+        'total_monthly_income': Decimal('8200'), 'family_size': 4, 'location': 'Singapore',
+        'risk_tolerance': 'Moderate', 'email': f"{family_id.lower()}@example.com",
+        'password': '$2b$12$' + 'x' * 53, 'created_at': '2026-01-04T09:12:44.120931Z',
+        'updated_at': '2026-09-30T18:02:11.553120Z'
+    })
+    for index, category in enumerate(CATEGORIES[:categories]):
+        allocated = Decimal(300 + 150 * (index % 7))
+        spent = (allocated * Decimal('0.37') * (index % 4 + 1)).quantize(Decimal('0.01'))
+        storage.put('BudgetAllocations', {
+            'family_id': family_id, 'category_month': f"{category}#{YEAR_MONTH}", 'category': category,
+            'allocated_amount': allocated, 'spent_amount': spent, 'remaining_amount': allocated - spent,
+            'year_month': YEAR_MONTH, 'created_at': '2026-10-01T00:00:00Z'
+        })
+    for index, goal in enumerate(GOALS[:goals]):
+        storage.put('FinancialGoals', {
+            'family_id': family_id, 'goal_id': f"GOAL{index:04d}", 'goal_name': goal,
+            'target_amount': Decimal(5000 * (index + 2)), 'current_amount': Decimal(1250 * (index + 1)),
+            'monthly_allocation': Decimal(150 + 50 * index), 'priority': index % 5 + 1,
+            'status': 'Completed' if index == 3 else 'Active', 'target_date': f"{2027 + index % 4}-12-31"
+        })
+    for index, (name, asset_type, liquidity) in enumerate(ASSETS[:assets]):
+        storage.put('FamilyAssets', {
+            'family_id': family_id, 'asset_type_id': f"{asset_type}#A{index:05d}", 'asset_name': name,
+            'asset_type': asset_type, 'current_value': Decimal(2500 * (index + 1)) + Decimal('0.55'),
+            'liquidity': liquidity, 'last_updated': '2026-10-01T00:00:00Z'
+        })
+    first_day = datetime.strptime(f"{YEAR_MONTH}-01", '%Y-%m-%d')
+    for index in range(transactions):
+        day = first_day + timedelta(days=index * 27 // max(transactions, 1))
+        category = CATEGORIES[index % categories]
+        storage.put('ExpenseTransactions', {
+            'family_id': family_id, 'transaction_date_id': f"{day:%Y-%m-%d}#TXN{index:06d}",
+            'amount': Decimal(12 + (index * 37) % 180) + Decimal('0.45'), 'category': category,
+            'description': f"{category} purchase at store {index % 13}",
+            'transaction_date': f"{day:%Y-%m-%d}", 'family_member': f"Parent{index % 2 + 1}",
+            'created_at': f"{day:%Y-%m-%d}T12:00:00Z"
+        })
+    rebuild_family_rollups(storage, family_id)
+
+
+def tool_calls(family_id):
+    return {
+        "get_family_financial_overview": lambda: household_agent.get_family_financial_overview(family_id),
+        "check_spending_capacity": lambda: household_agent.check_spending_capacity(family_id, 1200.0, "Education"),
+        "get_alternative_funding_sources": lambda: household_agent.get_alternative_funding_sources(family_id, 1200.0),
+        "assess_goal_impact": lambda: household_agent.assess_goal_impact(family_id, 1200.0),
+        "get_recent_transactions (latest 10)": lambda: household_agent.get_recent_transactions(family_id),
+        "get_recent_transactions (month, 50)": lambda: household_agent.get_recent_transactions(family_id, YEAR_MONTH, 50),
+        "calculate_budget": lambda: household_agent.calculate_budget(8200.0),
+    }
+
+
+def turn_tokens(counts):
+    return sum(counts[name] * (len(TURN_TOOLS) - index) for index, name in enumerate(TURN_TOOLS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens in the finance tools' results")
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(__file__), 'tool_output_baseline.json'))
+    parser.add_argument('--save')
+    args = parser.parse_args()
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    caps = getattr(household_agent, 'TOOL_OUTPUT_CAPS', {})
+
+    storage = MemoryBackend()
+    for family, sizes in FAMILIES.items():
+        seed(storage, family.upper(), *sizes)
+    set_storage(storage)
+
+    results, failures = {}, 0
+    print(f"tokens per tool result ({CHARS_PER_TOKEN} chars/token){'; before -> after' if baseline else ''}")
+    for family, sizes in FAMILIES.items():
+        family_cache.clear()
+        counts = {}
+        print(f"{family} family ({sizes[0]} categories, {sizes[1]} goals, {sizes[2]} assets, {sizes[3]} transactions)")
+        for name, call in tool_calls(family.upper()).items():
+            output = str(call())
+            counts[name] = len(output) // CHARS_PER_TOKEN
+            before = baseline.get(family, {}).get(name)
+            cap = caps.get(name.split(" ")[0])
+            over = cap is not None and counts[name] > cap
+            failures += over or output.startswith("❌")
+            change = f"{before:6d} -> {counts[name]:5d}  {1 - counts[name] / before:4.0%} fewer" if before else f"{counts[name]:6d}"
+            print(f"  {name:38s} {change}{f'  (cap {cap})' if cap else ''}"
+                  f"{'  FAIL: over cap' if over else ''}{'  FAIL: ' + output if output.startswith('❌') else ''}")
+        counts['turn'] = turn_tokens(counts)
+        before = baseline.get(family, {}).get('turn')
+        print(f"  {'turn (' + str(len(TURN_TOOLS)) + ' tools, one per cycle)':38s} "
+              + (f"{before:6d} -> {counts['turn']:5d}  {1 - counts['turn'] / before:4.0%} fewer" if before
+                 else f"{counts['turn']:6d}"))
+        results[family] = counts
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: bulk transaction import throughput.
+
+    python debug/bench_transaction_import.py [rows] [workers] [latency_ms]
+
+Generates a bank-export style CSV in memory and imports it into the local
+stand-in, reporting validation time and write throughput in items/s.
+"""
+import io
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from local_dynamodb import local_dynamodb, add_latency, local_storage
+from transaction_import import (
+    EXPENSE_CATEGORIES, import_transactions, read_transactions_file, validate_transactions
+)
+
+FAMILY_ID = "FAMBENCH"
+
+
+def make_csv(rows):
+    random.seed(7)
+    start = date.today() - timedelta(days=365)
+    lines = ["Date,Description,Amount,Category"]
+    for i in range(rows):
+        day = start + timedelta(days=random.randrange(365))
+        lines.append(f"{day.isoformat()},Purchase {i},-{random.uniform(1, 400):.2f},"
+                     f"{random.choice(EXPENSE_CATEGORIES)}")
+    return "\n".join(lines)
+
+
+def count_items(table):
+    scan_kwargs = {'Select': 'COUNT'}
+    total = 0
+    while True:
+        response = table.scan(**scan_kwargs)
+        total += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return total
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    csv_text = make_csv(rows)
+
+    start = time.perf_counter()
+    valid, rejected = validate_transactions(read_transactions_file(io.StringIO(csv_text)))
+    print(f"Validated {len(valid):,} rows ({len(rejected)} rejected) in {time.perf_counter() - start:.2f}s")
+
+    with local_dynamodb() as dynamodb:
+        if latency_ms:
+            add_latency(dynamodb, latency_ms)
+        result = import_transactions(local_storage(dynamodb), FAMILY_ID, io.StringIO(csv_text), workers=workers)
+        stored = count_items(dynamodb.Table('ExpenseTransactions'))
+
+    print(f"Imported {result.written:,} transactions with {workers} workers in {result.seconds:.1f}s "
+          f"({result.items_per_second:,.0f} items/s); {stored:,} rows in the table")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Check that rollups maintained on write match a rebuild from the raw tables.
+
+    python debug/check_budget_rollups.py [writes] [--workers 8]
+
+Saves random budget allocations (including overwrites of existing rows) and
+expenses the way streamlit.py does, from several threads at once, on the
+in-memory, SQLite and local DynamoDB backends, then checks that every
+budget row has remaining = allocated - spent and compares every monthly
+rollup with what rebuild_family_rollups computes from the rows. Then a row
+is left with a wrong remaining (as a budget save that died halfway used to)
+and rebuild_family_rollups must correct both the row and its rollup, and a
+month whose rollup item is missing must read as the sums of its rows. Also times
+reading one month's totals as a rollup get vs. summing the budget rows.
+moto does not serialize concurrent updates of one item the way DynamoDB
+does, so the local DynamoDB run writes from a single thread.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_dynamodb import local_dynamodb, local_storage
+from budget_rollups import (
+    BUDGET_TABLE, ROLLUP_TABLE, _compute_rollups, read_rollup, rebuild_family_rollups, save_budget, save_expense
+)
+from storage import MemoryBackend, SQLiteBackend
+
+FAMILY_ID = "FAMROLLUP"
+MONTHS = ["2026-08", "2026-09", "2026-10"]
+CATEGORIES = ["Housing", "Food", "Transportation", "Utilities", "Entertainment"]
+
+
+def write_budget(storage, rng):
+    year_month = rng.choice(MONTHS)
+    category = rng.choice(CATEGORIES)
+    allocated = Decimal(rng.randint(100, 2000))
+    untracked = Decimal(rng.choice([0, rng.randint(0, 10000)])) / 100
+    save_budget(storage, FAMILY_ID, category, year_month, allocated, untracked)
+
+
+def write_expense(storage, rng, i):
+    day = f"{rng.choice(MONTHS)}-{rng.randint(1, 28):02d}"
+    amount = Decimal(rng.randint(100, 40000)) / 100
+    save_expense(storage, {
+        'family_id': FAMILY_ID, 'transaction_date_id': f"{day}#TXN{i:06d}",
+        'amount': amount, 'category': rng.choice(CATEGORIES), 'transaction_date': day
+    })
+
+
+def check_rows(storage):
+    return [
+        f"{row['category_month']}: remaining {row.get('remaining_amount')}, "
+        f"allocated {row.get('allocated_amount')} - spent {row.get('spent_amount')}"
+        for row in storage.query(BUDGET_TABLE, FAMILY_ID)
+        if row.get('remaining_amount', 0) != row.get('allocated_amount', 0) - row.get('spent_amount', 0)
+    ]
+
+
+def check_rollups(storage):
+    problems = []
+    for year_month, rebuilt in _compute_rollups(storage, FAMILY_ID).items():
+        stored = storage.get(ROLLUP_TABLE, {'family_id': FAMILY_ID, 'year_month': year_month}) or {}
+        for name, value in rebuilt.items():
+            # Attributes no write has touched yet are simply absent (= 0)
+            if name != 'updated_at' and stored.get(name, 0) != value:
+                problems.append(f"{year_month} {name}: stored {stored.get(name)}, rebuilt {value}")
+    return problems
+
+
+def run(storage, writes, workers):
+    def write(i):
+        rng = random.Random(i)
+        if rng.random() < 0.5:
+            write_budget(storage, rng)
+        else:
+            write_expense(storage, rng, i)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(write, range(writes)))
+
+    problems = check_rows(storage) + check_rollups(storage)
+
+    # A row whose remaining is off, then the rebuild job
+    row = next(iter(storage.query(BUDGET_TABLE, FAMILY_ID)))
+    storage.update(BUDGET_TABLE, {'family_id': FAMILY_ID, 'category_month': row['category_month']},
+                   add_values={'remaining_amount': Decimal(123)})
+    rebuild_family_rollups(storage, FAMILY_ID)
+    problems += [f"after rebuild: {problem}" for problem in check_rows(storage) + check_rollups(storage)]
+
+    # A month whose rows predate rollups must read as its rows' sums, not zeros
+    year_month = MONTHS[0]
+    expected = read_rollup(storage, FAMILY_ID, year_month)
+    storage.delete(ROLLUP_TABLE, {'family_id': FAMILY_ID, 'year_month': year_month})
+    missing = read_rollup(storage, FAMILY_ID, year_month)
+    problems += [
+        f"without a rollup item: {year_month} {name} read {missing.get(name)}, rollup had {value}"
+        for name, value in expected.items() if name != 'updated_at' and missing.get(name, 0) != value
+    ]
+
+    year_month = MONTHS[-1]
+    start = time.perf_counter()
+    read_rollup(storage, FAMILY_ID, year_month)['total_allocated']
+    rollup_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    sum(item['allocated_amount'] for item in storage.query('BudgetAllocations', FAMILY_ID, numbers=float)
+        if item['year_month'] == year_month)
+    rows_ms = (time.perf_counter() - start) * 1000
+    return problems, rollup_ms, rows_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('writes', type=int, nargs='?', default=400)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    failures = 0
+
+    def report(name, result):
+        nonlocal failures
+        problems, rollup_ms, rows_ms = result
+        print(f"{'FAIL' if problems else 'ok  '} {name:9s} month totals: rollup get {rollup_ms:6.2f} ms, "
+              f"summing rows {rows_ms:6.2f} ms")
+        for problem in problems[:10]:
+            print(f"     {problem}")
+        failures += bool(problems)
+
+    report('memory', run(MemoryBackend(), args.writes, args.workers))
+    with tempfile.TemporaryDirectory() as directory:
+        report('sqlite', run(SQLiteBackend(os.path.join(directory, 'rollups.db')), args.writes, args.workers))
+    with local_dynamodb() as dynamodb:
+        report('dynamodb', run(local_storage(dynamodb), args.writes, 1))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Check the query router's decisions on labelled chat messages.
+
+    python debug/check_query_router.py
+
+Classifies each message with query_router's keyword classifier (no model
+calls) and compares it with the expected route: clearly financial and
+clearly emotional messages must skip MasterAgent, mixed ones must run both
+sub-agents side by side (ORCHESTRATION_MODE=parallel, the default; with
+sequential they go to MasterAgent) and unclear ones must go to MasterAgent.
+Misrouting a clear message only costs the savings, but sending a mixed or
+unclear one to a single sub-agent loses part of the answer, so those fail
+the check. Also prints the classification time and the MasterAgent
+model calls the sample would save at query_router.MASTER_CALLS_DEFAULT per
+routed turn. Set ROUTER_EMBEDDING_MODEL to also exercise the embedding
+fallback (needs Bedrock access).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_router import MASTER_CALLS_DEFAULT, ROUTE_BOTH, ROUTE_EMOTIONAL, ROUTE_FINANCIAL, ROUTE_MASTER, router
+
+# Messages that need both sub-agents: run side by side in parallel mode, else through the master
+ROUTE_MIXED = ROUTE_BOTH if router.parallel else ROUTE_MASTER
+
+MESSAGES = [
+    ("My spouse suggests upgrading our family phone plan to a premium package that costs $100 more "
+     "per month. Should we make this change?", ROUTE_FINANCIAL),
+    ("Can we afford a $1,200 laptop for school?", ROUTE_FINANCIAL),
+    ("How much is left in our food budget?", ROUTE_FINANCIAL),
+    ("What did we spend on entertainment this month?", ROUTE_FINANCIAL),
+    ("Show me our last 10 transactions", ROUTE_FINANCIAL),
+    ("Will a vacation delay our emergency fund goal?", ROUTE_FINANCIAL),
+    ("Should we pay off the credit card bill or keep the cash?", ROUTE_FINANCIAL),
+    ("Is it a good idea to buy a used car for 8000 dollars?", ROUTE_FINANCIAL),
+    ("Where can I find money for the kids' tuition?", ROUTE_FINANCIAL),
+    ("Our rent goes up next month, what should we cut?", ROUTE_FINANCIAL),
+    ("Do you know if I'm stressed right now?", ROUTE_EMOTIONAL),
+    ("What's my heart rate?", ROUTE_EMOTIONAL),
+    ("I feel overwhelmed today", ROUTE_EMOTIONAL),
+    ("How can I calm down before the meeting?", ROUTE_EMOTIONAL),
+    ("I'm so tired and anxious lately", ROUTE_EMOTIONAL),
+    ("Is my pulse normal?", ROUTE_EMOTIONAL),
+    ("I'm stressed about paying the mortgage", ROUTE_MIXED),
+    ("I feel guilty about how much we spent on clothes", ROUTE_MIXED),
+    ("Worried we can't afford the dentist", ROUTE_MIXED),
+    ("Hi!", ROUTE_MASTER),
+    ("What can you do?", ROUTE_MASTER),
+    ("Tell me more about the second option", ROUTE_MASTER),
+]
+
+# Wrong routes that drop part of the answer (a mixed or unclear message sent to one
+# sub-agent), or skip the master on an unclear message
+HARMFUL = {(ROUTE_MASTER, ROUTE_FINANCIAL), (ROUTE_MASTER, ROUTE_EMOTIONAL), (ROUTE_MASTER, ROUTE_BOTH),
+           (ROUTE_BOTH, ROUTE_FINANCIAL), (ROUTE_BOTH, ROUTE_EMOTIONAL),
+           (ROUTE_FINANCIAL, ROUTE_EMOTIONAL), (ROUTE_EMOTIONAL, ROUTE_FINANCIAL)}
+
+
+def main():
+    failures = 0
+    missed = 0
+    routed = 0
+    print(f"{'expected':10s} {'routed':10s} {'method':10s} {'fin':>4s} {'emo':>4s}  message")
+    for message, expected in MESSAGES:
+        route = router.classify(message)
+        routed += route.target != ROUTE_MASTER
+        if route.target == expected:
+            verdict = ""
+        elif (expected, route.target) in HARMFUL:
+            verdict = "  FAIL"
+            failures += 1
+        else:
+            verdict = "  missed"
+            missed += 1
+        print(f"{expected:10s} {route.target:10s} {route.method:10s} {route.financial_score:4.0f} "
+              f"{route.emotional_score:4.0f}  {message[:60]}{verdict}")
+
+    rounds = 2000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message, _ in MESSAGES:
+            router.classify(message)
+    per_message_us = (time.perf_counter() - start) / (rounds * len(MESSAGES)) * 1e6
+
+    print()
+    print(f"{routed} of {len(MESSAGES)} messages skip MasterAgent, saving ~{routed * MASTER_CALLS_DEFAULT} "
+          f"model calls ({routed * MASTER_CALLS_DEFAULT / len(MESSAGES):.2f} per turn); "
+          f"{missed} clear messages left to the master, {failures} misrouted")
+    print(f"classification: {per_message_us:.1f} us per message")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Check which attributes each finance tool pulls from storage.
+
+    python debug/check_tool_projections.py
+
+Runs every household_agent tool against an in-memory backend that records
+the projection of each read, and fails if a tool fetches full items or
+attributes other than the ones listed in EXPECTED_READS. Update both the
+tool's *_READS declaration and this table when a tool starts reading a new
+field.
+"""
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from budget_rollups import rebuild_family_rollups
+from family_cache import family_cache
+from storage import MemoryBackend, set_storage
+import household_agent
+
+FAMILY_ID = "FAMCHECK"
+YEAR_MONTH = datetime.now().strftime('%Y-%m')
+
+# tool -> {table: attributes fetched}; None = full items
+EXPECTED_READS = {
+    "get_family_financial_overview": {
+        "FamilyProfiles": {"family_name", "family_size", "location", "risk_tolerance", "total_monthly_income"},
+        "BudgetRollups": None,
+        "FinancialGoals": {"goal_name", "priority", "target_amount", "current_amount", "monthly_allocation",
+                           "target_date", "status"},
+        "FamilyAssets": {"asset_name", "asset_type", "current_value", "liquidity"},
+    },
+    "check_spending_capacity": {
+        "BudgetAllocations": {"category", "allocated_amount", "spent_amount", "remaining_amount", "category_month"},
+        "FamilyAssets": {"current_value", "liquidity"},
+    },
+    "get_alternative_funding_sources": {
+        "BudgetAllocations": {"category", "remaining_amount", "category_month"},
+        "FamilyAssets": {"asset_name", "asset_type", "current_value", "liquidity"},
+    },
+    "assess_goal_impact": {
+        "FinancialGoals": {"goal_name", "priority", "target_amount", "current_amount", "monthly_allocation", "status"},
+    },
+    "get_recent_transactions": {
+        "ExpenseTransactions": {"transaction_date", "amount", "category", "description"},
+    },
+}
+
+TOOL_CALLS = {
+    "get_family_financial_overview": lambda: household_agent.get_family_financial_overview(FAMILY_ID),
+    "check_spending_capacity": lambda: household_agent.check_spending_capacity(FAMILY_ID, 250.0, "Food"),
+    "get_alternative_funding_sources": lambda: household_agent.get_alternative_funding_sources(FAMILY_ID, 1000.0),
+    "assess_goal_impact": lambda: household_agent.assess_goal_impact(FAMILY_ID, 1500.0),
+    "get_recent_transactions": lambda: household_agent.get_recent_transactions(FAMILY_ID, YEAR_MONTH, 5),
+}
+
+
+class RecordingBackend(MemoryBackend):
+    """MemoryBackend that remembers the projection of every read."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = {}
+
+    def _record(self, table_name, attributes):
+        self.reads[table_name] = set(attributes) if attributes else None
+
+    def get(self, table_name, key, attributes=None, numbers=Decimal):
+        self._record(table_name, attributes)
+        return super().get(table_name, key, attributes, numbers)
+
+    def query(self, table_name, partition_value, attributes=None, **kwargs):
+        self._record(table_name, attributes)
+        return super().query(table_name, partition_value, attributes=attributes, **kwargs)
+
+
+def seed(storage):
+    storage.put('FamilyProfiles', {'family_id': FAMILY_ID, 'family_name': 'Check Family',
+                                   'total_monthly_income': Decimal('5800'), 'family_size': 4})
+    for category in ["Housing", "Food", "Entertainment"]:
+        storage.put('BudgetAllocations', {
+            'family_id': FAMILY_ID, 'category_month': f"{category}#{YEAR_MONTH}", 'category': category,
+            'allocated_amount': Decimal('500'), 'spent_amount': Decimal('200'),
+            'remaining_amount': Decimal('300'), 'year_month': YEAR_MONTH
+        })
+    storage.put('FinancialGoals', {
+        'family_id': FAMILY_ID, 'goal_id': 'GOAL1', 'goal_name': 'Emergency Fund',
+        'target_amount': Decimal('10000'), 'current_amount': Decimal('2500'),
+        'monthly_allocation': Decimal('400'), 'priority': 1, 'status': 'Active',
+        'target_date': '2027-12-31'
+    })
+    storage.put('FamilyAssets', {
+        'family_id': FAMILY_ID, 'asset_type_id': 'Savings#SAV1', 'asset_name': 'Savings',
+        'asset_type': 'Savings', 'current_value': Decimal('8500'), 'liquidity': 'High',
+        'last_updated': '2026-01-01T00:00:00Z'
+    })
+    for day in range(1, 8):
+        storage.put('ExpenseTransactions', {
+            'family_id': FAMILY_ID, 'transaction_date_id': f"{YEAR_MONTH}-{day:02d}#TXN{day:06d}",
+            'amount': Decimal('42.50'), 'category': 'Food', 'description': f"Groceries {day}",
+            'transaction_date': f"{YEAR_MONTH}-{day:02d}", 'family_member': 'Parent1'
+        })
+    rebuild_family_rollups(storage, FAMILY_ID)
+
+
+def main():
+    failures = 0
+    for tool_name, call in TOOL_CALLS.items():
+        storage = RecordingBackend()
+        seed(storage)
+        storage.reads.clear()
+        set_storage(storage)
+        family_cache.clear()
+
+        output = str(call())
+        problems = []
+        if output.startswith("❌"):
+            problems.append(f"tool failed: {output}")
+        if storage.reads != EXPECTED_READS[tool_name]:
+            problems.append(f"read {storage.reads}, expected {EXPECTED_READS[tool_name]}")
+
+        print(f"{'FAIL' if problems else 'ok  '} {tool_name}")
+        for problem in problems:
+            print(f"     {problem}")
+        failures += bool(problems)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Check transaction_import on bank-export files that used to break it.
+
+    python debug/check_transaction_import.py
+
+Imports small CSVs into the in-memory backend and checks what was written
+and what was rejected:
+
+    all rejected   every row fails validation; nothing is written, no crash
+    mixed dates    ISO, US and spelled-out dates in one file; every row is
+                   kept, with its own date, and only the garbage date rejected
+    reimport       the mixed file again; the same transactions, no duplicates
+
+Exits 1 if a check fails.
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemoryBackend
+from transaction_import import import_transactions
+
+FAMILY_ID = "FAMIMPORT"
+
+ALL_REJECTED = """Date,Description,Amount
+not a date,Groceries,-42.10
+2026-04-02,,-12.00
+2026-04-03,Refund,abc
+2026-04-04,Zero,0
+"""
+
+MIXED_DATES = """Date,Description,Amount,Category
+2026-04-01,Rent,-1500.00,Housing
+04/02/2026,Groceries,-84.20,Food
+4/3/2026,Bus pass,-60,Transportation
+Apr 4 2026,Cinema,-24.50,Entertainment
+2026-04-05 08:30:00,Pharmacy,-12.99,Healthcare
+someday,Mystery,-5,Other
+"""
+MIXED_EXPECTED = {
+    "Rent": "2026-04-01", "Groceries": "2026-04-02", "Bus pass": "2026-04-03",
+    "Cinema": "2026-04-04", "Pharmacy": "2026-04-05",
+}
+
+
+def stored(storage):
+    return {item['description']: item['transaction_date']
+            for item in storage.query('ExpenseTransactions', FAMILY_ID)}
+
+
+def check_all_rejected(storage):
+    result = import_transactions(storage, FAMILY_ID, io.StringIO(ALL_REJECTED))
+    problems = []
+    if result.written or stored(storage):
+        problems.append(f"wrote {result.written} transactions")
+    if len(result.rejected) != result.rows_read:
+        problems.append(f"rejected {len(result.rejected)} of {result.rows_read} rows")
+    return problems
+
+
+def check_mixed_dates(storage):
+    result = import_transactions(storage, FAMILY_ID, io.StringIO(MIXED_DATES))
+    problems = []
+    if stored(storage) != MIXED_EXPECTED:
+        problems.append(f"stored {stored(storage)}")
+    if list(result.rejected['description']) != ["Mystery"]:
+        problems.append(f"rejected {list(result.rejected['description'])}")
+    return problems
+
+
+def check_reimport(storage):
+    before = len(list(storage.query('ExpenseTransactions', FAMILY_ID)))
+    import_transactions(storage, FAMILY_ID, io.StringIO(MIXED_DATES))
+    after = len(list(storage.query('ExpenseTransactions', FAMILY_ID)))
+    return [f"{before} transactions became {after}"] if after != before else []
+
+
+def main():
+    failures = 0
+    storage = MemoryBackend()
+    for name, check in (("all rejected", check_all_rejected), ("mixed dates", check_mixed_dates),
+                        ("reimport", check_reimport)):
+        try:
+            problems = check(storage)
+        except Exception as e:
+            problems = [f"{type(e).__name__}: {e}"]
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for problem in problems:
+            print(f"     {problem}")
+        failures += bool(problems)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
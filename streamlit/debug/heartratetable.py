@@ -1,130 +1,82 @@
-import boto3
-import json
-import sys
-import os
+"""
+Load a Fitbit heart-rate export into HeartRateSamples and look up a sample.
+
+    python debug/heartratetable.py <member_id> <json_file> ["MM/DD/YY HH:MM:SS"] [--create-table]
+
+Samples are stored under (member_id, epoch); see heart_rate.py. Loading
+goes through heart_rate_import.py (streaming, resumable); use that CLI
+directly for large exports. Load heartrate.json as member "normal" and
+heartratestressed.json as "stressed", then pick one for the emotional agent
+with HEART_RATE_MEMBER_ID.
+"""
+import argparse
 import datetime
+import os
+import sys
 
-def create_dynamodb_table(table_name, key_name, region='us-east-1'):
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    existing_tables = [table.name for table in dynamodb.tables.all()]
-    if table_name in existing_tables:
-        print(f"Table '{table_name}' already exists.")
-        return dynamodb.Table(table_name)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from heart_rate import FITBIT_TIME_FORMAT, fitbit_epoch, format_epoch, nearest_sample
+from heart_rate_import import load_heart_rate
+from storage import HEART_RATE_TABLE, get_storage
+
+
+def create_heart_rate_table(dynamodb):
+    existing_tables = dynamodb.meta.client.list_tables()['TableNames']
+    if HEART_RATE_TABLE in existing_tables:
+        print(f"Table '{HEART_RATE_TABLE}' already exists.")
+        return
     table = dynamodb.create_table(
-        TableName=table_name,
+        TableName=HEART_RATE_TABLE,
         KeySchema=[
-            {'AttributeName': key_name, 'KeyType': 'HASH'}
+            {'AttributeName': 'member_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'epoch', 'KeyType': 'RANGE'},
         ],
         AttributeDefinitions=[
-            {'AttributeName': key_name, 'AttributeType': 'S'}
+            {'AttributeName': 'member_id', 'AttributeType': 'S'},
+            {'AttributeName': 'epoch', 'AttributeType': 'N'},
         ],
-        ProvisionedThroughput={
-            'ReadCapacityUnits': 5,
-            'WriteCapacityUnits': 5
-        }
+        BillingMode='PAY_PER_REQUEST'
     )
     table.wait_until_exists()
-    print(f"Table '{table_name}' created.")
-    return table
+    print(f"Table '{HEART_RATE_TABLE}' created.")
 
-def upload_json_to_table(table, json_file, key_name):
+
+def upload_json_to_table(storage, json_file, member_id):
     if not os.path.isfile(json_file):
         print(f"File '{json_file}' not found.")
         return
-    with open(json_file, 'r') as f:
-        data = json.load(f)
-    if isinstance(data, dict):
-        items = [data]
-    elif isinstance(data, list):
-        items = data
-    else:
-        print("JSON file must contain an object or a list of objects.")
-        return
-    for item in items:
-        if key_name not in item:
-            print(f"Item missing key '{key_name}': {item}")
-            continue
-        table.put_item(Item=item)
-    print(f"Uploaded {len(items)} items to table '{table.name}'.")
+    result = load_heart_rate(storage, member_id, json_file)
+    print(f"Uploaded {result.written} samples for member '{member_id}' to table '{HEART_RATE_TABLE}' "
+          f"({result.samples_per_second:,.0f} samples/s).")
 
-# ...existing code...
 
-def get_item_by_key(table, key_name, key_value):
-    response = table.get_item(Key={key_name: key_value})
-    item = response.get('Item')
+def get_item_by_nearest_time(storage, member_id, date_time):
+    """The member's sample closest to `date_time` ("MM/DD/YY HH:MM:SS"), via two Limit-1 key queries."""
+    item = nearest_sample(storage, member_id, fitbit_epoch(date_time))
     if item:
-        print(f"Item found: {item}")
-        return item
+        print(f"Closest item found at {format_epoch(item['epoch'])}: {item}")
     else:
-        print(f"No item found with {key_name} = {key_value}")
-        return None
-
-
-
-
-def get_item_by_nearest_key(table, key_name, key_value):
-    """
-    Iterates through all items in the table and finds the item whose key is closest
-    (by string comparison) to the input key_value.
-    """
-    closest_item = None
-    closest_diff = None
+        print(f"No samples found for member '{member_id}'.")
+    return item
 
-    scan_kwargs = {}
-    done = False
-    start_key = None
 
-    while not done:
-        if start_key:
-            scan_kwargs['ExclusiveStartKey'] = start_key
-        response = table.scan(**scan_kwargs)
-        items = response.get('Items', [])
-        for item in items:
-            item_key = item.get(key_name)
-            if item_key is not None:
-                # Use string comparison: absolute difference in Unicode code points
-                diff = abs(ord(item_key[0]) - ord(key_value[0]))
-                if closest_diff is None or diff < closest_diff:
-                    closest_diff = diff
-                    closest_item = item
-        start_key = response.get('LastEvaluatedKey', None)
-        done = start_key is None
-
-    if closest_item:
-        print(f"Closest item found: {closest_item}")
-        return closest_item
-    else:
-        print(f"No items found in table for key '{key_name}'.")
-        return None
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load Fitbit heart-rate samples and find the one nearest a time")
+    parser.add_argument('member_id')
+    parser.add_argument('json_file')
+    parser.add_argument('date_time', nargs='?', help=f"Time to look up ({FITBIT_TIME_FORMAT}), default today's time on 02/20/25")
+    parser.add_argument('--create-table', action='store_true', help=f"Create the DynamoDB {HEART_RATE_TABLE} table if missing")
+    args = parser.parse_args()
 
+    if args.create_table:
+        from aws_clients import get_dynamodb
+        create_heart_rate_table(get_dynamodb())
 
-# ...existing code...
+    storage = get_storage()
+    upload_json_to_table(storage, args.json_file, args.member_id)
 
-if __name__ == "__main__":
-    print(len(sys.argv))
-    if len(sys.argv) != 4:
-        print("Usage: python upload_to_dynamodb.py <table_name> <key_name> <json_file>")
-        sys.exit(1)
-    #table_name = sys.argv[1]
-    #key_value = sys.argv[2]
-    table_name = "test_table"
-    key_name = "dateTime" 
-# Get current dateTime as key_name
-    #key_value = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    date_str = "01/31/25"
-    current_time = datetime.datetime.now().strftime("%H:%M:%S")
-    key_value = f"{date_str} {current_time}"
-    print(f"Retrieving item with key value: {key_value}")
-    json_file = sys.argv[3]
-    table = create_dynamodb_table(table_name, key_name)
-    upload_json_to_table(table, json_file, key_name)
-    
-    item = get_item_by_nearest_key(table, key_name, key_value)
-    print(item)
-        # Get the bpm value from the item
-        # Get the bpm value from the item
-    bpm_value = item.get('bpm')
-    if bpm_value is not None:
-        print(f"bpm value: {bpm_value}")
-    else:
-        print("bpm value not found in item.")
\ No newline at end of file
+    date_time = args.date_time or f"02/20/25 {datetime.datetime.now().strftime('%H:%M:%S')}"
+    print(f"Retrieving sample nearest to: {date_time}")
+    item = get_item_by_nearest_time(storage, args.member_id, date_time)
+    if item is not None:
+        print(f"bpm value: {item['bpm']}")
@@ -0,0 +1,81 @@
+"""
+Local DynamoDB stand-in for benchmarks.
+
+Runs the family finance tables inside moto's in-memory DynamoDB so benchmarks
+never touch AWS. `latency_ms` adds a fixed sleep before every DynamoDB call to
+approximate a network round trip, which is what the parallel and batched code
+paths are meant to hide.
+
+    pip install moto
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import boto3
+
+# Let benchmarks in this folder import the app modules (storage, family_data, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import NUMBER_KEYS, TABLE_KEYS
+
+# (partition key, sort key) for every table the app uses
+TABLE_SCHEMAS = {
+    table_name: (keys[0], keys[1] if len(keys) > 1 else None)
+    for table_name, keys in TABLE_KEYS.items()
+}
+
+
+def _key_type(name):
+    return 'N' if name in NUMBER_KEYS else 'S'
+
+
+def create_table(dynamodb, table_name, hash_key, range_key=None):
+    key_schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+    attribute_definitions = [{'AttributeName': hash_key, 'AttributeType': _key_type(hash_key)}]
+    if range_key:
+        key_schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+        attribute_definitions.append({'AttributeName': range_key, 'AttributeType': _key_type(range_key)})
+    return dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=key_schema,
+        AttributeDefinitions=attribute_definitions,
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def add_latency(dynamodb, latency_ms):
+    """Sleep `latency_ms` before every call made through this resource or client."""
+    def simulate_round_trip(**kwargs):
+        time.sleep(latency_ms / 1000.0)
+    client = getattr(dynamodb.meta, 'client', dynamodb)
+    client.meta.events.register('before-call.dynamodb', simulate_round_trip)
+
+
+def local_storage(dynamodb, latency_ms=0):
+    """DynamoDBBackend over the local resource, with the same latency on its read client."""
+    from storage import DynamoDBBackend
+
+    storage = DynamoDBBackend(dynamodb)
+    if latency_ms:
+        add_latency(storage.client, latency_ms)
+    return storage
+
+
+@contextmanager
+def local_dynamodb(latency_ms=0, region='us-east-1', tables=TABLE_SCHEMAS):
+    """Yield a boto3 DynamoDB resource backed by moto with the app tables created."""
+    from moto import mock_aws
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name=region)
+        for table_name, (hash_key, range_key) in tables.items():
+            create_table(dynamodb, table_name, hash_key, range_key)
+
+        if latency_ms:
+            add_latency(dynamodb, latency_ms)
+
+        yield dynamodb
@@ -0,0 +1,68 @@
+"""
+Report what one finance agent turn costs in DynamoDB calls, capacity and latency.
+
+    python debug/report_request_capacity.py [latency_ms]
+
+Seeds a family in the local DynamoDB stand-in, instruments its clients the
+way aws_clients.py instruments the shared ones, and runs the finance tools an
+agent typically calls for a spending question inside one "agent_turn"
+request scope, without the LLM, twice from a cold family_cache: as each tool
+reads on its own (before), and inside family_data.turn_snapshot with
+household_agent.TURN_READS, as the financial agent runs them (after). Prints
+the per-tool and per-table calls of both and the JSON line request_metrics
+logs for the second turn. moto reports capacity for single-item reads,
+queries and writes, but none for transactions.
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('REQUEST_METRICS_LOG', 'off')
+
+from check_tool_projections import FAMILY_ID, TOOL_CALLS, seed
+from local_dynamodb import local_dynamodb, local_storage
+from family_cache import family_cache
+from family_data import turn_snapshot
+from household_agent import TURN_READS
+from request_metrics import instrument_dynamodb, request_scope
+from storage import set_storage
+
+
+def main():
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+    with local_dynamodb(latency_ms=latency_ms) as dynamodb:
+        storage = local_storage(dynamodb, latency_ms)
+        seed(storage)
+        instrument_dynamodb(dynamodb.meta.client)
+        instrument_dynamodb(storage.client)
+        set_storage(storage)
+        before = run_turn("each tool on its own")
+        with turn_snapshot(TURN_READS):
+            after = run_turn("one turn snapshot")
+
+    print(f"{'DynamoDB calls':34s} {'before':>6s} {'after':>6s}")
+    for kind, names in (('sections', TOOL_CALLS), ('tables', sorted(before['tables']))):
+        for name in names:
+            # A tool with no calls was served from family_cache or the turn snapshot
+            print(f"{name:34s} {before[kind].get(name, {}).get('calls', 0):6d} "
+                  f"{after[kind].get(name, {}).get('calls', 0):6d}")
+        print()
+    for label, summary in (("turn total, before", before), ("turn total, after", after)):
+        totals = summary['dynamodb']
+        print(f"{label:34s} {totals['calls']:6d} calls {totals['read_units']:6.1f} read units "
+              f"{totals['latency_ms']:7.1f} DynamoDB ms  ({summary['duration_ms']:.0f} ms wall)")
+    print()
+    print(json.dumps({'event': 'request_metrics', **after}))
+
+
+def run_turn(name):
+    family_cache.clear()
+    with request_scope("agent_turn", name, family_id=FAMILY_ID) as turn:
+        for call in TOOL_CALLS.values():
+            call()
+    return turn.summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+A scripted stand-in for BedrockModel, for running the real Strands agents offline.
+
+    from stub_model import ScriptedModel, text_reply, tool_reply
+
+    model = ScriptedModel([tool_reply("financial_agent", {"input": query}), text_reply("Done.")],
+                          first_token_s=0.8, token_s=0.02)
+
+Each model call takes the next reply of the script (the last one repeats)
+and streams it as Converse stream events: text word by word after
+`first_token_s`, `token_s` apart, or a single tool call. A reply may also be
+a callable taking (messages, tool_specs, system_prompt) and returning one
+of those. Every call's request (and its token counts, as
+the messages list may change afterwards) is kept in `requests`.
+Reported input tokens are `input_tokens`, or if None an estimate of the
+request (system prompt, messages and tool specs at 4 characters a token).
+With `cache_min_tokens`, the model also acts like Bedrock's prompt cache
+for the static prefix (tool specs + system prompt): the first call with a
+given prefix of at least that many tokens reports it as cache writes,
+later calls as cache reads, and input tokens exclude it.
+"""
+import asyncio
+import json
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Sequence, Union
+
+from strands.models.model import Model
+
+
+def text_reply(text: str) -> Dict[str, Any]:
+    return {'text': text}
+
+
+def tool_reply(name: str, tool_input: Dict[str, Any]) -> Dict[str, Any]:
+    return {'tool': name, 'input': tool_input}
+
+
+class ScriptedModel(Model):
+    def __init__(self, script: Sequence[Union[Dict[str, Any], Callable]], first_token_s: float = 0.0,
+                 token_s: float = 0.0, input_tokens: int = None, cache_min_tokens: int = None):
+        self.script = list(script)
+        self.first_token_s = first_token_s
+        self.token_s = token_s
+        self.input_tokens = input_tokens
+        self.cache_min_tokens = cache_min_tokens
+        self.cached_prefixes = set()
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.config = {'model_id': 'scripted'}
+
+    def update_config(self, **model_config):
+        self.config.update(model_config)
+
+    def get_config(self):
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError("ScriptedModel only streams")
+        yield  # pragma: no cover
+
+    def _cache_usage(self, tool_specs, system_prompt, input_tokens):
+        """(cache read, cache write) tokens of this call's static prefix."""
+        if self.cache_min_tokens is None:
+            return 0, 0
+        prefix = json.dumps([tool_specs, system_prompt], default=str)
+        tokens = min(len(prefix) // 4, input_tokens)
+        if tokens < self.cache_min_tokens:
+            return 0, 0
+        with self._lock:
+            if prefix in self.cached_prefixes:
+                return tokens, 0
+            self.cached_prefixes.add(prefix)
+            return 0, tokens
+
+    def _next_reply(self, messages, tool_specs, system_prompt, usage):
+        with self._lock:
+            index = len(self.requests)
+            self.requests.append({'messages': messages, 'tool_specs': tool_specs, 'system_prompt': system_prompt,
+                                  **usage})
+            reply = self.script[min(index, len(self.script) - 1)]
+        return reply(messages, tool_specs, system_prompt) if callable(reply) else reply
+
+    def _input_tokens(self, messages, tool_specs, system_prompt):
+        if self.input_tokens is not None:
+            return self.input_tokens
+        return len(json.dumps([system_prompt, messages, tool_specs], default=str)) // 4
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        input_tokens = self._input_tokens(messages, tool_specs, system_prompt)
+        cache_read, cache_write = self._cache_usage(tool_specs, system_prompt, input_tokens)
+        input_tokens -= cache_read + cache_write
+        usage = {'input_tokens': input_tokens, 'cache_read_tokens': cache_read, 'cache_write_tokens': cache_write,
+                 'system_prompt_content': kwargs.get('system_prompt_content')}
+        reply = self._next_reply(messages, tool_specs, system_prompt, usage)
+        await asyncio.sleep(self.first_token_s)
+        yield {'messageStart': {'role': 'assistant'}}
+        output_tokens = 0
+        if 'tool' in reply:
+            yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': uuid.uuid4().hex, 'name': reply['tool']}}}}
+            yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps(reply['input'])}}}}
+            yield {'contentBlockStop': {}}
+            stop_reason = 'tool_use'
+        else:
+            words = reply['text'].split(' ')
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.token_s)
+                yield {'contentBlockDelta': {'delta': {'text': word if i == len(words) - 1 else word + ' '}}}
+            yield {'contentBlockStop': {}}
+            output_tokens = len(words)
+            stop_reason = 'end_turn'
+        yield {'messageStop': {'stopReason': stop_reason}}
+        yield {'metadata': {
+            'usage': {'inputTokens': input_tokens, 'outputTokens': output_tokens,
+                      'totalTokens': input_tokens + cache_read + cache_write + output_tokens,
+                      **({'cacheReadInputTokens': cache_read, 'cacheWriteInputTokens': cache_write}
+                         if self.cache_min_tokens is not None else {})},
+            'metrics': {'latencyMs': 0},
+        }}
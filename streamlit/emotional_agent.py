@@ -5,45 +5,19 @@ from datetime import datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
-import boto3
+from aws_clients import create_bedrock_model, prompt_cache_config
+from conversation import new_conversation_manager
+from heart_rate import HEART_RATE_MEMBER_ID, format_epoch, recent_samples
+from request_metrics import metered, model_usage_hooks
+from storage import get_storage
 from decimal import Decimal
 from typing import Dict, List, Any
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Access the environment variables
-AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
-AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
-
-try:
-    print(f"DEBUG: Initializing DynamoDB with region: {AWS_REGION}")
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    print("DEBUG: DynamoDB client initialized successfully")
-    
-    # Test connection
-    client = boto3.client(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    tables = client.list_tables()
-    print(f"DEBUG: Available tables: {tables['TableNames']}")
-    
-except Exception as e:
-    print(f"DEBUG: Error initializing DynamoDB: {str(e)}")
-    import traceback
-    print(f"DEBUG: Full traceback: {traceback.format_exc()}")
-    dynamodb = None
-    
-@tool     
+@tool
+@metered
 def get_current_heart_rate(window_seconds: int = 10) -> Dict[str, Any]:
     """
     Fetch the most recent heart rate entries from DynamoDB within the last `window_seconds`
@@ -55,33 +29,23 @@ def get_current_heart_rate(window_seconds: int = 10) -> Dict[str, Any]:
     Returns:
         Dict containing average BPM, confidence, stress level, and time range
     """
-    if not dynamodb:
-        return {"error": "DynamoDB not initialized"}
-
     try:
-        table = dynamodb.Table("test_table")
-        
-        # Scan all items (for demo; in prod use a time-indexed query)
-        response = table.scan()
-        items = response.get("Items", [])
-
-        if not items:
-            return {"message": "No heart rate data found."}
-
-        # Convert dateTime strings to datetime objects
-        for entry in items:
-            entry['dt_obj'] = datetime.strptime(entry['dateTime'], "%m/%d/%y %H:%M:%S")
-
-        latest_time = max(entry['dt_obj'] for entry in items)
-        recent_entries = [
-            e for e in items if (latest_time - e['dt_obj']).total_seconds() <= window_seconds
-        ]
+        # Newest samples first from the member's time-series partition; reads stop at the window edge
+        recent_entries = recent_samples(get_storage(), HEART_RATE_MEMBER_ID, window_seconds)
 
         if not recent_entries:
-            return {"message": f"No entries in the last {window_seconds} seconds."}
+            return {"message": "No heart rate data found."}
 
-        avg_bpm = sum(float(e['value']['bpm']) for e in recent_entries) / len(recent_entries)
-        avg_conf = sum(float(e['value']['confidence']) for e in recent_entries) / len(recent_entries)
+        avg_bpm = sum(e['bpm'] for e in recent_entries) / len(recent_entries)
+        avg_conf = sum(e['confidence'] for e in recent_entries) / len(recent_entries)
+        return {
+            "average_bpm": round(avg_bpm, 1),
+            "average_confidence": round(avg_conf, 2),
+            "stress_level": calculate_stress_level(int(avg_bpm)),
+            "samples": len(recent_entries),
+            "from": format_epoch(recent_entries[-1]['epoch']),
+            "to": format_epoch(recent_entries[0]['epoch']),
+        }
     except Exception as e:
         return {"error": f"Error fetching data: {str(e)}"}
         
@@ -109,14 +73,26 @@ their finances. You monitor the heart rate of the user and return the value.
 If the user is experiencing high stress levels, then you provide emotional support and encouragement based on the query given.'''
 
 
-emotional_model = BedrockModel(
-    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+emotional_model = create_bedrock_model(
+    model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+    cache_config=prompt_cache_config()
 )   
-emotional_agent = Agent(
-    model=emotional_model,
-    system_prompt=EMOTIONAL_SYSTEM_PROMPT,
-    tools=[get_current_heart_rate, calculate_stress_level ]
-)       
+EMOTIONAL_TOOLS = [get_current_heart_rate, calculate_stress_level]
+EMOTIONAL_AGENT_NAME = "emotional_agent"
+EMOTIONAL_AGENT_DESCRIPTION = ("Monitors the user's emotional state through heart rate data, gives stress "
+                               "level insights and emotional support when needed.")
+
+
+def new_emotional_agent(**kwargs) -> Agent:
+    """An emotional agent with a fresh conversation, sharing the model and tools of emotional_agent."""
+    kwargs.setdefault('conversation_manager', new_conversation_manager())
+    kwargs.setdefault('hooks', [model_usage_hooks])
+    return Agent(model=emotional_model, system_prompt=EMOTIONAL_SYSTEM_PROMPT, tools=EMOTIONAL_TOOLS,
+                 name=EMOTIONAL_AGENT_NAME, description=EMOTIONAL_AGENT_DESCRIPTION, **kwargs)
+
+
+# For the demo below; the chat builds its agents per turn or per session (query_router.py)
+emotional_agent = new_emotional_agent(callback_handler=None)
 # --- Demo / Initialization ---
 def get_heart_rate(dateTime: str):
     """Fetch heart rate data using the emotional agent."""
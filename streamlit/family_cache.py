@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from storage import ConditionFailedError, StorageBackend
+
+# --- Process-wide family data cache ---
+# The dashboard, Reports tab, data viewer and the finance tools all read the
+# same per-family partitions within seconds of each other. Entries are keyed
+# by (family_id, table_name, projected attributes), expire after a TTL, are
+# evicted LRU once the cache is full, and are dropped by every write path in
+# streamlit.py. A cached full partition also answers projected reads.
+
+FAMILY_CACHE_TTL_SECONDS = float(os.getenv('FAMILY_CACHE_TTL_SECONDS', '30'))
+FAMILY_CACHE_MAX_ENTRIES = int(os.getenv('FAMILY_CACHE_MAX_ENTRIES', '512'))
+# Partitions larger than this (e.g. years of transactions) are streamed, not cached
+FAMILY_CACHE_MAX_ENTRY_ITEMS = int(os.getenv('FAMILY_CACHE_MAX_ENTRY_ITEMS', '5000'))
+
+
+class FamilyDataCache:
+    """Thread-safe TTL + LRU read-through cache of per-family table items."""
+
+    def __init__(self, max_entries: int = FAMILY_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = FAMILY_CACHE_TTL_SECONDS,
+                 max_entry_items: int = FAMILY_CACHE_MAX_ENTRY_ITEMS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_items = max_entry_items
+        self._entries = OrderedDict()  # (family_id, table_name, attributes) -> (expires_at, items)
+        self._generations = {}  # family_id -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_items(self, family_id: str, table_name: str, loader: Callable[[], Iterable[Dict[str, Any]]],
+                  attributes: Sequence[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the cached items for (family_id, table_name), calling `loader`
+        on a miss. `attributes` names the projection `loader` applies (None =
+        full items). The returned list may be shared between callers; don't mutate it.
+        """
+        key = (family_id, table_name, tuple(attributes) if attributes else None)
+        cached, generation = self._lookup(key)
+        if cached is not None:
+            return cached
+        # Load outside the lock so a slow query doesn't block other families
+        items = list(loader())
+        if len(items) <= self.max_entry_items:
+            self._store(key, generation, items)
+        return items
+
+    def iter_items(self, family_id: str, table_name: str, loader: Callable[[], Iterable[Dict[str, Any]]],
+                   attributes: Sequence[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming get_items: on a miss, items are yielded as `loader` produces
+        them and only stored if the stream is read to the end and stays under
+        max_entry_items.
+        """
+        key = (family_id, table_name, tuple(attributes) if attributes else None)
+        cached, generation = self._lookup(key)
+        if cached is not None:
+            yield from cached
+            return
+        buffer = []
+        for item in loader():
+            if buffer is not None:
+                buffer.append(item)
+                if len(buffer) > self.max_entry_items:
+                    buffer = None
+            yield item
+        if buffer is not None:
+            self._store(key, generation, buffer)
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1]
+        return None
+
+    def _lookup(self, key):
+        family_id, table_name, attributes = key
+        with self._lock:
+            items = self._fresh(key)
+            if items is None and attributes is not None:
+                full = self._fresh((family_id, table_name, None))
+                if full is not None:
+                    items = [{name: item[name] for name in attributes if name in item} for item in full]
+            if items is not None:
+                self.hits += 1
+                return items, None
+            self.misses += 1
+            return None, self._generations.get(family_id, 0)
+
+    def _store(self, key, generation, items):
+        family_id = key[0]
+        with self._lock:
+            # A write landed while loading; the result may predate it
+            if self._generations.get(family_id, 0) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, items)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, family_id: str, table_name: str = None):
+        """Drop one table's entries (every projection) for a family, or all of its entries."""
+        with self._lock:
+            self._generations[family_id] = self._generations.get(family_id, 0) + 1
+            keys = [
+                key for key in self._entries
+                if key[0] == family_id and (table_name is None or key[1] == table_name)
+            ]
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+family_cache = FamilyDataCache()
+
+
+# --- Family data version ---
+# answer_cache reuses an answer only while the family's data is unchanged.
+# Invalidations above only reach this process, so every write path also ADDs
+# to a counter on the family's FamilyProfiles row, which other Streamlit
+# workers and the import / rebuild / deletion CLIs share.
+
+DATA_VERSION_ATTRIBUTE = 'data_version'
+
+
+def record_write(storage: StorageBackend, family_id: str, *table_names: str):
+    """After a write: bump the family's stored data version and drop its cached `table_names` (none = all)."""
+    try:
+        storage.update('FamilyProfiles', {'family_id': family_id},
+                       add_values={DATA_VERSION_ATTRIBUTE: Decimal(1)}, must_exist=True)
+    except ConditionFailedError:
+        # No profile (a deleted account); data_version() is None, so nothing is reused
+        pass
+    for table_name in table_names or (None,):
+        family_cache.invalidate(family_id, table_name)
+
+
+def data_version(storage: StorageBackend, family_id: str) -> Optional[int]:
+    """The family's stored data version, or None if it has no profile."""
+    profile = storage.get('FamilyProfiles', {'family_id': family_id}, attributes=(DATA_VERSION_ATTRIBUTE,))
+    if profile is None:
+        return None
+    return int(profile.get(DATA_VERSION_ATTRIBUTE, 0))
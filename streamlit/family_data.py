@@ -0,0 +1,392 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Mapping, Optional, Sequence, Union
+from budget_rollups import read_rollup, rollup_categories
+from family_cache import family_cache
+from request_metrics import current_request
+from storage import EMAIL_INDEX_TABLE, FAMILY_TABLE_KEYS, StorageBackend, decimal_to_float
+
+
+# --- Per-family reads ---
+# Backends return query results lazily (DynamoDB follows LastEvaluatedKey
+# page by page), so callers can stream a family's full history or stop
+# after the first few items without loading everything. Everything read for
+# the UI and the tools, including what the cache holds, has float numbers.
+
+def iter_family_items(storage: StorageBackend, table_name: str, family_id: str, **kwargs):
+    """
+    Stream every item of `table_name` whose partition key is `family_id`.
+
+    Accepts the same options as StorageBackend.query, e.g. begins_with,
+    ascending, limit, attributes; numbers are floats unless `numbers` is given.
+    """
+    kwargs.setdefault('numbers', float)
+    return storage.query(table_name, family_id, **kwargs)
+
+
+def read_family_frame(storage: StorageBackend, table_name: str, family_id: str, columns=None, **query_kwargs):
+    """
+    A family's items in `table_name` as a DataFrame, decoded column-wise
+    (uncached); takes the key conditions of StorageBackend.query.
+    """
+    return storage.query_frame(table_name, family_id, columns=columns, **query_kwargs)
+
+
+def read_family_table(storage: StorageBackend, table_name: str, family_id: str,
+                      attributes: Sequence[str] = None) -> List[Dict[str, Any]]:
+    """
+    All of a family's items in `table_name`, read through the shared cache.
+    With `attributes`, only those are fetched (a projection pushed down to the query).
+    """
+    return family_cache.get_items(
+        family_id, table_name,
+        lambda: iter_family_items(storage, table_name, family_id, attributes=attributes),
+        attributes=attributes
+    )
+
+
+def iter_family_table(storage: StorageBackend, table_name: str, family_id: str, attributes: Sequence[str] = None):
+    """Streaming read_family_table: pages are only fetched on a cache miss."""
+    return family_cache.iter_items(
+        family_id, table_name,
+        lambda: iter_family_items(storage, table_name, family_id, attributes=attributes),
+        attributes=attributes
+    )
+
+
+def read_family_profile(storage: StorageBackend, family_id: str, attributes: Sequence[str] = None) -> Optional[Dict[str, Any]]:
+    """FamilyProfiles item for `family_id`, read through the shared cache."""
+    def load():
+        item = storage.get('FamilyProfiles', {'family_id': family_id}, attributes=attributes, numbers=float)
+        return [item] if item else []
+
+    items = family_cache.get_items(family_id, 'FamilyProfiles', load, attributes=attributes)
+    return items[0] if items else None
+
+
+# --- Transactions by date ---
+# ExpenseTransactions sort keys start with the ISO date
+# ("2026-10-17#TXN1A2B3C"), so "latest N", a month and a date range are all
+# key conditions: the backend reads only the matching rows, newest first
+# when asked, instead of the UI or tools loading the family's whole history.
+
+TRANSACTIONS_TABLE = 'ExpenseTransactions'
+# Sorts after every "#TXN..." suffix, so a range ending on a date includes that whole day
+_END_OF_DAY = '#\U0010ffff'
+
+
+def transaction_window(latest: int = None, month: str = None, start_date: str = None,
+                       end_date: str = None) -> Dict[str, Any]:
+    """
+    Query options selecting ExpenseTransactions on the sort key, for
+    StorageBackend.query / query_frame or iter_family_items.
+
+    Args:
+        latest (int): Newest `latest` transactions, newest first
+        month (str): YYYY-MM, oldest first
+        start_date / end_date (str): YYYY-MM-DD, inclusive, oldest first;
+            either may be left open
+    """
+    if latest is not None:
+        return {'ascending': False, 'limit': latest, 'page_size': latest}
+    if month is not None:
+        return {'begins_with': month}
+    if start_date is not None or end_date is not None:
+        return {'between': (start_date or '0000-00-00', (end_date or '9999-12-31') + _END_OF_DAY)}
+    return {}
+
+
+def latest_transactions(storage: StorageBackend, family_id: str, limit: int = 10,
+                        attributes: Sequence[str] = None) -> List[Dict[str, Any]]:
+    """The family's `limit` most recent transactions, newest first; reads at most `limit` items."""
+    return list(iter_family_items(storage, TRANSACTIONS_TABLE, family_id, attributes=attributes,
+                                  **transaction_window(latest=limit)))
+
+
+def iter_transactions(storage: StorageBackend, family_id: str, month: str = None, start_date: str = None,
+                      end_date: str = None, attributes: Sequence[str] = None):
+    """Stream a month's (or a date range's) transactions, oldest first."""
+    return iter_family_items(storage, TRANSACTIONS_TABLE, family_id, attributes=attributes,
+                             **transaction_window(month=month, start_date=start_date, end_date=end_date))
+
+
+# --- Email login index ---
+# FamilyEmailIndex maps a normalized email to its family_id (partition key
+# `email`), so login is a get_item instead of a scan over FamilyProfiles.
+# save_family_to_dynamodb keeps it current; run debug/backfill_email_index.py
+# once for profiles created before the index existed.
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def lookup_family_id(storage: StorageBackend, email: str) -> Optional[str]:
+    """family_id registered for `email`, or None if no account uses it."""
+    item = storage.get(EMAIL_INDEX_TABLE, {'email': normalize_email(email)})
+    return item['family_id'] if item else None
+
+
+# --- Family snapshot loader ---
+# The finance tools all need some mix of the family profile, this month's
+# budget rows or budget rollup (budget_rollups.py), goals and assets. The
+# reads are independent, so they are sent together on a small shared pool
+# and a turn waits for the slowest one instead of the sum of all of them.
+
+SNAPSHOT_PARTS = ("profile", "budgets", "rollup", "goals", "assets")
+
+_snapshot_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="family-snapshot")
+
+
+@dataclass
+class FamilySnapshot:
+    """Everything the finance tools read about one family for one month."""
+    family_id: str
+    year_month: str
+    profile: Optional[Dict[str, Any]] = None
+    budgets: List[Dict[str, Any]] = field(default_factory=list)
+    rollup: Optional[Dict[str, Any]] = None
+    goals: List[Dict[str, Any]] = field(default_factory=list)
+    assets: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def liquid_assets(self) -> List[Dict[str, Any]]:
+        return [asset for asset in self.assets if asset.get('liquidity') == 'High']
+
+    @property
+    def active_goals(self) -> List[Dict[str, Any]]:
+        return [goal for goal in self.goals if goal.get('status') == 'Active']
+
+    def budget_for(self, category: str) -> Dict[str, Any]:
+        """Budget row for `category` in the snapshot month, or {} if none is set."""
+        category_month = f"{category}#{self.year_month}"
+        for budget in self.budgets:
+            if budget.get('category_month') == category_month:
+                return budget
+        return {}
+
+    def budget_totals(self) -> Dict[str, float]:
+        """Month totals from the rollup if it was loaded, else summed from the budget rows."""
+        if self.rollup is not None:
+            return {name: self.rollup.get(name, 0) for name in ('total_allocated', 'total_spent', 'total_remaining')}
+        return {
+            'total_allocated': sum(item.get('allocated_amount', 0) for item in self.budgets),
+            'total_spent': sum(item.get('spent_amount', 0) for item in self.budgets),
+            'total_remaining': sum(item.get('remaining_amount', 0) for item in self.budgets),
+        }
+
+    def budget_categories(self) -> List[Dict[str, Any]]:
+        """Per-category allocated/spent/remaining amounts, from the rollup if it was loaded."""
+        if self.rollup is not None:
+            return rollup_categories(self.rollup)
+        return self.budgets
+
+
+def _read_profile(storage, family_id, year_month, attributes=None):
+    return read_family_profile(storage, family_id, attributes)
+
+
+def _read_budgets(storage, family_id, year_month, attributes=None):
+    # The whole partition is what the dashboard caches, so filter the month here
+    return [
+        item for item in read_family_table(storage, 'BudgetAllocations', family_id, attributes)
+        if year_month in item.get('category_month', '')
+    ]
+
+
+def _read_rollup(storage, family_id, year_month, attributes=None):
+    # A single small item; category attribute names vary, so it is always read whole
+    return read_rollup(storage, family_id, year_month)
+
+
+def _read_goals(storage, family_id, year_month, attributes=None):
+    return read_family_table(storage, 'FinancialGoals', family_id, attributes)
+
+
+def _read_assets(storage, family_id, year_month, attributes=None):
+    return read_family_table(storage, 'FamilyAssets', family_id, attributes)
+
+
+SNAPSHOT_READERS = {
+    "profile": _read_profile,
+    "budgets": _read_budgets,
+    "rollup": _read_rollup,
+    "goals": _read_goals,
+    "assets": _read_assets,
+}
+
+# Attributes FamilySnapshot itself filters on (month, active_goals,
+# liquid_assets); always added to a projected read of that part
+SNAPSHOT_KEY_ATTRIBUTES = {
+    "profile": (),
+    "budgets": ("category_month",),
+    "rollup": (),
+    "goals": ("status",),
+    "assets": ("liquidity",),
+}
+
+
+def snapshot_projection(part: str, attributes: Optional[Sequence[str]]) -> Optional[List[str]]:
+    """The attribute list actually requested for `part` (None = full items)."""
+    if attributes is None:
+        return None
+    return list(dict.fromkeys([*attributes, *SNAPSHOT_KEY_ATTRIBUTES[part]]))
+
+
+def load_family_snapshot(storage: StorageBackend, family_id: str,
+                         parts: Union[Sequence[str], Mapping[str, Optional[Sequence[str]]]] = SNAPSHOT_PARTS,
+                         year_month: str = None) -> FamilySnapshot:
+    """
+    Read the requested parts of a family's data concurrently and return them
+    as one FamilySnapshot; numbers are floats as read from storage.
+
+    Args:
+        storage: StorageBackend, e.g. storage.get_storage()
+        family_id (str): Family to load
+        parts: Subset of SNAPSHOT_PARTS to read; the rest stay empty. A dict
+            maps each part to the attributes the caller reads, which are
+            pushed down to storage as a projection (None = full items).
+        year_month (str): Budget month as YYYY-MM, defaults to the current month
+
+    Inside turn_snapshot(), the parts it covers come from the turn's reads.
+    """
+    year_month = year_month or datetime.now().strftime('%Y-%m')
+    if not isinstance(parts, Mapping):
+        parts = dict.fromkeys(parts)
+    unknown = set(parts) - set(SNAPSHOT_PARTS)
+    if unknown:
+        raise ValueError(f"Unknown snapshot parts: {sorted(unknown)}")
+
+    turn = _turn_snapshot.get()
+
+    def read(part, attributes):
+        if turn is not None and part in turn.reads:
+            return turn.read(storage, family_id, year_month, part)
+        return SNAPSHOT_READERS[part](storage, family_id, year_month, snapshot_projection(part, attributes))
+
+    # Each read runs in a copy of the caller's context, so request_metrics counts it for the caller
+    futures = {
+        part: _snapshot_pool.submit(contextvars.copy_context().run, read, part, attributes)
+        for part, attributes in parts.items()
+    }
+    # .result() re-raises the first failing read so the tools report it
+    results = {part: future.result() for part, future in futures.items()}
+
+    return FamilySnapshot(family_id=family_id, year_month=year_month, **results)
+
+
+# --- Turn snapshots ---
+# One finance turn calls several tools that each load an overlapping mix of
+# parts with their own projection (the overview, spending capacity, funding
+# sources and goal impact all read assets, budgets or goals). Inside
+# turn_snapshot(reads), load_family_snapshot reads each part of a family and
+# month once, with every attribute `reads` lists for it, and later loads in
+# the turn share those items: at most one read per table per turn, and all
+# of the turn's tools compute from the same data even if a write or a
+# family_cache expiry lands between them. The snapshot is dropped with the
+# turn; new data shows up from the next one.
+
+_turn_snapshot = contextvars.ContextVar('family_turn_snapshot', default=None)
+
+
+def merge_reads(*reads: Mapping[str, Optional[Sequence[str]]]) -> Dict[str, Optional[List[str]]]:
+    """Per part, the union of the attributes several readers list (None = full items if any reads them)."""
+    merged = {}
+    for part_reads in reads:
+        for part, attributes in part_reads.items():
+            if part in merged and merged[part] is None:
+                continue
+            merged[part] = None if attributes is None else list(dict.fromkeys([*merged.get(part, []), *attributes]))
+    return merged
+
+
+class TurnSnapshot:
+    """
+    The family data parts read so far in one turn.
+
+    Args:
+        reads: Part -> attributes any tool of the turn reads (None = full
+            items); parts not listed are read as usual, every time.
+    """
+
+    def __init__(self, reads: Mapping[str, Optional[Sequence[str]]]):
+        self.reads = dict(reads)
+        self._parts = {}  # (family_id, year_month, part) -> Future of the items
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.reuses = 0
+
+    def read(self, storage: StorageBackend, family_id: str, year_month: str, part: str):
+        """The turn's copy of `part`; the first call reads it, concurrent and later ones wait for and share it."""
+        key = (family_id, year_month, part)
+        with self._lock:
+            future = self._parts.get(key)
+            loading = future is None
+            if loading:
+                future = self._parts[key] = Future()
+                self.loads += 1
+            else:
+                self.reuses += 1
+        if loading:
+            try:
+                future.set_result(SNAPSHOT_READERS[part](storage, family_id, year_month,
+                                                         snapshot_projection(part, self.reads[part])))
+            except Exception as e:
+                # Waiting tools get the error; a later one tries again
+                with self._lock:
+                    self._parts.pop(key, None)
+                future.set_exception(e)
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'loads': self.loads, 'reuses': self.reuses}
+
+
+@contextmanager
+def turn_snapshot(reads: Mapping[str, Optional[Sequence[str]]]) -> Iterator[TurnSnapshot]:
+    """Share family data reads across the block (see TurnSnapshot), e.g. one agent invocation."""
+    turn = TurnSnapshot(reads)
+    token = _turn_snapshot.set(turn)
+    try:
+        yield turn
+    finally:
+        _turn_snapshot.reset(token)
+
+
+class TurnSnapshotHooks:
+    """
+    Strands hook provider running each invocation of its agent inside
+    turn_snapshot(reads), and adding the turn's loads and reuses to the
+    active request_metrics request as "family_reads". Give each agent its own.
+    """
+
+    def __init__(self, reads: Mapping[str, Optional[Sequence[str]]]):
+        self.reads = reads
+        self._turn = None
+        self._token = None
+
+    def register_hooks(self, registry, **kwargs):
+        from strands.hooks import AfterInvocationEvent, BeforeInvocationEvent
+
+        registry.add_callback(BeforeInvocationEvent, self._before_invocation)
+        registry.add_callback(AfterInvocationEvent, self._after_invocation)
+
+    def _before_invocation(self, event):
+        # An agent runs one invocation at a time; its tools run in copies of this context
+        self._turn = TurnSnapshot(self.reads)
+        self._token = _turn_snapshot.set(self._turn)
+
+    def _after_invocation(self, event):
+        if self._token is None:
+            return
+        turn, token, self._turn, self._token = self._turn, self._token, None, None
+        _turn_snapshot.reset(token)
+        metrics = current_request()
+        if metrics is not None:
+            totals = metrics.fields.setdefault('family_reads', {'loads': 0, 'reuses': 0})
+            for name, count in turn.stats().items():
+                totals[name] += count
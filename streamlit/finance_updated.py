@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
-import boto3
+from aws_clients import create_bedrock_model, get_dynamodb
 from decimal import Decimal
 from typing import Dict, List, Any
 
@@ -21,34 +21,6 @@ guardrailArn = os.getenv('GUARDRAIL_ARN')
 guardrailId = os.getenv('GUARDRAIL_ID')
 guardrail_version = "DRAFT"
 
-bedrock_runtime = boto3.client('bedrock-runtime')
-
-# Initialize DynamoDB client with debug info
-try:
-    print(f"DEBUG: Initializing DynamoDB with region: {AWS_REGION}")
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    print("DEBUG: DynamoDB client initialized successfully")
-    
-    # Test connection
-    client = boto3.client(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    tables = client.list_tables()
-    print(f"DEBUG: Available tables: {tables['TableNames']}")
-    
-except Exception as e:
-    print(f"DEBUG: Error initializing DynamoDB: {str(e)}")
-    import traceback
-    print(f"DEBUG: Full traceback: {traceback.format_exc()}")
-    dynamodb = None
     
 #initialise AWS clients
 #bedrock_client = boto3.client('bedrock')
@@ -69,6 +41,8 @@ def decimal_to_float(obj):
 def get_family_financial_overview(family_id: str) -> str:
     """Get comprehensive financial overview for a family from DynamoDB."""
     try:
+        # Shared, lazily created DynamoDB resource (see aws_clients.py)
+        dynamodb = get_dynamodb()
         # Get family profile
         family_table = dynamodb.Table('FamilyProfiles')
         family_response = family_table.get_item(Key={'family_id': family_id})
@@ -141,6 +115,7 @@ def get_family_financial_overview(family_id: str) -> str:
 def check_spending_capacity(family_id: str, amount: float, category: str) -> str:
     """Check if family can afford a specific expense in a category."""
     try:
+        dynamodb = get_dynamodb()
         current_month = datetime.now().strftime('%Y-%m')
         
         # Get current budget for the category
@@ -189,6 +164,7 @@ def check_spending_capacity(family_id: str, amount: float, category: str) -> str
 def get_alternative_funding_sources(family_id: str, required_amount: float) -> str:
     """Find alternative ways to fund an expense (budget reallocation, asset liquidation)."""
     try:
+        dynamodb = get_dynamodb()
         current_month = datetime.now().strftime('%Y-%m')
         
         # Get all current budget allocations
@@ -250,6 +226,7 @@ def get_alternative_funding_sources(family_id: str, required_amount: float) -> s
 def assess_goal_impact(family_id: str, expense_amount: float) -> str:
     """Assess how an expense will impact family financial goals."""
     try:
+        dynamodb = get_dynamodb()
         # Get all active financial goals
         goals_table = dynamodb.Table('FinancialGoals')
         goals_response = goals_table.query(
@@ -309,7 +286,7 @@ def calculate_budget(monthly_income: float) -> str:
 
 
 # Enhanced model configuration
-model = BedrockModel(
+model = create_bedrock_model(
     model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
     guardrail_id = guardrailId,
     guardrail_version = guardrail_version,
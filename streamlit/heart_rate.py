@@ -0,0 +1,98 @@
+"""
+Heart-rate samples stored as a time series per family member.
+
+HeartRateSamples is keyed by (member_id, epoch): the partition holds one
+member's samples and the numeric sort key is the sample time in Unix
+seconds, so the reads the emotional agent needs are key-range queries whose
+cost depends on the window, not on all history ever recorded:
+
+    recent_samples(storage, member_id, 10)   newest sample first, descending + Limit
+    nearest_sample(storage, member_id, ts)   one Limit-1 query on each side of ts
+
+Fitbit exports timestamps as "MM/DD/YY HH:MM:SS" without a zone; they are
+read as UTC so the epoch round-trips to the same wall-clock string.
+"""
+import calendar
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from storage import HEART_RATE_TABLE, StorageBackend
+
+# Whose samples the emotional agent reads, e.g. "normal" / "stressed" for the demo data sets
+HEART_RATE_MEMBER_ID = os.getenv('HEART_RATE_MEMBER_ID', 'normal')
+
+FITBIT_TIME_FORMAT = "%m/%d/%y %H:%M:%S"
+# Upper bound for open-ended epoch ranges
+MAX_EPOCH = 2 ** 53
+
+# Samples fetched per round trip by recent_samples (a Fitbit records one every few seconds)
+RECENT_PAGE_SIZE = 64
+
+
+@lru_cache(maxsize=4096)
+def _fitbit_day(date: str) -> int:
+    return calendar.timegm(time.strptime(date, "%m/%d/%y"))
+
+
+def fitbit_epoch(date_time: str) -> int:
+    """Fitbit "MM/DD/YY HH:MM:SS" (taken as UTC) to Unix seconds."""
+    date, _, clock = date_time.partition(' ')
+    hours, minutes, seconds = map(int, clock.split(':'))
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 62):
+        raise ValueError(f"time data {date_time!r} does not match format {FITBIT_TIME_FORMAT!r}")
+    # strptime once per day; bulk loads convert millions of samples
+    return _fitbit_day(date) + hours * 3600 + minutes * 60 + seconds
+
+
+def format_epoch(epoch) -> str:
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).strftime(FITBIT_TIME_FORMAT)
+
+
+def sample_item(member_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """One Fitbit export entry ({"dateTime": ..., "value": {"bpm", "confidence"}}) as a HeartRateSamples item."""
+    return {
+        'member_id': member_id,
+        'epoch': fitbit_epoch(entry['dateTime']),
+        'bpm': Decimal(str(entry['value']['bpm'])),
+        'confidence': Decimal(str(entry['value'].get('confidence', 0))),
+    }
+
+
+def recent_samples(storage: StorageBackend, member_id: str, window_seconds: float,
+                   until: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    A member's samples from the last `window_seconds`, newest first, with float numbers.
+
+    Args:
+        until: End of the window in Unix seconds; default the newest sample,
+            so recorded (non-live) data still has a "current" window
+    """
+    if until is not None:
+        return list(storage.query(HEART_RATE_TABLE, member_id, between=(until - window_seconds, until),
+                                  ascending=False, page_size=RECENT_PAGE_SIZE, numbers=float))
+
+    samples = []
+    # Newest first; pages are fetched lazily, so this stops after the page that leaves the window
+    for sample in storage.query(HEART_RATE_TABLE, member_id, ascending=False,
+                                page_size=RECENT_PAGE_SIZE, numbers=float):
+        if samples and samples[0]['epoch'] - sample['epoch'] > window_seconds:
+            break
+        samples.append(sample)
+    return samples
+
+
+def nearest_sample(storage: StorageBackend, member_id: str, epoch: int) -> Optional[Dict[str, Any]]:
+    """The member's sample closest in time to `epoch` (the earlier one on a tie), or None."""
+    before = next(storage.query(HEART_RATE_TABLE, member_id, between=(0, epoch),
+                                ascending=False, limit=1, numbers=float), None)
+    if before is not None and before['epoch'] == epoch:
+        return before
+    after = next(storage.query(HEART_RATE_TABLE, member_id, between=(epoch, MAX_EPOCH),
+                               limit=1, numbers=float), None)
+    if before is None or after is None:
+        return before or after
+    return before if epoch - before['epoch'] <= after['epoch'] - epoch else after
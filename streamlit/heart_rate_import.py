@@ -0,0 +1,268 @@
+"""
+Streaming, resumable bulk load of Fitbit heart-rate exports.
+
+    python heart_rate_import.py <member_id> <export.json|export.ndjson> [--workers 4] [--restart]
+
+The file is parsed incrementally, so memory stays flat for a year of
+samples: a JSON array (Fitbit's export format) is decoded one element at a
+time, NDJSON one line at a time. Timestamps become epoch seconds while
+parsing, a timestamp repeated within a batch is dropped (first one wins;
+one repeated later rewrites the same key), and samples go to
+HeartRateSamples through parallel batch writers (on DynamoDB, 25 items per
+request).
+
+Progress is checkpointed next to the file (<file>.checkpoint.json) as the
+number of entries whose batches are all written. Running the same command
+again after an interruption re-parses the finished part without writing it
+and carries on from there; the checkpoint is removed once the load completes.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, TextIO
+
+from heart_rate import sample_item
+from storage import HEART_RATE_TABLE, StorageBackend, get_storage
+
+BATCH_SIZE = 500
+READ_CHUNK_CHARS = 1 << 16
+CHECKPOINT_EVERY_SECONDS = 2.0
+
+
+@dataclass
+class HeartRateLoadResult:
+    entries_read: int
+    written: int
+    duplicates: int
+    rejected: int
+    resumed_from: int
+    seconds: float
+
+    @property
+    def samples_per_second(self) -> float:
+        return (self.entries_read - self.resumed_from) / self.seconds if self.seconds else 0.0
+
+
+# --- Incremental parsing ---
+
+def _iter_json_array(f: TextIO, first_chunk: str) -> Iterator[Dict[str, Any]]:
+    """Elements of a top-level JSON array, decoded one at a time from `f`."""
+    decoder = json.JSONDecoder()
+    buffer = first_chunk
+    pos = buffer.index('[') + 1
+    while True:
+        # Skip whitespace and separators, reading more when the buffer runs out
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buffer):
+            more = f.read(READ_CHUNK_CHARS)
+            if not more:
+                raise ValueError("Unexpected end of file inside the JSON array")
+            buffer, pos = more, 0
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            entry, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Element cut off at the end of the buffer
+            more = f.read(READ_CHUNK_CHARS)
+            if not more:
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+        yield entry
+        pos = end
+
+
+def _iter_ndjson(f: TextIO, first_chunk: str) -> Iterator[Dict[str, Any]]:
+    pending = first_chunk
+    while True:
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        more = f.read(READ_CHUNK_CHARS)
+        if not more:
+            break
+        pending += more
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def iter_export_entries(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Entries of a Fitbit export, a JSON array or NDJSON (one object per line), as they are read."""
+    first_chunk = f.read(READ_CHUNK_CHARS)
+    if first_chunk.lstrip().startswith('['):
+        return _iter_json_array(f, first_chunk)
+    return _iter_ndjson(f, first_chunk)
+
+
+# --- Checkpoints ---
+
+def checkpoint_path_for(path: str) -> str:
+    return path + '.checkpoint.json'
+
+
+def _file_identity(path: str, member_id: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'member_id': member_id, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _read_checkpoint(checkpoint_path: str, identity: Dict[str, Any]) -> int:
+    """Entries already loaded according to the checkpoint, 0 if there is none."""
+    if not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if any(checkpoint.get(name) != value for name, value in identity.items()):
+        raise ValueError(f"{checkpoint_path} belongs to a different file or member; "
+                         "run with --restart to load from the beginning")
+    return checkpoint['entries_done']
+
+
+def _write_checkpoint(checkpoint_path: str, identity: Dict[str, Any], entries_done: int):
+    # Write-then-rename, so an interruption never leaves a half-written checkpoint
+    temporary_path = checkpoint_path + '.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump({**identity, 'entries_done': entries_done}, f)
+    os.replace(temporary_path, checkpoint_path)
+
+
+# --- Loader ---
+
+def load_heart_rate(storage: StorageBackend, member_id: str, path: str, workers: int = 4,
+                    batch_size: int = BATCH_SIZE, restart: bool = False,
+                    progress: Callable[[int, int], None] = None) -> HeartRateLoadResult:
+    """
+    Stream a Fitbit heart-rate export into HeartRateSamples under `member_id`.
+
+    Args:
+        storage: StorageBackend, e.g. storage.get_storage()
+        member_id (str): Partition the samples are stored under
+        path (str): JSON array or NDJSON file
+        workers (int): Parallel batch writers
+        restart (bool): Ignore (and replace) an existing checkpoint
+        progress: Called with (entries read, samples written) after each batch
+
+    Returns:
+        HeartRateLoadResult
+    """
+    start = time.perf_counter()
+    checkpoint_path = checkpoint_path_for(path)
+    identity = _file_identity(path, member_id)
+    resumed_from = 0 if restart else _read_checkpoint(checkpoint_path, identity)
+
+    seen = set()  # epochs of the current batch only
+    counts = {'read': 0, 'written': 0, 'duplicates': 0, 'rejected': 0}
+    # Batches finish out of order; the checkpoint only moves past a batch
+    # once every batch before it is written too
+    batch_ends = []  # entries read when each batch was submitted, in order
+    finished = set()
+    state = {'done': 0, 'saved': 0, 'saved_at': time.monotonic()}
+
+    def advance_checkpoint(force=False):
+        while state['done'] < len(batch_ends) and state['done'] in finished:
+            state['done'] += 1
+        due = force or time.monotonic() - state['saved_at'] >= CHECKPOINT_EVERY_SECONDS
+        if state['done'] > state['saved'] and due:
+            _write_checkpoint(checkpoint_path, identity, batch_ends[state['done'] - 1])
+            state['saved'] = state['done']
+            state['saved_at'] = time.monotonic()
+
+    def batches() -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        with open(path) as f:
+            for entry in iter_export_entries(f):
+                counts['read'] += 1
+                try:
+                    item = sample_item(member_id, entry)
+                except (KeyError, TypeError, ValueError, ArithmeticError):
+                    counts['rejected'] += 1
+                    continue
+                if item['epoch'] in seen:
+                    counts['duplicates'] += 1
+                    continue
+                seen.add(item['epoch'])
+                # Entries the interrupted run wrote are only remembered for dedupe
+                if counts['read'] > resumed_from:
+                    batch.append(item)
+                if len(seen) >= batch_size:
+                    # Writing a (member_id, epoch) key again is idempotent, so dedupe
+                    # stops at the batch and memory stays flat
+                    if batch:
+                        yield batch
+                    batch = []
+                    seen.clear()
+        if batch:
+            yield batch
+
+    def collect(done):
+        error = None
+        for future in done:
+            batch_number = pending.pop(future)
+            if future.exception() is not None:
+                # Record the batches that did finish first, so the checkpoint covers them
+                error = error or future.exception()
+                continue
+            counts['written'] += future.result()
+            finished.add(batch_number)
+        if error is not None:
+            raise error
+        advance_checkpoint()
+        if progress:
+            progress(counts['read'], counts['written'])
+
+    pending = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="heart-rate-load") as pool:
+            for batch in batches():
+                # Bounded read-ahead keeps memory flat however big the file is
+                while len(pending) >= 2 * max(1, workers):
+                    collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+                pending[pool.submit(storage.batch_put, HEART_RATE_TABLE, batch)] = len(batch_ends)
+                batch_ends.append(counts['read'])
+            while pending:
+                collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+    except BaseException:
+        # Save what is known to be written so the next run resumes from there
+        advance_checkpoint(force=True)
+        raise
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return HeartRateLoadResult(
+        entries_read=counts['read'],
+        written=counts['written'],
+        duplicates=counts['duplicates'],
+        rejected=counts['rejected'],
+        resumed_from=resumed_from,
+        seconds=time.perf_counter() - start,
+    )
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a Fitbit heart-rate export into HeartRateSamples")
+    parser.add_argument('member_id')
+    parser.add_argument('export_file', help="JSON array or NDJSON")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel batch writers")
+    parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and load from the start")
+    args = parser.parse_args()
+
+    def print_progress(read, written):
+        print(f"  {read:,} entries read, {written:,} samples written", end="\r")
+
+    result = load_heart_rate(get_storage(), args.member_id, args.export_file, workers=args.workers,
+                             restart=args.restart, progress=print_progress)
+    print()
+    if result.resumed_from:
+        print(f"Resumed after {result.resumed_from:,} entries")
+    print(f"Read {result.entries_read:,} entries, wrote {result.written:,} samples in {result.seconds:.1f}s "
+          f"({result.samples_per_second:,.0f} samples/s)")
+    if result.duplicates or result.rejected:
+        print(f"Skipped {result.duplicates:,} repeated timestamps and {result.rejected:,} invalid entries")
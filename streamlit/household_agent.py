@@ -1,178 +1,120 @@
 from strands import Agent, tool
-from strands_tools import calculator, current_time
-from strands.models import BedrockModel
-from datetime import datetime, timedelta
-import json
 import os
 from dotenv import load_dotenv
-import boto3
-from decimal import Decimal
-from typing import Dict, List, Any
+from aws_clients import create_bedrock_model, prompt_cache_config
+from collections import deque
+from conversation import new_conversation_manager
+from family_data import (TurnSnapshotHooks, iter_transactions, latest_transactions, load_family_snapshot,
+                         merge_reads)
+from request_metrics import metered, model_usage_hooks
+from storage import get_storage
+from tool_output import encode_tool_output, table
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Access the environment variables
-AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
-AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 #guardrailId = os.getenv('GUARDRAIL_ID')
 guardrailArn = os.getenv('GUARDRAIL_ARN')
 guardrailId = os.getenv('GUARDRAIL_ID')
 guardrail_version = "DRAFT"
 
-bedrock_runtime = boto3.client('bedrock-runtime')
+# --- Attributes each tool reads ---
+# Passed to load_family_snapshot, which pushes them down to storage as a
+# projection; None reads full items. Keep in sync with the tool bodies
+# (debug/check_tool_projections.py fails if a tool reads anything else).
+# Budget totals and per-category amounts come from the month's rollup item
+PROFILE_FIELDS = ("family_name", "family_size", "location", "risk_tolerance", "total_monthly_income")
+OVERVIEW_READS = {
+    "profile": PROFILE_FIELDS,
+    "rollup": None,
+    "goals": ("goal_name", "priority", "target_amount", "current_amount", "monthly_allocation", "target_date"),
+    "assets": ("asset_name", "asset_type", "current_value"),
+}
+SPENDING_CAPACITY_READS = {
+    "budgets": ("category", "allocated_amount", "spent_amount", "remaining_amount"),
+    "assets": ("current_value",),
+}
+FUNDING_SOURCES_READS = {
+    "budgets": ("category", "remaining_amount"),
+    "assets": ("asset_name", "asset_type", "current_value"),
+}
+GOAL_IMPACT_READS = {
+    "goals": ("goal_name", "priority", "target_amount", "current_amount", "monthly_allocation"),
+}
+TRANSACTION_READS = ("transaction_date", "amount", "category", "description")
+# Within one agent invocation each part is read once, with what all of the above need (TurnSnapshotHooks)
+TURN_READS = merge_reads(OVERVIEW_READS, SPENDING_CAPACITY_READS, FUNDING_SOURCES_READS, GOAL_IMPACT_READS)
 
-# Initialize DynamoDB client with debug info
-try:
-    print(f"DEBUG: Initializing DynamoDB with region: {AWS_REGION}")
-    dynamodb = boto3.resource(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    print("DEBUG: DynamoDB client initialized successfully")
-    
-    # Test connection
-    client = boto3.client(
-        'dynamodb',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
-    tables = client.list_tables()
-    print(f"DEBUG: Available tables: {tables['TableNames']}")
-    
-except Exception as e:
-    print(f"DEBUG: Error initializing DynamoDB: {str(e)}")
-    import traceback
-    print(f"DEBUG: Full traceback: {traceback.format_exc()}")
-    dynamodb = None
-    
-#initialise AWS clients
-#bedrock_client = boto3.client('bedrock')
-#bedrock_runtime = boto3.client('bedrock-runtime')
-
-# Helper function to convert Decimal to float for JSON serialization
-def decimal_to_float(obj):
-    if isinstance(obj, list):
-        return [decimal_to_float(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: decimal_to_float(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
+# --- Tool output caps ---
+# Estimated tokens each tool's result may take (tool_output.py); above that
+# its longest table keeps its first rows and totals the rest
+TOOL_OUTPUT_CAPS = {
+    "get_family_financial_overview": 700,
+    "check_spending_capacity": 150,
+    "get_alternative_funding_sources": 400,
+    "assess_goal_impact": 400,
+    "get_recent_transactions": 600,
+    "calculate_budget": 60,
+}
+BUDGET_COLUMNS = ("category", "allocated_amount", "spent_amount", "remaining_amount")
 
 @tool
+@metered
 def get_family_financial_overview(family_id: str) -> str:
     """Get comprehensive financial overview for a family from DynamoDB."""
     try:
-        # Get family profile
-        family_table = dynamodb.Table('FamilyProfiles')
-        family_response = family_table.get_item(Key={'family_id': family_id})
+        snapshot = load_family_snapshot(get_storage(), family_id, parts=OVERVIEW_READS)
         
-        if 'Item' not in family_response:
+        if snapshot.profile is None:
             return f"❌ Family {family_id} not found in database"
         
-        family_data = decimal_to_float(family_response['Item'])
-        
-        # Get current budget allocations
-        budget_table = dynamodb.Table('BudgetAllocations')
-        current_month = datetime.now().strftime('%Y-%m')
-        budget_response = budget_table.query(
-            KeyConditionExpression='family_id = :fid AND begins_with(category_month, :month)',
-            ExpressionAttributeValues={
-                ':fid': family_id,
-                ':month': f"#{current_month}"  # This will get all categories for current month
-            }
-        )
-        
-        # Get financial goals
-        goals_table = dynamodb.Table('FinancialGoals')
-        goals_response = goals_table.query(
-            KeyConditionExpression='family_id = :fid',
-            ExpressionAttributeValues={':fid': family_id}
-        )
-        
-        # Get liquid assets
-        assets_table = dynamodb.Table('FamilyAssets')
-        assets_response = assets_table.query(
-            KeyConditionExpression='family_id = :fid',
-            FilterExpression='liquidity = :liq',
-            ExpressionAttributeValues={
-                ':fid': family_id,
-                ':liq': 'High'
-            }
-        )
-        
-        budget_data = decimal_to_float(budget_response.get('Items', []))
-        goals_data = decimal_to_float(goals_response.get('Items', []))
-        assets_data = decimal_to_float(assets_response.get('Items', []))
+        family_data = snapshot.profile
+        budget_data = snapshot.budget_categories()
+        goals_data = snapshot.goals
+        assets_data = snapshot.liquid_assets
         
         # Calculate totals
-        total_allocated = sum(item['allocated_amount'] for item in budget_data)
-        total_spent = sum(item['spent_amount'] for item in budget_data)
-        total_remaining = sum(item['remaining_amount'] for item in budget_data)
+        totals = snapshot.budget_totals()
         total_liquid_assets = sum(asset['current_value'] for asset in assets_data)
         
         overview = {
-            'family_info': family_data,
+            'family_info': {name: family_data.get(name) for name in PROFILE_FIELDS},
             'monthly_budget': {
-                'total_allocated': total_allocated,
-                'total_spent': total_spent,
-                'total_remaining': total_remaining,
-                'categories': budget_data
+                'total_allocated': totals['total_allocated'],
+                'total_spent': totals['total_spent'],
+                'total_remaining': totals['total_remaining'],
+                'categories': table(budget_data, BUDGET_COLUMNS)
             },
-            'financial_goals': goals_data,
+            'financial_goals': table(sorted(goals_data, key=lambda goal: goal.get('priority', 0)),
+                                     OVERVIEW_READS['goals'] + ('status',)),
             'liquid_assets': {
                 'total': total_liquid_assets,
-                'accounts': assets_data
+                'accounts': table(assets_data, OVERVIEW_READS['assets'])
             }
         }
         
-        return f"📊 Financial Overview for {family_data['family_name']}:\n" + json.dumps(overview, indent=2)
+        return encode_tool_output(f"Financial overview for {family_data['family_name']}", overview,
+                                  TOOL_OUTPUT_CAPS['get_family_financial_overview'])
         
     except Exception as e:
         return f"❌ Error retrieving family data: {str(e)}"
 
 @tool
+@metered
 def check_spending_capacity(family_id: str, amount: float, category: str) -> str:
     """Check if family can afford a specific expense in a category."""
     try:
-        current_month = datetime.now().strftime('%Y-%m')
+        snapshot = load_family_snapshot(get_storage(), family_id, parts=SPENDING_CAPACITY_READS)
         
-        # Get current budget for the category
-        budget_table = dynamodb.Table('BudgetAllocations')
-        budget_key = f"{category}#{current_month}"
-        
-        budget_response = budget_table.get_item(
-            Key={
-                'family_id': family_id,
-                'category_month': budget_key
-            }
-        )
-        
-        # Get liquid assets
-        assets_table = dynamodb.Table('FamilyAssets')
-        assets_response = assets_table.query(
-            KeyConditionExpression='family_id = :fid',
-            FilterExpression='liquidity = :liq',
-            ExpressionAttributeValues={
-                ':fid': family_id,
-                ':liq': 'High'
-            }
-        )
-        
-        budget_item = decimal_to_float(budget_response.get('Item', {}))
-        liquid_assets = decimal_to_float(assets_response.get('Items', []))
+        # Current budget for the category and liquid assets
+        budget_item = snapshot.budget_for(category)
+        liquid_assets = snapshot.liquid_assets
         total_liquid = sum(asset['current_value'] for asset in liquid_assets)
         
         analysis = {
             'requested_amount': amount,
             'category': category,
-            'current_budget': budget_item,
+            'current_budget': {name: budget_item.get(name) for name in BUDGET_COLUMNS[1:]},
             'budget_remaining': budget_item.get('remaining_amount', 0),
             'budget_shortfall': max(0, amount - budget_item.get('remaining_amount', 0)),
             'liquid_assets_available': total_liquid,
@@ -180,89 +122,69 @@ def check_spending_capacity(family_id: str, amount: float, category: str) -> str
             'can_afford_with_assets': amount <= (budget_item.get('remaining_amount', 0) + total_liquid)
         }
         
-        return f"💵 Spending Capacity Analysis:\n" + json.dumps(analysis, indent=2)
+        return encode_tool_output(f"Spending capacity: {category}", analysis,
+                                  TOOL_OUTPUT_CAPS['check_spending_capacity'])
         
     except Exception as e:
         return f"❌ Error checking spending capacity: {str(e)}"
 
 @tool
+@metered
 def get_alternative_funding_sources(family_id: str, required_amount: float) -> str:
     """Find alternative ways to fund an expense (budget reallocation, asset liquidation)."""
     try:
-        current_month = datetime.now().strftime('%Y-%m')
+        # All current budget allocations and all assets by liquidity
+        snapshot = load_family_snapshot(get_storage(), family_id, parts=FUNDING_SOURCES_READS)
         
-        # Get all current budget allocations
-        budget_table = dynamodb.Table('BudgetAllocations')
-        budget_response = budget_table.query(
-            KeyConditionExpression='family_id = :fid',
-            FilterExpression='contains(category_month, :month)',
-            ExpressionAttributeValues={
-                ':fid': family_id,
-                ':month': current_month
-            }
-        )
-        
-        # Get all assets by liquidity
-        assets_table = dynamodb.Table('FamilyAssets')
-        assets_response = assets_table.query(
-            KeyConditionExpression='family_id = :fid',
-            ExpressionAttributeValues={':fid': family_id}
-        )
+        budget_data = snapshot.budgets
+        assets_data = snapshot.assets
         
-        budget_data = decimal_to_float(budget_response.get('Items', []))
-        assets_data = decimal_to_float(assets_response.get('Items', []))
-        
-        # Identify reallocation opportunities (categories with remaining budget)
+        # Identify reallocation opportunities (categories with remaining budget), largest first
         reallocation_options = []
         for budget in budget_data:
             if budget['remaining_amount'] > 0:
                 reallocation_options.append({
                     'category': budget['category'],
-                    'available': budget['remaining_amount'],
-                    'impact': f"Reduces {budget['category']} budget flexibility"
+                    'available': budget['remaining_amount']
                 })
+        reallocation_options.sort(key=lambda option: -option['available'])
         
         # Sort assets by liquidity
+        liquidity_order = {'High': 0, 'Medium': 1, 'Low': 2}
         asset_options = []
         for asset in assets_data:
             if asset['current_value'] >= required_amount:
                 asset_options.append({
                     'asset_name': asset['asset_name'],
+                    'asset_type': asset['asset_type'],
                     'value': asset['current_value'],
-                    'liquidity': asset['liquidity'],
-                    'impact': f"Reduces {asset['asset_type']} reserves"
+                    'liquidity': asset['liquidity']
                 })
+        asset_options.sort(key=lambda option: liquidity_order.get(option['liquidity'], len(liquidity_order)))
         
         alternatives = {
             'required_amount': required_amount,
-            'budget_reallocation': reallocation_options,
-            'asset_liquidation': asset_options,
             'total_available_budget': sum(opt['available'] for opt in reallocation_options),
-            'recommendations': []
+            'budget_reallocation': table(reallocation_options, ('category', 'available')),
+            'asset_liquidation': table(asset_options, ('asset_name', 'asset_type', 'value', 'liquidity')),
+            'impact': "reallocating reduces that category's flexibility; liquidating reduces that asset type's reserves"
         }
         
-        return f"🔄 Alternative Funding Sources:\n" + json.dumps(alternatives, indent=2)
+        return encode_tool_output("Alternative funding sources", alternatives,
+                                  TOOL_OUTPUT_CAPS['get_alternative_funding_sources'])
         
     except Exception as e:
         return f"❌ Error finding alternatives: {str(e)}"
 
-@tool 
+@tool
+@metered
 def assess_goal_impact(family_id: str, expense_amount: float) -> str:
     """Assess how an expense will impact family financial goals."""
     try:
         # Get all active financial goals
-        goals_table = dynamodb.Table('FinancialGoals')
-        goals_response = goals_table.query(
-            KeyConditionExpression='family_id = :fid',
-            FilterExpression='#status = :status',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':fid': family_id,
-                ':status': 'Active'
-            }
-        )
+        snapshot = load_family_snapshot(get_storage(), family_id, parts=GOAL_IMPACT_READS)
         
-        goals_data = decimal_to_float(goals_response.get('Items', []))
+        goals_data = snapshot.active_goals
         
         # Calculate impact on each goal
         goal_impacts = []
@@ -284,24 +206,64 @@ def assess_goal_impact(family_id: str, expense_amount: float) -> str:
                 'impact_severity': 'High' if potential_delay > 3 else 'Medium' if potential_delay > 1 else 'Low'
             })
         
+        goal_impacts.sort(key=lambda x: x['priority'])
         impact_analysis = {
             'expense_amount': expense_amount,
-            'goal_impacts': sorted(goal_impacts, key=lambda x: x['priority']),
-            'highest_priority_affected': min(goal_impacts, key=lambda x: x['priority']) if goal_impacts else None
+            'highest_priority_affected': goal_impacts[0]['goal_name'] if goal_impacts else None,
+            'goal_impacts': table(goal_impacts)
         }
         
-        return f"🎯 Goal Impact Analysis:\n" + json.dumps(impact_analysis, indent=2)
+        return encode_tool_output("Goal impact", impact_analysis, TOOL_OUTPUT_CAPS['assess_goal_impact'])
         
     except Exception as e:
         return f"❌ Error assessing goal impact: {str(e)}"
 
+@tool
+@metered
+def get_recent_transactions(family_id: str, month: str = "", limit: int = 10) -> str:
+    """
+    List a family's recent expense transactions. With `month` (YYYY-MM), also
+    total that month's spending by category.
+    """
+    try:
+        storage = get_storage()
+        limit = max(1, min(int(limit), 50))
+        if not month:
+            # Newest first on the date sort key; only `limit` items are read
+            transactions = latest_transactions(storage, family_id, limit, attributes=TRANSACTION_READS)
+            return encode_tool_output(f"Latest {len(transactions)} transactions", table(transactions, TRANSACTION_READS),
+                                      TOOL_OUTPUT_CAPS['get_recent_transactions'])
+        
+        # One key-range query for the month, streamed; only the newest `limit` rows are kept
+        by_category = {}
+        count = 0
+        latest = deque(maxlen=limit)
+        for transaction in iter_transactions(storage, family_id, month=month, attributes=TRANSACTION_READS):
+            category = transaction.get('category', 'Other')
+            by_category[category] = by_category.get(category, 0) + transaction.get('amount', 0)
+            count += 1
+            latest.append(transaction)
+        
+        summary = {
+            'month': month,
+            'transaction_count': count,
+            'total_spent': round(sum(by_category.values()), 2),
+            'spent_by_category': {category: round(total, 2) for category, total in sorted(by_category.items())},
+            'latest_transactions': table(list(reversed(latest)), TRANSACTION_READS)
+        }
+        return encode_tool_output(f"Transactions for {month}", summary, TOOL_OUTPUT_CAPS['get_recent_transactions'])
+        
+    except Exception as e:
+        return f"❌ Error retrieving transactions: {str(e)}"
+
 @tool
 def calculate_budget(monthly_income: float) -> str:
     """Calculate 50/30/20 budget breakdown."""
     needs = monthly_income * 0.50
     wants = monthly_income * 0.30  
     savings = monthly_income * 0.20
-    return f"💰 Budget for ${monthly_income:,.0f}/month:\n• Needs: ${needs:,.0f} (50%)\n• Wants: ${wants:,.0f} (30%)\n• Savings: ${savings:,.0f} (20%)"
+    return encode_tool_output("50/30/20 budget", {'monthly_income': monthly_income, 'needs': needs, 'wants': wants,
+                                                   'savings': savings}, TOOL_OUTPUT_CAPS['calculate_budget'])
 
 
 
@@ -309,16 +271,15 @@ def calculate_budget(monthly_income: float) -> str:
 
 
 # Enhanced model configuration
-model = BedrockModel(
+model = create_bedrock_model(
     model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
     guardrail_id = guardrailId,
     guardrail_version = guardrail_version,
-    guardrail_trace = "enabled"
+    guardrail_trace = "enabled",
+    cache_config=prompt_cache_config()
 )
 
-financial_agent = Agent(
-    model=model,
-    system_prompt=""" 
+FINANCIAL_SYSTEM_PROMPT = """ 
     You are a Household Financial Decision Agent with access to real-time family financial data from DynamoDB.
     
     --- Your Enhanced Capabilities ---
@@ -334,6 +295,7 @@ financial_agent = Agent(
        - Use check_spending_capacity() to analyze if they can afford the expense
        - Use get_alternative_funding_sources() to find reallocation options
        - Use assess_goal_impact() to understand effects on long-term goals
+       - Use get_recent_transactions() to see recent or monthly spending
        - Provide 2-3 realistic alternatives with detailed impact analysis
     
     --- Decision Framework ---
@@ -377,15 +339,31 @@ financial_agent = Agent(
     - Family-oriented and supportive
     - Clear trade-off explanations
     - Actionable recommendations
-    """,
-    tools=[
-        get_family_financial_overview,
-        check_spending_capacity, 
-        get_alternative_funding_sources,
-        assess_goal_impact,
-        calculate_budget
-    ]
-)
+    """
+
+FINANCIAL_TOOLS = [
+    get_family_financial_overview,
+    check_spending_capacity, 
+    get_alternative_funding_sources,
+    assess_goal_impact,
+    get_recent_transactions,
+    calculate_budget
+]
+FINANCIAL_AGENT_NAME = "financial_agent"
+FINANCIAL_AGENT_DESCRIPTION = ("Household financial decisions, budgeting and expense management for a family: "
+                               "which options suit the family's needs and what each one costs them.")
+
+
+def new_financial_agent(**kwargs) -> Agent:
+    """A financial agent with a fresh conversation, sharing the model and tools of financial_agent."""
+    kwargs.setdefault('conversation_manager', new_conversation_manager())
+    kwargs.setdefault('hooks', [model_usage_hooks, TurnSnapshotHooks(TURN_READS)])
+    return Agent(model=model, system_prompt=FINANCIAL_SYSTEM_PROMPT, tools=FINANCIAL_TOOLS,
+                 name=FINANCIAL_AGENT_NAME, description=FINANCIAL_AGENT_DESCRIPTION, **kwargs)
+
+
+# For the demo below; the chat builds its agents per turn or per session (query_router.py)
+financial_agent = new_financial_agent(callback_handler=None)
 
 # --- Test the Enhanced Agent ---
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+"""
+Decimal-free decoding of low-level DynamoDB items.
+
+boto3's resource API turns every number into a Decimal, and the app then
+walks each item again with decimal_to_float before it can do arithmetic,
+build JSON or fill a DataFrame. These helpers decode the wire format
+({"amount": {"N": "12.50"}}) directly:
+
+    decode_item(raw)              -> dict with float numbers
+    decode_item(raw, Decimal)     -> same values boto3's TypeDeserializer gives
+    decode_frame(raw_items)       -> DataFrame; numeric columns parsed by NumPy
+
+Timings on 100k items: python debug/bench_item_decoding.py
+"""
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _decoders(number: Callable[[str], Any]):
+    def decode_list(values):
+        return [decoders[kind](data) for value in values for kind, data in value.items()]
+
+    def decode_map(values):
+        return {name: decoders[kind](data) for name, value in values.items() for kind, data in value.items()}
+
+    decoders = {
+        'S': str,
+        'N': number,
+        'BOOL': bool,
+        'NULL': lambda data: None,
+        'B': bytes,
+        'SS': set,
+        'NS': lambda data: {number(text) for text in data},
+        'BS': set,
+        'L': decode_list,
+        'M': decode_map,
+    }
+    return decoders
+
+
+# One dispatch table per number type, built once
+_FLOAT_DECODERS = _decoders(float)
+_DECIMAL_DECODERS = _decoders(Decimal)
+
+
+def decode_item(raw: Dict[str, Dict[str, Any]], number: type = float) -> Dict[str, Any]:
+    """One low-level attribute map to a plain dict; numbers become `number`."""
+    decoders = _FLOAT_DECODERS if number is float else _DECIMAL_DECODERS
+    item = {}
+    for name, value in raw.items():
+        # Strings and numbers are nearly every attribute, so they skip the dispatch
+        if 'S' in value:
+            item[name] = value['S']
+        elif 'N' in value:
+            item[name] = number(value['N'])
+        else:
+            for kind, data in value.items():
+                item[name] = decoders[kind](data)
+    return item
+
+
+def encode_value(value) -> Dict[str, Any]:
+    """A Python key value to its low-level form, for key conditions and start keys."""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return {'N': str(value)}
+    raise TypeError(f"Unsupported key value {value!r}")
+
+
+def decode_frame(raw_items: Iterable[Dict[str, Dict[str, Any]]], columns: Sequence[str] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame column by column from low-level items.
+
+    Attributes that are numbers in every item where they appear become
+    float64 columns parsed in one NumPy call (missing -> NaN), string
+    columns are copied as is, and anything else is decoded per value.
+    """
+    raw_items = list(raw_items)
+    if columns is None:
+        # Union of attribute names in first-seen order
+        columns = list(dict.fromkeys(chain.from_iterable(raw_items)))
+    frame = {}
+    for name in columns:
+        values = [raw.get(name) for raw in raw_items]
+        if any(value is not None for value in values):
+            frame[name] = _decode_column(values)
+    return pd.DataFrame(frame, index=pd.RangeIndex(len(raw_items)))
+
+
+def _decode_column(values):
+    try:
+        return np.array([value['N'] if value is not None else 'nan' for value in values], dtype=np.float64)
+    except KeyError:
+        pass
+    try:
+        return [value['S'] if value is not None else None for value in values]
+    except KeyError:
+        pass
+    return [decode_item({'value': value})['value'] if value is not None else None for value in values]
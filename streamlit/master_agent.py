@@ -5,8 +5,12 @@ from datetime import datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
-from emotional_agent import emotional_agent
-from household_agent import financial_agent
+from agent_stream import forward_stream
+from aws_clients import create_bedrock_model, prompt_cache_config
+from conversation import new_conversation_manager
+from emotional_agent import new_emotional_agent
+from household_agent import new_financial_agent
+from request_metrics import model_usage_hooks
 
 
 load_dotenv()
@@ -14,9 +18,9 @@ AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 
-model = BedrockModel(
+model = create_bedrock_model(
     model_id="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-    
+    cache_config=prompt_cache_config()
 )
 
 system_prompt = f"""
@@ -32,7 +36,7 @@ Key Rules:
 - Always prioritize user well-being and emotional state.
 - Never modify the output of the finacial decision agent.
 - Ensure clarity on which agent provided which part of the information.
-- The emotional agent can access the heart rate data from the test_table table in DynamoDB.Use that data to provide insights on the user's stress levels. 
+- The emotional agent can access the heart rate data from the HeartRateSamples table in DynamoDB.Use that data to provide insights on the user's stress levels. 
 - Always be clear where information came from (📊 Finance, Emotional).
 
 The financial agent must provide output in this way
@@ -74,10 +78,27 @@ Available specialised agents:
 
 """
 
-MasterAgent = Agent(
-    model=model,
-    system_prompt=system_prompt,
-    tools=[financial_agent, emotional_agent])
+def new_master_agent(**kwargs) -> Agent:
+    """
+    A MasterAgent with a fresh conversation and its own sub-agents; the models
+    and tools are the shared module-level ones. The chat keeps one per
+    session (query_router.master_pool). Its history is bounded by a
+    BoundedConversationManager (conversation.py): recent turns verbatim,
+    older ones summarized.
+    """
+    kwargs.setdefault('conversation_manager', new_conversation_manager())
+    kwargs.setdefault('hooks', [model_usage_hooks])
+    return Agent(
+        model=model,
+        system_prompt=system_prompt,
+        tools=[new_financial_agent(callback_handler=None), new_emotional_agent(callback_handler=None)],
+        name="MasterAgent",
+        # Its own and its sub-agents' text go to the chat's TokenStream, if one is active
+        callback_handler=forward_stream,
+        **kwargs)
+
+
+MasterAgent = new_master_agent()
 
 if __name__ == "__main__":
     print("Multi agent system: Master Agent coordinating Financial and Emotional Agents")
@@ -97,7 +118,7 @@ if __name__ == "__main__":
     """
     print("🔍 Processing query...")
     #test_query_2 = "What stocks should I invest in to be able to afford a new car?"
-    response = master_agent(test_query)
+    response = MasterAgent(test_query)
     print(response)
     #print("\n📋 Agent Response:")
     #print("-" * 30)
@@ -106,7 +127,8 @@ if __name__ == "__main__":
         user_input = input("\n💬 Enter another query (or 'exit' to quit): ")
         if user_input.lower() in ['exit', 'quit']:
             break
-        response = financial_agent(user_input)
+        # Follow-ups go through the master too, which keeps the conversation
+        response = MasterAgent(user_input)
         print("\n📋 Agent Response:")
         print("-" * 30)
         print(response)
@@ -0,0 +1,499 @@
+"""
+Local query router in front of master_agent's MasterAgent.
+
+MasterAgent spends a full model call deciding which sub-agent a message is
+for, and another relaying the sub-agent's answer back. Most messages are
+obviously one or the other ("Can we afford a $100 phone plan?", "Am I
+stressed right now?"), so they are classified here first:
+
+    keywords   weighted patterns for finance and emotional intent; a message
+               that only hits one side goes straight to that sub-agent
+    embedding  optional (ROUTER_EMBEDDING_MODEL, e.g. amazon.titan-embed-text-v2:0):
+               a message with no keyword hits is compared with example
+               queries of each side through the shared bedrock-runtime client
+    both       a message that hits both sides runs the financial and the
+               emotional agent concurrently and merges their answers
+               (ORCHESTRATION_MODE=parallel, the default); with
+               ORCHESTRATION_MODE=sequential it goes to MasterAgent, whose
+               tool loop calls them one after the other
+    master     everything else goes to MasterAgent as before
+
+A routed message runs on a fresh sub-agent with only that agent's tools,
+the way MasterAgent calls it as a tool (no history carried between calls).
+Each chat session has its own MasterAgent from master_pool (agent_pool.py);
+routed exchanges are added to its history too, so a follow-up that goes to
+the master knows what was said.
+Financial answers get the heart-rate stress line MasterAgent would add,
+read directly (alongside the agent) instead of through the emotional
+agent's model. A financial question the family already asked, with its
+data unchanged since, gets the earlier answer from answer_cache
+(answer_cache.py) without running the agent; the stress line is still
+read fresh. Sub-agents of one turn run on a shared thread pool, so the
+turn takes as long as the slowest of them rather than their sum.
+
+Each turn is a request_metrics "agent_turn" whose summary carries the route
+and llm_calls_saved: the MasterAgent model calls the turn did not need, as
+averaged over the master turns seen so far (MASTER_CALLS_DEFAULT before any).
+router_stats() totals them for the Settings tab. Financial turns also
+record answer_cache: hit, miss, stale or off.
+
+start_answer() runs a turn on the turn pool and streams the agents' text
+as it is generated (agent_stream.py), for the chat to render incrementally;
+the turn records its time to first token (first_token_ms) next to its
+total duration.
+"""
+import contextvars
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from agent_pool import AgentPool, session_key
+from agent_stream import TokenStream, forward_stream, streaming_to
+from answer_cache import ANSWER_CACHE_EMBEDDING_MODEL, HIT, AnswerCache
+from family_cache import data_version
+from request_metrics import request_scope
+from storage import get_storage
+
+ROUTE_FINANCIAL = "financial"
+ROUTE_EMOTIONAL = "emotional"
+ROUTE_BOTH = "both"
+ROUTE_MASTER = "master"
+
+AGENT_NAMES = {
+    ROUTE_FINANCIAL: "financial_agent",
+    ROUTE_EMOTIONAL: "emotional_agent",
+    ROUTE_BOTH: "financial_agent+emotional_agent",
+    ROUTE_MASTER: "MasterAgent",
+}
+
+# parallel: mixed messages run both sub-agents at once; sequential: MasterAgent's tool loop
+ORCHESTRATION_MODE = os.getenv('ORCHESTRATION_MODE', 'parallel')
+SUB_AGENT_WORKERS = int(os.getenv('SUB_AGENT_WORKERS', '8'))
+
+# Keyword score a side needs (with none on the other side) to skip the master
+ROUTER_MIN_SCORE = float(os.getenv('ROUTER_MIN_SCORE', '1'))
+ROUTER_EMBEDDING_MODEL = os.getenv('ROUTER_EMBEDDING_MODEL', '')
+# Cosine similarity the closest example must reach, and its lead over the other side
+ROUTER_EMBEDDING_THRESHOLD = float(os.getenv('ROUTER_EMBEDDING_THRESHOLD', '0.45'))
+ROUTER_EMBEDDING_MARGIN = float(os.getenv('ROUTER_EMBEDDING_MARGIN', '0.05'))
+# MasterAgent model calls per turn assumed until one has been measured:
+# one to call a sub-agent, one to write the reply from its result
+MASTER_CALLS_DEFAULT = 2
+
+# --- Keyword classifier ---
+
+FINANCIAL_PATTERNS = [
+    (re.compile(r"\$\s?\d|\b\d[\d,.]*\s?(dollars|usd|bucks)\b"), 2.0),
+    (re.compile(r"\b(afford\w*|budget\w*|spend\w*|spent|expenses?|costs?|costing|price\w*|pay|paying|payments?"
+                r"|bills?|sav(e|es|ing|ings)|income|salary|money|cash|debt|rent|mortgage|purchase\w*|buy\w*"
+                r"|subscriptions?|allocat\w*|transactions?|emergency fund|financ\w*|goals?|assets?|groceries"
+                r"|tuition|upgrad\w*|plan costs?|per month|monthly)\b"), 1.0),
+]
+EMOTIONAL_PATTERNS = [
+    (re.compile(r"\b(heart ?rate|heartbeat|pulse|bpm)\b"), 2.0),
+    (re.compile(r"\b(stress\w*|anxi\w*|worr\w*|overwhelm\w*|nervous|panic\w*|calm\w*|relax\w*|sad|upset|mood"
+                r"|feel|feeling|felt|tired|exhausted|cop(e|ing)|emotion\w*|frustrat\w*|scared|afraid|lonely"
+                r"|angry|burn(ed|t)? out)\b"), 1.0),
+]
+
+# Example queries each side is compared with when routing by embedding
+EXAMPLE_QUERIES = {
+    ROUTE_FINANCIAL: [
+        "Should we upgrade our phone plan for $100 more per month?",
+        "Can we afford a family vacation this summer?",
+        "How much is left in our food budget this month?",
+        "What did we spend on entertainment recently?",
+        "Will buying a new laptop delay our savings goals?",
+    ],
+    ROUTE_EMOTIONAL: [
+        "Am I stressed right now?",
+        "What is my current heart rate?",
+        "I can't sleep and I feel anxious all the time.",
+        "Help me calm down, today was a lot.",
+        "How am I doing emotionally?",
+    ],
+}
+
+
+def _keyword_score(text: str, patterns) -> float:
+    return sum(weight * len(pattern.findall(text)) for pattern, weight in patterns)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Where one message goes and why."""
+    target: str
+    method: str
+    financial_score: float = 0.0
+    emotional_score: float = 0.0
+    similarity: Optional[float] = None
+
+
+# --- Optional embedding classifier ---
+
+def bedrock_embedder(model_id: str) -> Callable[[Sequence[str]], List[List[float]]]:
+    """Embed texts with a Bedrock embedding model (Titan input format) on the shared client."""
+    def embed(texts):
+        from aws_clients import get_bedrock_runtime
+
+        client = get_bedrock_runtime()
+        vectors = []
+        for text in texts:
+            response = client.invoke_model(modelId=model_id, body=json.dumps({"inputText": text}))
+            vectors.append(json.loads(response['body'].read())['embedding'])
+        return vectors
+    return embed
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class QueryRouter:
+    """
+    Keyword classifier with an optional embedding fallback.
+
+    Args:
+        embed: Callable turning a list of texts into vectors, or None to
+            route keyword-less messages to the master. The example queries
+            are embedded once, on first use.
+        parallel: Send messages that need both sub-agents to ROUTE_BOTH
+            instead of the master.
+    """
+
+    def __init__(self, embed: Callable[[Sequence[str]], List[List[float]]] = None,
+                 min_score: float = ROUTER_MIN_SCORE, threshold: float = ROUTER_EMBEDDING_THRESHOLD,
+                 margin: float = ROUTER_EMBEDDING_MARGIN, parallel: bool = ORCHESTRATION_MODE == 'parallel'):
+        self.embed = embed
+        self.parallel = parallel
+        self.min_score = min_score
+        self.threshold = threshold
+        self.margin = margin
+        self._examples = None
+        self._lock = threading.Lock()
+
+    def classify(self, query: str) -> Route:
+        text = query.lower()
+        financial = _keyword_score(text, FINANCIAL_PATTERNS)
+        emotional = _keyword_score(text, EMOTIONAL_PATTERNS)
+        if financial >= self.min_score and not emotional:
+            return Route(ROUTE_FINANCIAL, "keywords", financial, emotional)
+        if emotional >= self.min_score and not financial:
+            return Route(ROUTE_EMOTIONAL, "keywords", financial, emotional)
+        if financial >= self.min_score and emotional >= self.min_score and self.parallel:
+            return Route(ROUTE_BOTH, "keywords", financial, emotional)
+        if financial or emotional or self.embed is None:
+            # Both sides in sequential mode (the master runs both agents), or neither
+            return Route(ROUTE_MASTER, "keywords", financial, emotional)
+        try:
+            return self._classify_embedding(query)
+        except Exception:
+            # The embedding model is an optimization; without it the master still answers
+            return Route(ROUTE_MASTER, "embedding-error")
+
+    def _example_vectors(self):
+        with self._lock:
+            if self._examples is None:
+                self._examples = {target: self.embed(examples) for target, examples in EXAMPLE_QUERIES.items()}
+            return self._examples
+
+    def _classify_embedding(self, query: str) -> Route:
+        vector = self.embed([query])[0]
+        best = {
+            target: max(_cosine(vector, example) for example in examples)
+            for target, examples in self._example_vectors().items()
+        }
+        (target, similarity), (_, runner_up) = sorted(best.items(), key=lambda entry: -entry[1])
+        if similarity >= self.threshold and similarity - runner_up >= self.margin:
+            return Route(target, "embedding", similarity=round(similarity, 3))
+        return Route(ROUTE_MASTER, "embedding", similarity=round(similarity, 3))
+
+
+router = QueryRouter(embed=bedrock_embedder(ROUTER_EMBEDDING_MODEL) if ROUTER_EMBEDDING_MODEL else None)
+
+
+# --- Savings accounting ---
+
+class RouterStats:
+    """Turns, model calls and model calls saved per route since the process started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turns = {target: 0 for target in AGENT_NAMES}
+        self.llm_calls = {target: 0 for target in AGENT_NAMES}
+        self.llm_calls_saved = 0.0
+        self._master_calls = 0
+        self._master_turns = 0
+
+    def master_calls_per_turn(self) -> float:
+        with self._lock:
+            if not self._master_turns:
+                return float(MASTER_CALLS_DEFAULT)
+            return self._master_calls / self._master_turns
+
+    def record(self, target: str, llm_calls: int, master_calls: int = None) -> float:
+        """Count a finished turn; returns the master model calls it saved."""
+        saved = 0.0 if target == ROUTE_MASTER else self.master_calls_per_turn()
+        with self._lock:
+            self.turns[target] += 1
+            self.llm_calls[target] += llm_calls
+            self.llm_calls_saved += saved
+            if master_calls is not None:
+                self._master_calls += master_calls
+                self._master_turns += 1
+        return round(saved, 2)
+
+    def snapshot(self) -> Dict[str, object]:
+        per_turn = self.master_calls_per_turn()
+        with self._lock:
+            turns = sum(self.turns.values())
+            return {
+                'turns': dict(self.turns),
+                'llm_calls': dict(self.llm_calls),
+                'llm_calls_saved': round(self.llm_calls_saved, 1),
+                'llm_calls_saved_per_turn': round(self.llm_calls_saved / turns, 2) if turns else 0.0,
+                'master_calls_per_turn': round(per_turn, 2),
+            }
+
+
+_stats = RouterStats()
+
+
+def router_stats() -> Dict[str, object]:
+    return _stats.snapshot()
+
+
+# --- Dispatch ---
+
+_sub_agent_pool = ThreadPoolExecutor(max_workers=SUB_AGENT_WORKERS, thread_name_prefix="sub-agent")
+
+
+@dataclass
+class SubAgentResult:
+    """Text (or the exception) one concurrently run part of a turn produced."""
+    name: str
+    text: str = ""
+    error: Optional[Exception] = None
+    duration_ms: float = 0.0
+
+
+def _timed(name, call):
+    started = time.perf_counter()
+    try:
+        return SubAgentResult(name, text=call(), duration_ms=(time.perf_counter() - started) * 1000)
+    except Exception as e:
+        return SubAgentResult(name, error=e, duration_ms=(time.perf_counter() - started) * 1000)
+
+
+def run_concurrently(calls: Dict[str, Callable[[], str]]) -> Dict[str, SubAgentResult]:
+    """
+    Run each call on the shared sub-agent pool and wait for all of them.
+    Calls run in a copy of the caller's context, so request_metrics counts
+    their DynamoDB and model calls for the caller's turn.
+    """
+    futures = {
+        name: _sub_agent_pool.submit(contextvars.copy_context().run, _timed, name, call)
+        for name, call in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def financial_answer(query: str) -> str:
+    from household_agent import new_financial_agent
+
+    return str(new_financial_agent(callback_handler=forward_stream)(query)).strip()
+
+
+def emotional_answer(query: str) -> str:
+    from emotional_agent import new_emotional_agent
+
+    return str(new_emotional_agent(callback_handler=forward_stream)(query)).strip()
+
+
+def _new_master_agent():
+    from master_agent import new_master_agent
+
+    return new_master_agent()
+
+
+# One MasterAgent (with its own sub-agents) per chat session
+master_pool = AgentPool(_new_master_agent)
+
+
+# Financial answers per family, until its data changes (answer_cache.py)
+answer_cache = AnswerCache(
+    embed=bedrock_embedder(ANSWER_CACHE_EMBEDDING_MODEL) if ANSWER_CACHE_EMBEDDING_MODEL else None)
+
+
+def remember_exchange(key: str, query: str, text: str):
+    """Add a turn answered without MasterAgent to the session's MasterAgent history."""
+    with master_pool.lease(key) as master:
+        master.messages.extend([
+            {"role": "user", "content": [{"text": query}]},
+            {"role": "assistant", "content": [{"text": text}]},
+        ])
+
+
+def end_session(family_id: str, session: str = None):
+    """Drop the session's agents (on logout)."""
+    master_pool.discard(session_key(family_id, session))
+
+
+def _unstreamed(answer, query):
+    # Two agents streaming into one chat message would interleave; this one shows up merged at the end
+    with streaming_to(None):
+        return answer(query)
+
+
+def stress_note() -> str:
+    """The stress line MasterAgent adds to financial answers, from the heart-rate data alone."""
+    from emotional_agent import get_current_heart_rate
+
+    reading = get_current_heart_rate()
+    if 'average_bpm' not in reading:
+        return ""
+    note = f"**Emotional:** Your heart rate averages {reading['average_bpm']} bpm ({reading['stress_level']})."
+    if reading['stress_level'] != "High Stress":
+        note += " You're handling this well - you're doing great."
+    else:
+        note += " This looks stressful; take a breath, there are options above that keep your plans on track."
+    return note
+
+
+def merge_answers(financial: SubAgentResult, emotional: SubAgentResult) -> str:
+    """
+    One reply from both sub-agents, the way MasterAgent is asked to write it:
+    the finance analysis unchanged, then the emotional insights, each labelled.
+    """
+    if financial.error is not None:
+        raise financial.error
+    if emotional.error is not None:
+        emotional_text = "_The emotional check-in is unavailable right now._"
+    else:
+        emotional_text = emotional.text
+    return f"### 📊 Finance\n\n{financial.text}\n\n### 💙 Emotional\n\n{emotional_text}"
+
+
+@dataclass
+class RoutedAnswer:
+    """Reply to one chat message and how it was produced."""
+    text: str
+    route: Route
+    llm_calls: int
+    llm_calls_saved: float
+    duration_ms: float
+    # How long each concurrently run part took; the turn waits for the slowest
+    agents_ms: Dict[str, float] = None
+    # Until the first streamed chunk, when the turn was streamed
+    first_token_ms: Optional[float] = None
+
+
+def answer_query(prompt: str, family_id: str, session: str = None, stream: TokenStream = None,
+                 **fields) -> RoutedAnswer:
+    """
+    Answer a chat message through the router, in the conversation of
+    `session` (one per family without it). With `stream`, the agents' text
+    is put on it as it is generated. Extra `fields` are added to the turn's
+    request_metrics summary.
+    """
+    route = router.classify(prompt)
+    query = f"Family ID: {family_id}\n\nQuery: {prompt}"
+    started = time.perf_counter()
+    master_calls = None
+    results = {}
+    key = session_key(family_id, session)
+    with request_scope("agent_turn", AGENT_NAMES[route.target], family_id=family_id, session=session,
+                       route=route.target, router=route.method, **fields) as turn, streaming_to(stream):
+        if route.target == ROUTE_FINANCIAL:
+            version = data_version(get_storage(), family_id)
+            cached = answer_cache.lookup(family_id, prompt, version)
+            turn.fields['answer_cache'] = cached.outcome
+            if cached.outcome == HIT:
+                turn.fields['answer_similarity'] = cached.similarity
+                results = run_concurrently({"stress_note": stress_note})
+                financial_text = cached.text
+                if stream is not None:
+                    stream.put("financial_agent", financial_text)
+            else:
+                results = run_concurrently({"financial_agent": lambda: financial_answer(query),
+                                            "stress_note": stress_note})
+                financial = results["financial_agent"]
+                if financial.error is not None:
+                    raise financial.error
+                financial_text = financial.text
+                answer_cache.store(family_id, prompt, financial_text, version)
+            note = results["stress_note"]
+            text = financial_text
+            if note.text:
+                text = f"{text}\n\n{note.text}"
+                if stream is not None:
+                    stream.put("financial_agent", f"\n\n{note.text}")
+        elif route.target == ROUTE_EMOTIONAL:
+            text = emotional_answer(query)
+        elif route.target == ROUTE_BOTH:
+            results = run_concurrently({"financial_agent": lambda: financial_answer(query),
+                                        "emotional_agent": lambda: _unstreamed(emotional_answer, query)})
+            text = merge_answers(results["financial_agent"], results["emotional_agent"])
+        else:
+            with master_pool.lease(key) as master:
+                before = master.event_loop_metrics.cycle_count
+                text = str(master(query)).strip()
+                master_calls = master.event_loop_metrics.cycle_count - before
+        if route.target != ROUTE_MASTER:
+            remember_exchange(key, query, text)
+        agents_ms = {name: round(result.duration_ms, 1) for name, result in results.items()}
+        saved = _stats.record(route.target, turn.llm_calls, master_calls)
+        turn.fields['llm_calls_saved'] = saved
+        if agents_ms:
+            turn.fields['agents_ms'] = agents_ms
+        first_token_ms = stream.first_token_ms if stream is not None else None
+        if first_token_ms is not None:
+            turn.fields['first_token_ms'] = round(first_token_ms, 1)
+    return RoutedAnswer(text=text, route=route, llm_calls=turn.llm_calls, llm_calls_saved=saved,
+                        duration_ms=(time.perf_counter() - started) * 1000, agents_ms=agents_ms,
+                        first_token_ms=first_token_ms)
+
+
+# --- Streaming turns ---
+
+_turn_pool = ThreadPoolExecutor(max_workers=SUB_AGENT_WORKERS, thread_name_prefix="agent-turn")
+
+
+class StreamingAnswer:
+    """
+    A turn running on the turn pool. Iterate it for (agent name, text)
+    chunks as the agents produce them; iteration ends with the turn, then
+    result() returns the RoutedAnswer (or raises the turn's error).
+    """
+
+    def __init__(self, stream: TokenStream, future):
+        self.stream = stream
+        self._future = future
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def result(self) -> RoutedAnswer:
+        return self._future.result()
+
+
+def start_answer(prompt: str, family_id: str, **fields) -> StreamingAnswer:
+    """Start answering a chat message in the background, streaming its text; see answer_query."""
+    stream = TokenStream()
+
+    def run():
+        try:
+            return answer_query(prompt, family_id, stream=stream, **fields)
+        finally:
+            stream.close()
+
+    # The caller's context carries the request_metrics scope the turn counts towards
+    return StreamingAnswer(stream, _turn_pool.submit(contextvars.copy_context().run, run))
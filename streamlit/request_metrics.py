@@ -0,0 +1,351 @@
+"""
+DynamoDB capacity and latency (and model call) accounting per logical request.
+
+A logical request is one Streamlit rerun or one agent turn. Every DynamoDB
+call made through an instrumented client (the shared ones in aws_clients.py
+are instrumented on creation) asks for ReturnConsumedCapacity=TOTAL, and its
+capacity units and latency are added to the request that is active in the
+calling context:
+
+    with request_scope("agent_turn", "MasterAgent", family_id=family_id):
+        ...                                  # every DynamoDB call in here is counted
+        with section("check_spending_capacity"):
+            ...                              # ... and attributed to this section
+
+Scopes nest (an agent turn inside a rerun also counts towards the rerun),
+and the active scope is a context variable, so it follows the Strands event
+loop thread; thread pools need contextvars.copy_context().run to carry it.
+When a scope ends it writes one JSON line to the "request_metrics" logger
+(REQUEST_METRICS_LOG: stderr, a file path, or off) and keeps the summary
+for the Settings tab's debug panel (recent_requests()).
+
+Bedrock clients instrumented with instrument_bedrock() add their model
+calls (Converse / ConverseStream, i.e. one per agent event loop cycle) to
+the same request as "llm", so a turn's summary shows how many LLM round
+trips it took next to its DynamoDB usage. Agents built with
+hooks=[model_usage_hooks] add each call's tokens as well: input, output,
+and the prompt-cache reads and writes, as totals under "llm" and one entry
+per call under "model_calls".
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+REQUEST_METRICS_LOG = os.getenv('REQUEST_METRICS_LOG', 'stderr')
+# Finished request summaries kept for the debug panel
+RECENT_REQUESTS = int(os.getenv('REQUEST_METRICS_RECENT', '200'))
+
+# DynamoDB operations whose capacity counts as reads; everything else consumes write units
+READ_OPERATIONS = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+# bedrock-runtime operations that are a model generation (embeddings are not counted)
+GENERATION_OPERATIONS = {'Converse', 'ConverseStream'}
+
+NO_SECTION = "-"
+
+_current_request = contextvars.ContextVar('request_metrics', default=None)
+_current_section = contextvars.ContextVar('request_metrics_section', default=NO_SECTION)
+
+_recent = deque(maxlen=RECENT_REQUESTS)
+_recent_lock = threading.Lock()
+
+logger = logging.getLogger('request_metrics')
+logger.propagate = False
+logger.setLevel(logging.INFO)
+if REQUEST_METRICS_LOG == 'stderr':
+    logger.addHandler(logging.StreamHandler(sys.stderr))
+elif REQUEST_METRICS_LOG != 'off':
+    logger.addHandler(logging.FileHandler(REQUEST_METRICS_LOG))
+
+
+def _empty_usage():
+    return {'calls': 0, 'errors': 0, 'read_units': 0.0, 'write_units': 0.0, 'latency_ms': 0.0}
+
+
+def _empty_llm_usage():
+    # latency_ms is until the response starts; a stream keeps going after that.
+    # input_tokens excludes the cached prefix, which is in cache_read/write_tokens.
+    return {'calls': 0, 'errors': 0, 'latency_ms': 0.0, 'input_tokens': 0, 'output_tokens': 0,
+            'cache_read_tokens': 0, 'cache_write_tokens': 0}
+
+
+def _add_usage(total, usage):
+    for name, value in usage.items():
+        total[name] += value
+
+
+class RequestMetrics:
+    """DynamoDB usage of one logical request, by (section, operation, table)."""
+
+    def __init__(self, kind: str, name: str, parent: 'RequestMetrics' = None, **fields):
+        self.kind = kind
+        self.name = name
+        self.fields = fields
+        self.parent = parent
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self._usage = {}
+        self._llm = _empty_llm_usage()
+        self._model_calls = []
+        self._lock = threading.Lock()
+
+    def record(self, section_name, operation, table_name, usage):
+        # Calls from a snapshot pool or a tool thread land here concurrently
+        with self._lock:
+            key = (section_name, operation, table_name)
+            _add_usage(self._usage.setdefault(key, _empty_usage()), usage)
+        if self.parent is not None:
+            self.parent.record(section_name, operation, table_name, usage)
+
+    def record_llm(self, usage):
+        with self._lock:
+            _add_usage(self._llm, usage)
+        if self.parent is not None:
+            self.parent.record_llm(usage)
+
+    def record_model_call(self, agent_name, tokens):
+        """One model call's token usage (keys of _empty_llm_usage ending in _tokens)."""
+        with self._lock:
+            _add_usage(self._llm, tokens)
+            self._model_calls.append({'agent': agent_name, **tokens})
+        if self.parent is not None:
+            self.parent.record_model_call(agent_name, tokens)
+
+    @property
+    def llm_calls(self) -> int:
+        with self._lock:
+            return self._llm['calls']
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals plus breakdowns by section and by table, JSON-ready."""
+        with self._lock:
+            usage = dict(self._usage)
+            llm = dict(self._llm)
+            model_calls = list(self._model_calls)
+        totals = _empty_usage()
+        sections = {}
+        tables = {}
+        for (section_name, operation, table_name), values in usage.items():
+            _add_usage(totals, values)
+            _add_usage(sections.setdefault(section_name, _empty_usage()), values)
+            _add_usage(tables.setdefault(table_name, _empty_usage()), values)
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            **self.fields,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration_ms if self.duration_ms is not None
+                                 else (time.perf_counter() - self._started) * 1000, 1),
+            'dynamodb': _rounded(totals),
+            'llm': _rounded(llm),
+            'model_calls': model_calls,
+            'sections': {name: _rounded(values) for name, values in sorted(sections.items())},
+            'tables': {name: _rounded(values) for name, values in sorted(tables.items())},
+            'calls': [
+                {'section': section_name, 'operation': operation, 'table': table_name, **_rounded(values)}
+                for (section_name, operation, table_name), values in sorted(usage.items())
+            ],
+        }
+
+
+def _rounded(usage):
+    return {name: round(value, 2) if isinstance(value, float) else value for name, value in usage.items()}
+
+
+# --- Scopes ---
+
+def current_request() -> Optional[RequestMetrics]:
+    return _current_request.get()
+
+
+def start_request(kind: str, name: str, **fields) -> RequestMetrics:
+    """
+    Make a new top-level request the active one in this context without a
+    `with` block (a Streamlit script run, which st.rerun() can cut short);
+    end it with finish_request().
+    """
+    metrics = RequestMetrics(kind, name, **fields)
+    _current_request.set(metrics)
+    return metrics
+
+
+def finish_request(metrics: RequestMetrics) -> Dict[str, Any]:
+    """Log and keep the request's summary; safe to call twice."""
+    if metrics.duration_ms is not None:
+        return metrics.summary()
+    metrics.finish()
+    summary = metrics.summary()
+    with _recent_lock:
+        _recent.append(summary)
+    logger.info(json.dumps({'event': 'request_metrics', **summary}, default=str))
+    if _current_request.get() is metrics:
+        _current_request.set(metrics.parent)
+    return summary
+
+
+@contextmanager
+def request_scope(kind: str, name: str, **fields):
+    """Count DynamoDB usage inside the block as one request (also towards any enclosing one)."""
+    metrics = RequestMetrics(kind, name, parent=_current_request.get(), **fields)
+    token = _current_request.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_request.reset(token)
+        finish_request(metrics)
+
+
+@contextmanager
+def section(name: str):
+    """Attribute DynamoDB calls in the block to `name` (a tab, a tool) within the current request."""
+    token = _current_section.set(name)
+    try:
+        yield
+    finally:
+        _current_section.reset(token)
+
+
+def metered(func):
+    """Decorator: run `func` as a section named after it (put it under @tool)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with section(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def recent_requests(limit: int = None, **fields) -> List[Dict[str, Any]]:
+    """Finished request summaries, newest first, optionally only those whose fields match."""
+    with _recent_lock:
+        summaries = list(_recent)
+    summaries = [
+        summary for summary in reversed(summaries)
+        if all(summary.get(name) == value for name, value in fields.items())
+    ]
+    return summaries[:limit] if limit else summaries
+
+
+# --- Client instrumentation ---
+
+def _consumed_units(consumed, table_name):
+    """(table, capacity units) pairs from a ConsumedCapacity entry or list."""
+    if not consumed:
+        return []
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return [(entry.get('TableName', table_name), float(entry.get('CapacityUnits', 0))) for entry in consumed]
+
+
+def instrument_dynamodb(client):
+    """
+    Ask for consumed capacity on every call of this botocore client and add
+    each call's units and latency to the active request. Calls made while no
+    request is active are left alone (nothing is requested or counted).
+    """
+    def add_capacity_request(params, model, **kwargs):
+        if _current_request.get() is not None and 'ReturnConsumedCapacity' in model.input_shape.members:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+    def started(context, **kwargs):
+        context['request_metrics_started'] = time.perf_counter()
+
+    def finished(context, parsed=None, exception=None, **kwargs):
+        metrics = _current_request.get()
+        started_at = context.get('request_metrics_started')
+        if metrics is None or started_at is None:
+            return
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        operation = context['request_metrics_operation']
+        table_name = context.get('request_metrics_table', '?')
+        units = _consumed_units((parsed or {}).get('ConsumedCapacity'), table_name) or [(table_name, 0.0)]
+        unit_kind = 'read_units' if operation in READ_OPERATIONS else 'write_units'
+        section_name = _current_section.get()
+        for i, (consumed_table, capacity) in enumerate(units):
+            usage = _empty_usage()
+            usage[unit_kind] = capacity
+            # One call, one latency; further tables of a batch/transaction only add units
+            if i == 0:
+                usage['calls'] = 1
+                usage['errors'] = int(exception is not None or 'Error' in (parsed or {}))
+                usage['latency_ms'] = latency_ms
+            metrics.record(section_name, operation, consumed_table, usage)
+
+    def remember_call(params, model, context, **kwargs):
+        # after-call-error gets no operation model, so the name travels in the context
+        context['request_metrics_operation'] = model.name
+        table_name = params.get('TableName')
+        if table_name is None:
+            # Batch and transaction calls name their tables inside the request
+            tables = params.get('RequestItems') or {}
+            table_name = next(iter(tables), None)
+            for action in params.get('TransactItems', []):
+                table_name = table_name or next(iter(action.values())).get('TableName')
+        context['request_metrics_table'] = table_name or '?'
+
+    events = client.meta.events
+    events.register('provide-client-params.dynamodb', add_capacity_request)
+    events.register('before-parameter-build.dynamodb', remember_call)
+    events.register('before-call.dynamodb', started)
+    events.register('after-call.dynamodb', finished)
+    events.register('after-call-error.dynamodb', finished)
+    return client
+
+
+def instrument_bedrock(client):
+    """Count each model call of this bedrock-runtime client, and its latency, in the active request."""
+    def started(model, context, **kwargs):
+        if model.name in GENERATION_OPERATIONS:
+            context['request_metrics_started'] = time.perf_counter()
+
+    def finished(context, exception=None, **kwargs):
+        metrics = _current_request.get()
+        started_at = context.get('request_metrics_started')
+        if metrics is None or started_at is None:
+            return
+        metrics.record_llm({'calls': 1, 'errors': int(exception is not None),
+                            'latency_ms': (time.perf_counter() - started_at) * 1000})
+
+    events = client.meta.events
+    events.register('before-call.bedrock-runtime', started)
+    events.register('after-call.bedrock-runtime', finished)
+    events.register('after-call-error.bedrock-runtime', finished)
+    return client
+
+
+class ModelUsageHooks:
+    """
+    Strands hook provider adding the token usage of each model call, as
+    Bedrock reports it, to the active request (Agent(hooks=[model_usage_hooks])).
+    """
+
+    def register_hooks(self, registry, **kwargs):
+        from strands.hooks import AfterModelCallEvent
+
+        registry.add_callback(AfterModelCallEvent, self._after_model_call)
+
+    def _after_model_call(self, event):
+        metrics = _current_request.get()
+        if metrics is None or event.stop_response is None:
+            return
+        usage = event.stop_response.message.get('metadata', {}).get('usage', {})
+        metrics.record_model_call(getattr(event.agent, 'name', None), {
+            'input_tokens': usage.get('inputTokens', 0),
+            'output_tokens': usage.get('outputTokens', 0),
+            'cache_read_tokens': usage.get('cacheReadInputTokens', 0),
+            'cache_write_tokens': usage.get('cacheWriteInputTokens', 0),
+        })
+
+
+model_usage_hooks = ModelUsageHooks()
@@ -0,0 +1,791 @@
+"""
+Pluggable storage for the family finance tables.
+
+Every table is addressed the same way in every backend: a partition key
+(`family_id`, `email` for the login index, `member_id` for heart-rate
+samples) plus an optional sort key, as listed in TABLE_KEYS. Pick the backend with FAMILY_STORAGE_BACKEND:
+
+    dynamodb  AWS DynamoDB through the shared resource in aws_clients (default)
+    memory    process-local dicts; fastest, nothing persisted
+    sqlite    a local file (FAMILY_STORAGE_SQLITE_PATH, default family_finance.db)
+
+Numbers come back as Decimal from every backend, as they do from DynamoDB,
+unless a read asks for `numbers=float`; that path skips Decimal entirely
+(see item_codec.py) and is what the UI and the finance tools use.
+"""
+import bisect
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from item_codec import decode_frame, decode_item, encode_value
+
+FAMILY_STORAGE_BACKEND = os.getenv('FAMILY_STORAGE_BACKEND', 'dynamodb')
+FAMILY_STORAGE_SQLITE_PATH = os.getenv('FAMILY_STORAGE_SQLITE_PATH', 'family_finance.db')
+
+EMAIL_INDEX_TABLE = 'FamilyEmailIndex'
+HEART_RATE_TABLE = 'HeartRateSamples'
+
+# Primary key attributes of each per-family table (partition key first)
+FAMILY_TABLE_KEYS = {
+    "FamilyProfiles": ("family_id",),
+    "BudgetAllocations": ("family_id", "category_month"),
+    "ExpenseTransactions": ("family_id", "transaction_date_id"),
+    "FamilyAssets": ("family_id", "asset_type_id"),
+    "FinancialGoals": ("family_id", "goal_id"),
+    "DecisionHistory": ("family_id", "decision_timestamp_id"),
+    "BudgetRollups": ("family_id", "year_month"),
+}
+TABLE_KEYS = dict(FAMILY_TABLE_KEYS)
+TABLE_KEYS[EMAIL_INDEX_TABLE] = ("email",)
+TABLE_KEYS[HEART_RATE_TABLE] = ("member_id", "epoch")
+# Key attributes holding numbers (sorted numerically); every other key is a string
+NUMBER_KEYS = {"epoch"}
+
+# DynamoDB cancels a transaction that races another write to one of its
+# items; it is retried this many times with jittered backoff
+TRANSACT_ATTEMPTS = 5
+
+
+class ConditionFailedError(Exception):
+    """A conditional put/update did not apply (e.g. the key already exists)."""
+
+
+@dataclass(frozen=True)
+class TransactPut:
+    """A put inside transact_write()."""
+    table_name: str
+    item: Dict[str, Any]
+    if_not_exists: bool = False
+
+
+@dataclass(frozen=True)
+class TransactUpdate:
+    """
+    An update (SET / atomic ADD) inside transact_write(). With `expected`, it
+    only applies if each named attribute currently has that value (None = the
+    attribute is absent), else the transaction fails with ConditionFailedError.
+    """
+    table_name: str
+    key: Dict[str, Any]
+    set_values: Dict[str, Any] = None
+    add_values: Dict[str, Any] = None
+    must_exist: bool = False
+    expected: Dict[str, Any] = None
+
+
+# Helper function to convert Decimal to float for JSON serialization
+def decimal_to_float(obj):
+    if isinstance(obj, list):
+        return [decimal_to_float(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: decimal_to_float(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    else:
+        return obj
+
+
+def to_storage_types(obj):
+    """Numbers to Decimal, like boto3 returns them; everything else unchanged."""
+    if isinstance(obj, list):
+        return [to_storage_types(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: to_storage_types(v) for k, v in obj.items()}
+    elif isinstance(obj, bool):
+        return obj
+    elif isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, int):
+        return Decimal(obj)
+    else:
+        return obj
+
+
+def _sort_range(begins_with: str = None, between: Tuple[str, str] = None):
+    """(low, high) inclusive sort-key bounds for a key condition, None = open."""
+    if begins_with is not None:
+        return begins_with, begins_with + '\U0010ffff'
+    if between is not None:
+        return between
+    return None, None
+
+
+def _project(item, attributes, numbers=Decimal):
+    if attributes:
+        item = {name: item[name] for name in attributes if name in item}
+    return decimal_to_float(item) if numbers is float else item
+
+
+def _apply_update(item, set_values, add_values):
+    for name, value in (set_values or {}).items():
+        item[name] = value
+    for name, value in (add_values or {}).items():
+        current = item.get(name)
+        if isinstance(value, (set, frozenset)):
+            item[name] = set(current or set()) | set(value)
+        else:
+            item[name] = (current or Decimal(0)) + value
+    return item
+
+
+def _check_expected(table_name, item, expected):
+    """Raise ConditionFailedError unless `item` (None = missing) has the TransactUpdate.expected values."""
+    for name, value in (expected or {}).items():
+        current = (item or {}).get(name)
+        if (current is None) != (value is None) or (value is not None and current != to_storage_types(value)):
+            raise ConditionFailedError(f"{table_name} {name} is {current}, expected {value}")
+
+
+class StorageBackend:
+    """
+    get / query / scan / put / update / delete / batch over the tables in TABLE_KEYS.
+
+    query() yields items lazily in sort-key order and accepts the key
+    conditions the app uses: `begins_with` or `between` on the sort key,
+    `ascending`, `limit` and `attributes` (projection). Reads take
+    `numbers=float` to get floats instead of Decimals.
+    """
+    name = "base"
+
+    def key_of(self, table_name: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: item[name] for name in TABLE_KEYS[table_name]}
+
+    def get(self, table_name: str, key: Dict[str, Any], attributes: Sequence[str] = None,
+            numbers: type = Decimal) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def query(self, table_name: str, partition_value: str, begins_with: str = None,
+              between: Tuple[str, str] = None, ascending: bool = True, limit: int = None,
+              attributes: Sequence[str] = None, page_size: int = None,
+              numbers: type = Decimal) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def query_frame(self, table_name: str, partition_value: str, columns: Sequence[str] = None, **query_kwargs):
+        """query() straight into a pandas DataFrame with float numeric columns."""
+        import pandas as pd
+
+        items = self.query(table_name, partition_value, attributes=columns, numbers=float, **query_kwargs)
+        return pd.DataFrame.from_records(items, columns=columns)
+
+    def scan(self, table_name: str, attributes: Sequence[str] = None,
+             numbers: type = Decimal) -> Iterator[Dict[str, Any]]:
+        """Every item in `table_name`, in no particular order; for maintenance jobs, not requests."""
+        raise NotImplementedError
+
+    def put(self, table_name: str, item: Dict[str, Any], if_not_exists: bool = False,
+            return_old: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Write an item; with if_not_exists, raise ConditionFailedError if the
+        key is taken. With return_old, return the item it replaced (or None),
+        read and written in one step.
+        """
+        raise NotImplementedError
+
+    def update(self, table_name: str, key: Dict[str, Any], set_values: Dict[str, Any] = None,
+               add_values: Dict[str, Any] = None, must_exist: bool = False,
+               return_old: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        SET `set_values` and atomically ADD `add_values` (numbers or sets);
+        returns the updated item, or with return_old the item as it was just
+        before this update (None if the update created it). With must_exist,
+        a missing item raises ConditionFailedError instead of being created.
+        """
+        raise NotImplementedError
+
+    def transact_write(self, operations: Sequence[Any]):
+        """
+        Apply TransactPut / TransactUpdate operations all-or-nothing: if any
+        condition fails, ConditionFailedError is raised and nothing is written.
+        At most one operation per item (a DynamoDB rule).
+        """
+        raise NotImplementedError
+
+    def delete(self, table_name: str, key: Dict[str, Any]):
+        raise NotImplementedError
+
+    def batch_put(self, table_name: str, items: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for item in items:
+            self.put(table_name, item)
+            count += 1
+        return count
+
+    def batch_delete(self, table_name: str, keys: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for key in keys:
+            self.delete(table_name, key)
+            count += 1
+        return count
+
+
+# --- DynamoDB ---
+
+class DynamoDBBackend(StorageBackend):
+    name = "dynamodb"
+
+    def __init__(self, dynamodb=None, client=None):
+        # None = the shared resource / low-level client from aws_clients, created on first use
+        self._dynamodb = dynamodb
+        self._client = client
+
+    @property
+    def dynamodb(self):
+        if self._dynamodb is None:
+            from aws_clients import get_dynamodb
+            self._dynamodb = get_dynamodb()
+        return self._dynamodb
+
+    def table(self, table_name: str):
+        return self.dynamodb.Table(table_name)
+
+    # Reads go through the low-level client and item_codec, so numbers are
+    # parsed once into the requested type instead of via boto3's Decimals.
+
+    @property
+    def client(self):
+        if self._client is None:
+            if self._dynamodb is None:
+                from aws_clients import get_dynamodb_client
+                self._client = get_dynamodb_client()
+            else:
+                # A resource was passed in (e.g. a local stand-in); talk to the same endpoint
+                import boto3
+
+                meta = self._dynamodb.meta.client.meta
+                self._client = boto3.client('dynamodb', region_name=meta.region_name,
+                                            endpoint_url=meta.endpoint_url, config=meta.config)
+        return self._client
+
+    def get(self, table_name, key, attributes=None, numbers=Decimal):
+        request = {'TableName': table_name, 'Key': {name: encode_value(value) for name, value in key.items()}}
+        if attributes:
+            request['ProjectionExpression'] = ", ".join(f"#p{i}" for i in range(len(attributes)))
+            request['ExpressionAttributeNames'] = {f"#p{i}": name for i, name in enumerate(attributes)}
+        raw = self.client.get_item(**request).get('Item')
+        return decode_item(raw, numbers) if raw is not None else None
+
+    def _query_request(self, table_name, partition_value, begins_with, between, ascending,
+                       limit, attributes, page_size):
+        keys = TABLE_KEYS[table_name]
+        names = {'#k0': keys[0]}
+        values = {':k0': encode_value(partition_value)}
+        condition = '#k0 = :k0'
+        if begins_with is not None:
+            names['#k1'] = keys[1]
+            values[':k1'] = encode_value(begins_with)
+            condition += ' AND begins_with(#k1, :k1)'
+        elif between is not None:
+            names['#k1'] = keys[1]
+            values[':lo'] = encode_value(between[0])
+            values[':hi'] = encode_value(between[1])
+            condition += ' AND #k1 BETWEEN :lo AND :hi'
+        request = {
+            'TableName': table_name,
+            'KeyConditionExpression': condition,
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            'ScanIndexForward': ascending,
+        }
+        if attributes:
+            for i, attribute in enumerate(attributes):
+                names[f"#p{i}"] = attribute
+            request['ProjectionExpression'] = ", ".join(f"#p{i}" for i in range(len(attributes)))
+        if page_size or limit:
+            request['Limit'] = page_size or limit
+        return request
+
+    def _iter_raw(self, request, limit=None):
+        """Low-level items across all result pages; later pages are fetched lazily."""
+        yielded = 0
+        while True:
+            response = self.client.query(**request)
+            for raw in response.get('Items', []):
+                yield raw
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            request['ExclusiveStartKey'] = last_key
+
+    def query(self, table_name, partition_value, begins_with=None, between=None, ascending=True,
+              limit=None, attributes=None, page_size=None, numbers=Decimal):
+        request = self._query_request(table_name, partition_value, begins_with, between, ascending,
+                                      limit, attributes, page_size)
+        for raw in self._iter_raw(request, limit):
+            yield decode_item(raw, numbers)
+
+    def query_frame(self, table_name, partition_value, columns=None, begins_with=None, between=None,
+                    ascending=True, limit=None, page_size=None):
+        request = self._query_request(table_name, partition_value, begins_with, between, ascending,
+                                      limit, columns, page_size)
+        return decode_frame(self._iter_raw(request, limit), columns)
+
+    def scan(self, table_name, attributes=None, numbers=Decimal):
+        request = {'TableName': table_name}
+        if attributes:
+            request['ProjectionExpression'] = ", ".join(f"#p{i}" for i in range(len(attributes)))
+            request['ExpressionAttributeNames'] = {f"#p{i}": name for i, name in enumerate(attributes)}
+        while True:
+            response = self.client.scan(**request)
+            for raw in response.get('Items', []):
+                yield decode_item(raw, numbers)
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            request['ExclusiveStartKey'] = last_key
+
+    def put(self, table_name, item, if_not_exists=False, return_old=False):
+        # Floats become Decimals here too, so every backend accepts the same items
+        kwargs = {'Item': to_storage_types(item)}
+        if if_not_exists:
+            kwargs['ConditionExpression'] = f"attribute_not_exists({TABLE_KEYS[table_name][0]})"
+        if return_old:
+            kwargs['ReturnValues'] = 'ALL_OLD'
+        try:
+            response = self.table(table_name).put_item(**kwargs)
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+            raise ConditionFailedError(str(e)) from e
+        return response.get('Attributes') if return_old else None
+
+    @staticmethod
+    def _update_request(table_name, key, set_values, add_values, must_exist, expected=None):
+        names = {}
+        values = {}
+        set_parts = []
+        add_parts = []
+        for i, (name, value) in enumerate((set_values or {}).items()):
+            names[f"#s{i}"] = name
+            values[f":s{i}"] = value
+            set_parts.append(f"#s{i} = :s{i}")
+        for i, (name, value) in enumerate((add_values or {}).items()):
+            names[f"#a{i}"] = name
+            values[f":a{i}"] = value
+            add_parts.append(f"#a{i} :a{i}")
+        expression = []
+        if set_parts:
+            expression.append("SET " + ", ".join(set_parts))
+        if add_parts:
+            expression.append("ADD " + ", ".join(add_parts))
+
+        request = {
+            'Key': key,
+            'UpdateExpression': " ".join(expression),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': to_storage_types(values),
+        }
+        conditions = []
+        if must_exist:
+            names['#pk'] = TABLE_KEYS[table_name][0]
+            conditions.append("attribute_exists(#pk)")
+        for i, (name, value) in enumerate((expected or {}).items()):
+            names[f"#e{i}"] = name
+            if value is None:
+                conditions.append(f"attribute_not_exists(#e{i})")
+            else:
+                request['ExpressionAttributeValues'][f":e{i}"] = to_storage_types(value)
+                conditions.append(f"#e{i} = :e{i}")
+        if conditions:
+            request['ConditionExpression'] = " AND ".join(conditions)
+        return request
+
+    def update(self, table_name, key, set_values=None, add_values=None, must_exist=False, return_old=False):
+        kwargs = self._update_request(table_name, key, set_values, add_values, must_exist)
+        kwargs['ReturnValues'] = 'ALL_OLD' if return_old else 'ALL_NEW'
+        try:
+            response = self.table(table_name).update_item(**kwargs)
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+            raise ConditionFailedError(str(e)) from e
+        return response.get('Attributes') if return_old else response['Attributes']
+
+    def transact_write(self, operations):
+        actions = []
+        for operation in operations:
+            if isinstance(operation, TransactPut):
+                put = {'TableName': operation.table_name, 'Item': to_storage_types(operation.item)}
+                if operation.if_not_exists:
+                    put['ConditionExpression'] = f"attribute_not_exists({TABLE_KEYS[operation.table_name][0]})"
+                actions.append({'Put': put})
+            else:
+                update = self._update_request(operation.table_name, operation.key, operation.set_values,
+                                              operation.add_values, operation.must_exist, operation.expected)
+                actions.append({'Update': {'TableName': operation.table_name, **update}})
+        # The resource's client, so items are serialized from Python types like table calls are
+        client = self.dynamodb.meta.client
+        for attempt in range(TRANSACT_ATTEMPTS):
+            try:
+                client.transact_write_items(TransactItems=actions)
+                return
+            except client.exceptions.TransactionCanceledException as e:
+                codes = {reason.get('Code') for reason in e.response.get('CancellationReasons', [])}
+                if 'ConditionalCheckFailed' in codes:
+                    raise ConditionFailedError(str(e)) from e
+                if 'TransactionConflict' not in codes or attempt == TRANSACT_ATTEMPTS - 1:
+                    raise
+            time.sleep(random.uniform(0, 0.02 * 2 ** attempt))
+
+    def delete(self, table_name, key):
+        self.table(table_name).delete_item(Key=key)
+
+    def batch_put(self, table_name, items):
+        count = 0
+        # batch_writer groups puts into 25-item requests and resends UnprocessedItems
+        with self.table(table_name).batch_writer(overwrite_by_pkeys=list(TABLE_KEYS[table_name])) as batch:
+            for item in items:
+                batch.put_item(Item=to_storage_types(item))
+                count += 1
+        return count
+
+    def batch_delete(self, table_name, keys):
+        count = 0
+        with self.table(table_name).batch_writer(overwrite_by_pkeys=list(TABLE_KEYS[table_name])) as batch:
+            for key in keys:
+                batch.delete_item(Key=key)
+                count += 1
+        return count
+
+
+# --- In-memory ---
+
+class MemoryBackend(StorageBackend):
+    """Dict-of-partitions store with sorted sort keys; thread-safe, not persisted."""
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # table -> partition value -> (sorted sort keys, {sort key: item})
+        self._tables = {table_name: {} for table_name in TABLE_KEYS}
+
+    def _partition(self, table_name, partition_value, create=False):
+        partitions = self._tables.setdefault(table_name, {})
+        partition = partitions.get(partition_value)
+        if partition is None and create:
+            partition = partitions[partition_value] = ([], {})
+        return partition
+
+    def _split_key(self, table_name, key):
+        keys = TABLE_KEYS[table_name]
+        return key[keys[0]], (key[keys[1]] if len(keys) > 1 else '')
+
+    def get(self, table_name, key, attributes=None, numbers=Decimal):
+        partition_value, sort_value = self._split_key(table_name, key)
+        with self._lock:
+            partition = self._partition(table_name, partition_value)
+            item = partition[1].get(sort_value) if partition else None
+            return _project(dict(item), attributes, numbers) if item is not None else None
+
+    def query(self, table_name, partition_value, begins_with=None, between=None, ascending=True,
+              limit=None, attributes=None, page_size=None, numbers=Decimal):
+        low, high = _sort_range(begins_with, between)
+        remaining = limit
+        last_key = None
+        # Like DynamoDB pages: each page is copied under the lock, so concurrent
+        # writers can't change what we yield, and resumes after the last key seen
+        while remaining is None or remaining > 0:
+            count = min(n for n in (page_size, remaining) if n is not None) if page_size or remaining else None
+            with self._lock:
+                partition = self._partition(table_name, partition_value)
+                if partition is None:
+                    return
+                sort_keys, items = partition
+                start = bisect.bisect_left(sort_keys, low) if low is not None else 0
+                end = bisect.bisect_right(sort_keys, high) if high is not None else len(sort_keys)
+                if last_key is not None and ascending:
+                    start = max(start, bisect.bisect_right(sort_keys, last_key))
+                elif last_key is not None:
+                    end = min(end, bisect.bisect_left(sort_keys, last_key))
+                if ascending:
+                    selected = sort_keys[start:end if count is None else min(end, start + count)]
+                else:
+                    selected = sort_keys[start if count is None else max(start, end - count):end][::-1]
+                page = [_project(dict(items[sort_value]), attributes, numbers) for sort_value in selected]
+            yield from page
+            if count is None or len(selected) < count:
+                return
+            last_key = selected[-1]
+            if remaining is not None:
+                remaining -= len(selected)
+
+    def scan(self, table_name, attributes=None, numbers=Decimal):
+        with self._lock:
+            results = [
+                _project(dict(item), attributes, numbers)
+                for _, items in self._tables.get(table_name, {}).values()
+                for item in items.values()
+            ]
+        return iter(results)
+
+    def put(self, table_name, item, if_not_exists=False, return_old=False):
+        item = to_storage_types(item)
+        partition_value, sort_value = self._split_key(table_name, item)
+        with self._lock:
+            sort_keys, items = self._partition(table_name, partition_value, create=True)
+            old = items.get(sort_value)
+            if old is not None:
+                if if_not_exists:
+                    raise ConditionFailedError(f"{table_name} item already exists")
+            else:
+                bisect.insort(sort_keys, sort_value)
+            items[sort_value] = item
+        return dict(old) if return_old and old is not None else None
+
+    def update(self, table_name, key, set_values=None, add_values=None, must_exist=False, return_old=False):
+        set_values = to_storage_types(set_values or {})
+        add_values = to_storage_types(add_values or {})
+        partition_value, sort_value = self._split_key(table_name, key)
+        with self._lock:
+            sort_keys, items = self._partition(table_name, partition_value, create=True)
+            item = items.get(sort_value)
+            old = dict(item) if item is not None else None
+            if item is None:
+                if must_exist:
+                    raise ConditionFailedError(f"{table_name} item does not exist")
+                bisect.insort(sort_keys, sort_value)
+                item = items[sort_value] = dict(key)
+            item = dict(_apply_update(item, set_values, add_values))
+        return old if return_old else item
+
+    def transact_write(self, operations):
+        with self._lock:
+            # Check every condition before writing anything
+            for operation in operations:
+                key = operation.item if isinstance(operation, TransactPut) else operation.key
+                current = self.get(operation.table_name, self.key_of(operation.table_name, key))
+                exists = current is not None
+                if isinstance(operation, TransactPut) and operation.if_not_exists and exists:
+                    raise ConditionFailedError(f"{operation.table_name} item already exists")
+                if isinstance(operation, TransactUpdate):
+                    if operation.must_exist and not exists:
+                        raise ConditionFailedError(f"{operation.table_name} item does not exist")
+                    _check_expected(operation.table_name, current, operation.expected)
+            for operation in operations:
+                if isinstance(operation, TransactPut):
+                    self.put(operation.table_name, operation.item)
+                else:
+                    self.update(operation.table_name, operation.key, operation.set_values, operation.add_values)
+
+    def delete(self, table_name, key):
+        partition_value, sort_value = self._split_key(table_name, key)
+        with self._lock:
+            partition = self._partition(table_name, partition_value)
+            if partition is None or partition[1].pop(sort_value, None) is None:
+                return
+            sort_keys = partition[0]
+            del sort_keys[bisect.bisect_left(sort_keys, sort_value)]
+            if not sort_keys:
+                del self._tables[table_name][partition_value]
+
+
+# --- SQLite ---
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        # Stored as plain JSON numbers so float reads need no conversion;
+        # the shortest float repr gives back the same decimal digits
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": sorted(value)}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(obj):
+    if "__set__" in obj:
+        return set(obj["__set__"])
+    return obj
+
+
+class SQLiteBackend(StorageBackend):
+    """One SQLite table per logical table: (pk, sk) primary key plus the JSON item."""
+    name = "sqlite"
+
+    def __init__(self, path: str = FAMILY_STORAGE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        # Serializes read-modify-write updates across this process's connections
+        self._write_lock = threading.Lock()
+        connection = self._connection()
+        for table_name in TABLE_KEYS:
+            # sk has no declared type, so numeric sort keys (epochs) are kept and ordered as numbers
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" ('
+                'pk TEXT NOT NULL, sk NOT NULL, item TEXT NOT NULL, '
+                'PRIMARY KEY (pk, sk)) WITHOUT ROWID'
+            )
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _split_key(self, table_name, key):
+        keys = TABLE_KEYS[table_name]
+        return key[keys[0]], (key[keys[1]] if len(keys) > 1 else '')
+
+    def _dumps(self, item):
+        return json.dumps(to_storage_types(item), default=_encode)
+
+    def _loads(self, text, numbers=Decimal):
+        if numbers is float:
+            return json.loads(text, object_hook=_decode, parse_int=float)
+        return json.loads(text, object_hook=_decode, parse_float=Decimal, parse_int=Decimal)
+
+    def get(self, table_name, key, attributes=None, numbers=Decimal):
+        pk, sk = self._split_key(table_name, key)
+        row = self._connection().execute(
+            f'SELECT item FROM "{table_name}" WHERE pk = ? AND sk = ?', (pk, sk)
+        ).fetchone()
+        return _project(self._loads(row[0], numbers), attributes) if row else None
+
+    def query(self, table_name, partition_value, begins_with=None, between=None, ascending=True,
+              limit=None, attributes=None, page_size=None, numbers=Decimal):
+        low, high = _sort_range(begins_with, between)
+        sql = f'SELECT item FROM "{table_name}" WHERE pk = ?'
+        params = [partition_value]
+        if low is not None:
+            sql += ' AND sk >= ?'
+            params.append(low)
+        if high is not None:
+            sql += ' AND sk <= ?'
+            params.append(high)
+        sql += ' ORDER BY sk ' + ('ASC' if ascending else 'DESC')
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        cursor = self._connection().execute(sql, params)
+        for row in cursor:
+            yield _project(self._loads(row[0], numbers), attributes)
+
+    def scan(self, table_name, attributes=None, numbers=Decimal):
+        for row in self._connection().execute(f'SELECT item FROM "{table_name}"'):
+            yield _project(self._loads(row[0], numbers), attributes)
+
+    def put(self, table_name, item, if_not_exists=False, return_old=False):
+        pk, sk = self._split_key(table_name, item)
+        connection = self._connection()
+        if return_old:
+            # Same read-modify-write path as update(), so the old item is exactly the one replaced
+            with self._write_lock, connection:
+                connection.execute('BEGIN IMMEDIATE')
+                row = connection.execute(
+                    f'SELECT item FROM "{table_name}" WHERE pk = ? AND sk = ?', (pk, sk)
+                ).fetchone()
+                if row is not None and if_not_exists:
+                    raise ConditionFailedError(f"{table_name} item already exists")
+                connection.execute(f'INSERT OR REPLACE INTO "{table_name}" (pk, sk, item) VALUES (?, ?, ?)',
+                                   (pk, sk, self._dumps(item)))
+            return self._loads(row[0]) if row else None
+        verb = 'INSERT' if if_not_exists else 'INSERT OR REPLACE'
+        try:
+            with connection:
+                connection.execute(f'{verb} INTO "{table_name}" (pk, sk, item) VALUES (?, ?, ?)',
+                                   (pk, sk, self._dumps(item)))
+        except sqlite3.IntegrityError as e:
+            raise ConditionFailedError(str(e)) from e
+
+    def _update_row(self, connection, table_name, key, set_values, add_values, must_exist, expected=None):
+        """Read-modify-write of one item inside the caller's transaction; returns (old, new)."""
+        pk, sk = self._split_key(table_name, key)
+        row = connection.execute(
+            f'SELECT item FROM "{table_name}" WHERE pk = ? AND sk = ?', (pk, sk)
+        ).fetchone()
+        if row is None and must_exist:
+            raise ConditionFailedError(f"{table_name} item does not exist")
+        _check_expected(table_name, self._loads(row[0]) if row else None, expected)
+        item = self._loads(row[0]) if row else dict(key)
+        item = _apply_update(item, to_storage_types(set_values or {}), to_storage_types(add_values or {}))
+        connection.execute(f'INSERT OR REPLACE INTO "{table_name}" (pk, sk, item) VALUES (?, ?, ?)',
+                           (pk, sk, self._dumps(item)))
+        return (self._loads(row[0]) if row else None), item
+
+    def update(self, table_name, key, set_values=None, add_values=None, must_exist=False, return_old=False):
+        connection = self._connection()
+        with self._write_lock, connection:
+            connection.execute('BEGIN IMMEDIATE')
+            old, item = self._update_row(connection, table_name, key, set_values, add_values, must_exist)
+        return old if return_old else item
+
+    def transact_write(self, operations):
+        connection = self._connection()
+        # One SQLite transaction; a failed condition raises inside it and rolls everything back
+        with self._write_lock, connection:
+            connection.execute('BEGIN IMMEDIATE')
+            for operation in operations:
+                if isinstance(operation, TransactUpdate):
+                    self._update_row(connection, operation.table_name, operation.key, operation.set_values,
+                                     operation.add_values, operation.must_exist, operation.expected)
+                    continue
+                verb = 'INSERT' if operation.if_not_exists else 'INSERT OR REPLACE'
+                try:
+                    connection.execute(f'{verb} INTO "{operation.table_name}" (pk, sk, item) VALUES (?, ?, ?)',
+                                       (*self._split_key(operation.table_name, operation.item),
+                                        self._dumps(operation.item)))
+                except sqlite3.IntegrityError as e:
+                    raise ConditionFailedError(str(e)) from e
+
+    def delete(self, table_name, key):
+        pk, sk = self._split_key(table_name, key)
+        connection = self._connection()
+        with connection:
+            connection.execute(f'DELETE FROM "{table_name}" WHERE pk = ? AND sk = ?', (pk, sk))
+
+    def batch_put(self, table_name, items):
+        rows = [(*self._split_key(table_name, item), self._dumps(item)) for item in items]
+        connection = self._connection()
+        with connection:
+            connection.executemany(f'INSERT OR REPLACE INTO "{table_name}" (pk, sk, item) VALUES (?, ?, ?)', rows)
+        return len(rows)
+
+    def batch_delete(self, table_name, keys):
+        rows = [self._split_key(table_name, key) for key in keys]
+        connection = self._connection()
+        with connection:
+            connection.executemany(f'DELETE FROM "{table_name}" WHERE pk = ? AND sk = ?', rows)
+        return len(rows)
+
+
+# --- Backend selection ---
+
+BACKENDS = {
+    "dynamodb": DynamoDBBackend,
+    "memory": MemoryBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend: str = FAMILY_STORAGE_BACKEND, **kwargs) -> StorageBackend:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](**kwargs)
+
+
+def get_storage() -> StorageBackend:
+    """Process-wide backend chosen by FAMILY_STORAGE_BACKEND, created on first use."""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: StorageBackend):
+    """Swap the process-wide backend, e.g. for benchmarks."""
+    global _storage
+    with _storage_lock:
+        _storage = storage
@@ -1,20 +1,32 @@
 import streamlit as st
-import boto3
 import uuid
 from datetime import datetime, date
 from decimal import Decimal
 import time
 import hashlib
+import itertools
 import pandas as pd
+from aws_clients import pool_stats
+from family_cache import family_cache, record_write
+from transaction_import import import_transactions
+from account_deletion import CHILD_TABLES, delete_family_account
+from family_data import (
+    EMAIL_INDEX_TABLE, iter_family_items, iter_family_table, latest_transactions, lookup_family_id,
+    normalize_email, read_family_frame, transaction_window
+)
+from budget_rollups import read_rollup, rollup_categories, save_budget, save_expense
+from query_router import answer_cache, end_session, master_pool, router_stats, start_answer
+from request_metrics import finish_request, recent_requests, section, start_request
+from storage import ConditionFailedError, get_storage
 
 st.set_page_config(
     page_title="Family Finance Assistant",
     layout="wide"
 )
 
-@st.cache_resource
-def init_dynamodb():
-    return boto3.resource('dynamodb', region_name='us-east-1')
+def init_storage():
+    # Shared with the agents; backend chosen by FAMILY_STORAGE_BACKEND (see storage.py)
+    return get_storage()
 
 def convert_floats(obj):
     if isinstance(obj, list):
@@ -37,18 +49,15 @@ def verify_password(stored_password, provided_password):
 def authenticate_user(email, password):
     """Authenticate user against DynamoDB"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('FamilyProfiles')
+        storage = init_storage()
         
-        response = table.scan(
-            FilterExpression='email = :email',
-            ExpressionAttributeValues={
-                ':email': email
-            }
-        )
+        # Single-key lookups: email -> family_id -> profile
+        family_id = lookup_family_id(storage, email)
+        user_data = None
+        if family_id:
+            user_data = storage.get('FamilyProfiles', {'family_id': family_id})
         
-        if response['Items'] and len(response['Items']) > 0:
-            user_data = response['Items'][0]
+        if user_data is not None:
             if 'password' in user_data:
                 if len(user_data['password']) == 64:
                     if verify_password(user_data['password'], password):
@@ -67,27 +76,33 @@ def authenticate_user(email, password):
 def update_password_hash(family_id, password):
     """Update password to hashed version"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('FamilyProfiles')
-        table.update_item(
-            Key={'family_id': family_id},
-            UpdateExpression='SET password = :password, updated_at = :updated_at',
-            ExpressionAttributeValues={
-                ':password': hash_password(password),
-                ':updated_at': datetime.utcnow().isoformat() + "Z"
-            }
-        )
+        storage = init_storage()
+        storage.update('FamilyProfiles', {'family_id': family_id}, set_values={
+            'password': hash_password(password),
+            'updated_at': datetime.utcnow().isoformat() + "Z"
+        })
+        record_write(storage, family_id, 'FamilyProfiles')
     except Exception as e:
         st.error(f"Error updating password: {str(e)}")
 
 def save_family_to_dynamodb(family_data):
     """Save family profile to DynamoDB FamilyProfiles table"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('FamilyProfiles')
+        storage = init_storage()
         family_id = f"FAM{str(uuid.uuid4())[:6].upper()}"
         current_time = datetime.utcnow().isoformat() + "Z"
         
+        # Claim the email first so two sign-ups can't share it
+        try:
+            storage.put(
+                EMAIL_INDEX_TABLE,
+                {"email": normalize_email(family_data["email"]), "family_id": family_id},
+                if_not_exists=True
+            )
+        except ConditionFailedError:
+            st.error("An account with this email already exists")
+            return False, None
+        
         item = {
             "family_id": family_id,
             "family_name": family_data["family_name"],
@@ -101,7 +116,13 @@ def save_family_to_dynamodb(family_data):
             "password": hash_password(family_data["password"])
         }
         item = convert_floats(item)
-        table.put_item(Item=item)
+        try:
+            storage.put('FamilyProfiles', item)
+            record_write(storage, family_id, 'FamilyProfiles')
+        except Exception:
+            # Release the email so the user can retry the sign-up
+            storage.delete(EMAIL_INDEX_TABLE, {"email": normalize_email(family_data["email"])})
+            raise
         return True, family_id
     except Exception as e:
         st.error(f"Error saving to database: {str(e)}")
@@ -109,22 +130,14 @@ def save_family_to_dynamodb(family_data):
 
 # Data management functions
 def save_budget_allocation(family_id, category, year_month, allocated_amount, spent_amount=0):
-    """Save budget allocation to DynamoDB"""
+    """Save budget allocation to DynamoDB; spent_amount is spending not entered as expenses"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('BudgetAllocations')
+        storage = init_storage()
         
-        item = {
-            "family_id": family_id,
-            "category_month": f"{category}#{year_month}",
-            "category": category,
-            "allocated_amount": allocated_amount,
-            "spent_amount": spent_amount,
-            "remaining_amount": allocated_amount - spent_amount,
-            "year_month": year_month
-        }
-        item = convert_floats(item)
-        table.put_item(Item=item)
+        # Expenses add to spent/remaining themselves, so only the allocation is set here
+        save_budget(storage, family_id, category, year_month,
+                    convert_floats(allocated_amount), convert_floats(spent_amount))
+        record_write(storage, family_id, 'BudgetAllocations')
         return True
     except Exception as e:
         st.error(f"Error saving budget allocation: {str(e)}")
@@ -133,8 +146,7 @@ def save_budget_allocation(family_id, category, year_month, allocated_amount, sp
 def save_expense_transaction(family_id, amount, category, subcategory, description, family_member, necessity_level, transaction_date):
     """Save expense transaction to DynamoDB"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('ExpenseTransactions')
+        storage = init_storage()
         
         transaction_id = f"TXN{str(uuid.uuid4())[:6].upper()}"
         
@@ -150,7 +162,9 @@ def save_expense_transaction(family_id, amount, category, subcategory, descripti
             "transaction_date": str(transaction_date)
         }
         item = convert_floats(item)
-        table.put_item(Item=item)
+        # The transaction, its budget row's spent/remaining and the month rollup, all-or-nothing
+        save_expense(storage, item)
+        record_write(storage, family_id, 'ExpenseTransactions', 'BudgetAllocations')
         return True
     except Exception as e:
         st.error(f"Error saving expense transaction: {str(e)}")
@@ -159,8 +173,7 @@ def save_expense_transaction(family_id, amount, category, subcategory, descripti
 def save_family_asset(family_id, asset_name, asset_type, current_value, liquidity):
     """Save family asset to DynamoDB"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('FamilyAssets')
+        storage = init_storage()
         
         asset_id = f"{asset_type.upper()[:3]}{str(uuid.uuid4())[:6].upper()}"
         
@@ -174,7 +187,8 @@ def save_family_asset(family_id, asset_name, asset_type, current_value, liquidit
             "last_updated": datetime.utcnow().isoformat() + "Z"
         }
         item = convert_floats(item)
-        table.put_item(Item=item)
+        storage.put('FamilyAssets', item)
+        record_write(storage, family_id, 'FamilyAssets')
         return True
     except Exception as e:
         st.error(f"Error saving family asset: {str(e)}")
@@ -183,8 +197,7 @@ def save_family_asset(family_id, asset_name, asset_type, current_value, liquidit
 def save_financial_goal(family_id, goal_name, target_amount, current_amount, target_date, priority, monthly_allocation):
     """Save financial goal to DynamoDB"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('FinancialGoals')
+        storage = init_storage()
         
         goal_id = f"GOAL{str(uuid.uuid4())[:6].upper()}"
         
@@ -200,32 +213,68 @@ def save_financial_goal(family_id, goal_name, target_amount, current_amount, tar
             "status": "Active"
         }
         item = convert_floats(item)
-        table.put_item(Item=item)
+        storage.put('FinancialGoals', item)
+        record_write(storage, family_id, 'FinancialGoals')
         return True
     except Exception as e:
         st.error(f"Error saving financial goal: {str(e)}")
         return False
 
-def get_family_data(family_id, table_name):
+def iter_family_data(family_id, table_name, attributes=None, **query_kwargs):
+    """
+    Stream family data from a table, following every result page.
+    `attributes` lists the fields the caller reads; only those are fetched.
+    """
+    try:
+        storage = init_storage()
+        if query_kwargs:
+            items = iter_family_items(storage, table_name, family_id, attributes=attributes, **query_kwargs)
+        else:
+            # Whole-partition reads are shared with the agent tools via the cache
+            items = iter_family_table(storage, table_name, family_id, attributes=attributes)
+        for item in items:
+            yield item
+    except Exception as e:
+        st.error(f"Error fetching data from {table_name}: {str(e)}")
+
+def get_family_data(family_id, table_name, attributes=None):
     """Get family data from specific DynamoDB table"""
+    return list(iter_family_data(family_id, table_name, attributes=attributes))
+
+def get_family_frame(family_id, table_name, **query_kwargs):
+    """Family data as a DataFrame, numeric columns decoded straight to float"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table(table_name)
-        
-        response = table.query(
-            KeyConditionExpression='family_id = :fid',
-            ExpressionAttributeValues={':fid': family_id}
-        )
-        return response['Items']
+        return read_family_frame(init_storage(), table_name, family_id, **query_kwargs)
     except Exception as e:
         st.error(f"Error fetching data from {table_name}: {str(e)}")
+        return pd.DataFrame()
+
+def get_recent_transactions(family_id, limit=10, attributes=None):
+    """The family's latest transactions, newest first, read with a Limit-ed descending query"""
+    try:
+        return latest_transactions(init_storage(), family_id, limit, attributes=attributes)
+    except Exception as e:
+        st.error(f"Error fetching data from ExpenseTransactions: {str(e)}")
         return []
 
+def get_budget_rollup(family_id, year_month):
+    """Precomputed budget totals for one month (see budget_rollups.py), or None on error"""
+    try:
+        return read_rollup(init_storage(), family_id, year_month)
+    except Exception as e:
+        st.error(f"Error fetching budget totals: {str(e)}")
+        return None
+
+def _column_total(df, column):
+    """Sum a numeric column, treating a missing column or empty cells as 0"""
+    if column not in df:
+        return 0.0
+    return float(pd.to_numeric(df[column], errors='coerce').fillna(0).sum())
+
 def save_decision_history(family_id, decision_type, decision_description, amount_involved, decision_result, impact_assessment):
     """Save decision history to DynamoDB"""
     try:
-        dynamodb = init_dynamodb()
-        table = dynamodb.Table('DecisionHistory')
+        storage = init_storage()
         
         decision_id = f"DEC{str(uuid.uuid4())[:6].upper()}"
         current_time = datetime.utcnow().isoformat() + "Z"
@@ -241,7 +290,8 @@ def save_decision_history(family_id, decision_type, decision_description, amount
             "decision_date_id": current_time
         }
         item = convert_floats(item)
-        table.put_item(Item=item)
+        storage.put('DecisionHistory', item)
+        record_write(storage, family_id, 'DecisionHistory')
         return True
     except Exception as e:
         st.error(f"Error saving decision history: {str(e)}")
@@ -264,6 +314,16 @@ if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'show_chat' not in st.session_state:
     st.session_state.show_chat = False
+if 'metrics_session' not in st.session_state:
+    st.session_state.metrics_session = uuid.uuid4().hex[:8]
+
+# DynamoDB capacity and latency of this script run (request_metrics.py); a run
+# cut short by st.rerun() is closed when the next one starts
+if st.session_state.get('rerun_metrics') is not None:
+    finish_request(st.session_state.rerun_metrics)
+st.session_state.rerun_metrics = start_request(
+    "rerun", "streamlit", session=st.session_state.metrics_session, family_id=st.session_state.family_id
+)
 
 @st.dialog("Log In")
 def log_in():
@@ -425,10 +485,35 @@ def open_login():
 
 def logout():
     """Logout and clear session state"""
+    finish_request(st.session_state.rerun_metrics)
+    end_session(st.session_state.family_id, st.session_state.metrics_session)
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     st.rerun()
 
+ROUTE_CAPTIONS = {
+    "financial": "📊 Answered directly by the Finance agent",
+    "emotional": "💙 Answered directly by the Emotional agent",
+    "both": "📊💙 Finance and Emotional agents ran side by side",
+    "master": "🧭 Coordinated by the Master agent",
+}
+
+# Heading shown while streaming when another agent starts talking mid-turn
+STREAM_LABELS = {
+    "MasterAgent": "🧭 Master",
+    "financial_agent": "📊 Finance",
+    "emotional_agent": "💙 Emotional",
+}
+
+def labelled_chunks(chunks):
+    """Chat text from (agent, text) chunks, with a heading whenever the speaking agent changes."""
+    current = None
+    for source, text in chunks:
+        if current is not None and source != current:
+            yield f"\n\n**{STREAM_LABELS.get(source, source)}**\n\n"
+        current = source
+        yield text
+
 def display_chat_interface():
     """Display the chat interface with the Finance Agent"""
     st.markdown("### Financial Assistant Chat")
@@ -438,6 +523,8 @@ def display_chat_interface():
         with col2:
             if st.button("🔄 Clear Chat", type="secondary", use_container_width=True):
                 st.session_state.messages = [st.session_state.messages[0]]
+                # The session's agents forget the conversation too
+                end_session(st.session_state.family_id, st.session_state.metrics_session)
                 st.rerun()
     
     chat_container = st.container()
@@ -455,26 +542,41 @@ def display_chat_interface():
             st.markdown(prompt)
         
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing your financial data..."):
-                try:
-                    # from myfinance_agent import FinanceAgent
-                    # from finance_updated import FinanceAgent
-                    from master_agent import MasterAgent
-                    
-                    family_id = st.session_state.family_id
-                    contextualized_query = f"Family ID: {family_id}\n\nQuery: {prompt}"
-                    
-                    # temp_agent = FinanceAgent()
-                    # response = temp_agent.process_query(contextualized_query)
-                    response = MasterAgent(contextualized_query)
-                    
-                    st.markdown(response)
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    
-                except Exception as e:
-                    error_msg = f"Error processing your request: {str(e)}"
-                    st.error(error_msg)
-                    st.info("Try rephrasing your question or click 'Clear Chat' to start fresh.")
+            try:
+                # from myfinance_agent import FinanceAgent
+                # from finance_updated import FinanceAgent
+                
+                family_id = st.session_state.family_id
+                
+                # temp_agent = FinanceAgent()
+                # response = temp_agent.process_query(contextualized_query)
+                # Clearly financial or emotional questions skip MasterAgent (query_router.py);
+                # the agents' text is rendered as it is generated
+                turn = start_answer(prompt, family_id, session=st.session_state.metrics_session)
+                chunks = labelled_chunks(turn)
+                placeholder = st.empty()
+                with st.spinner("Analyzing your financial data..."):
+                    first_chunk = next(chunks, None)
+                streamed = ""
+                if first_chunk is not None:
+                    with placeholder.container():
+                        streamed = st.write_stream(itertools.chain([first_chunk], chunks))
+                answer = turn.result()
+                response = answer.text
+                
+                if streamed.strip() != response.strip():
+                    # Master and side-by-side turns stream their sub-agents' work; show the composed reply
+                    placeholder.markdown(response)
+                timing = f"total {answer.duration_ms / 1000:.1f} s"
+                if answer.first_token_ms is not None:
+                    timing = f"first token {answer.first_token_ms / 1000:.1f} s · {timing}"
+                st.caption(f"{ROUTE_CAPTIONS[answer.route.target]} · {timing}")
+                st.session_state.messages.append({"role": "assistant", "content": response})
+                
+            except Exception as e:
+                error_msg = f"Error processing your request: {str(e)}"
+                st.error(error_msg)
+                st.info("Try rephrasing your question or click 'Clear Chat' to start fresh.")
 
 def display_data_management():
     """Display data management interface"""
@@ -510,7 +612,9 @@ def display_data_management():
                     f"{datetime.now().year}-{str(month).zfill(2)}" 
                     for month in range(1, 13)
                 ], index=datetime.now().month - 1)
-                spent_amount = st.number_input("Already Spent ($)", min_value=0.0, format="%.2f")
+                spent_amount = st.number_input("Spent Outside Expenses ($)", min_value=0.0, format="%.2f",
+                                               help="Added to the category's spending; "
+                                                    "expenses entered below are counted automatically")
             
             if st.form_submit_button("Add Budget Allocation", type="primary"):
                 if allocated_amount > 0:
@@ -555,6 +659,27 @@ def display_data_management():
                         st.rerun()
                 else:
                     st.error("Please fill in all required fields with valid values")
+        
+        st.markdown("---")
+        st.subheader("Bulk Import Transactions")
+        st.caption("Upload a CSV or bank export with date, amount and description columns. "
+                   "Category, subcategory, family member and necessity level are optional.")
+        
+        uploaded_file = st.file_uploader("Transactions File", type=["csv"], key="transaction_import_file")
+        if uploaded_file is not None and st.button("Import Transactions", type="primary"):
+            result = None
+            with st.spinner("Importing transactions..."):
+                try:
+                    result = import_transactions(init_storage(), family_id, uploaded_file)
+                except Exception as e:
+                    st.error(f"Error importing transactions: {str(e)}")
+            
+            if result:
+                st.success(f"Imported {result.written:,} of {result.rows_read:,} transactions "
+                           f"in {result.seconds:.1f}s ({result.items_per_second:,.0f} items/s)")
+                if len(result.rejected):
+                    st.warning(f"{len(result.rejected):,} rows were skipped")
+                    st.dataframe(result.rejected.head(100), use_container_width=True)
     
     # Assets Tab
     with tab3:
@@ -651,6 +776,22 @@ def display_data_management():
             "Financial Goals", "Decision History"
         ])
         
+        # Transactions are selected by date on the sort key, so only the shown rows are read
+        query_kwargs = {}
+        if data_type == "Expense Transactions":
+            period = st.radio("Show", ["Latest 100", "This month", "Date range", "All history"], horizontal=True)
+            if period == "Latest 100":
+                query_kwargs = transaction_window(latest=100)
+            elif period == "This month":
+                query_kwargs = transaction_window(month=datetime.now().strftime("%Y-%m"))
+            elif period == "Date range":
+                range_col1, range_col2 = st.columns(2)
+                with range_col1:
+                    start_date = st.date_input("From", value=date.today().replace(day=1))
+                with range_col2:
+                    end_date = st.date_input("To", value=date.today())
+                query_kwargs = transaction_window(start_date=str(start_date), end_date=str(end_date))
+        
         if st.button("Load Data", type="primary"):
             table_mapping = {
                 "Budget Allocations": "BudgetAllocations",
@@ -661,37 +802,25 @@ def display_data_management():
             }
             
             table_name = table_mapping[data_type]
-            data = get_family_data(family_id, table_name)
+            df = get_family_frame(family_id, table_name, **query_kwargs)
             
-            if data:
-                # Convert Decimal objects to float for display
-                display_data = []
-                for item in data:
-                    display_item = {}
-                    for key, value in item.items():
-                        if isinstance(value, Decimal):
-                            display_item[key] = float(value)
-                        else:
-                            display_item[key] = value
-                    display_data.append(display_item)
-                
-                df = pd.DataFrame(display_data)
+            if not df.empty:
                 st.dataframe(df, use_container_width=True)
                 
                 # Add summary statistics
                 if data_type == "Budget Allocations":
-                    total_allocated = sum(float(item.get('allocated_amount', 0)) for item in data)
-                    total_spent = sum(float(item.get('spent_amount', 0)) for item in data)
+                    total_allocated = _column_total(df, 'allocated_amount')
+                    total_spent = _column_total(df, 'spent_amount')
                     st.metric("Total Allocated", f"${total_allocated:,.2f}")
                     st.metric("Total Spent", f"${total_spent:,.2f}")
                     
                 elif data_type == "Family Assets":
-                    total_value = sum(float(item.get('current_value', 0)) for item in data)
+                    total_value = _column_total(df, 'current_value')
                     st.metric("Total Asset Value", f"${total_value:,.2f}")
                     
                 elif data_type == "Financial Goals":
-                    total_target = sum(float(item.get('target_amount', 0)) for item in data)
-                    total_current = sum(float(item.get('current_amount', 0)) for item in data)
+                    total_target = _column_total(df, 'target_amount')
+                    total_current = _column_total(df, 'current_amount')
                     st.metric("Total Goal Amount", f"${total_target:,.2f}")
                     st.metric("Total Saved", f"${total_current:,.2f}")
                     
@@ -714,7 +843,7 @@ if st.session_state.logged_in and st.session_state.family_id:
         "Dashboard", "Financial Assistant", "Manage Data", "Reports", "Settings"
     ])
     
-    with tab1:
+    with tab1, section("Dashboard"):
         st.write(f"Welcome back, **{st.session_state.family_data['family_name']}**!")
         
         # Display metrics
@@ -760,7 +889,7 @@ if st.session_state.logged_in and st.session_state.family_id:
             st.write(f"Up to: ${annual_savings:,.0f}")
             st.caption("Based on 20% savings rate")
         
-    with tab2:
+    with tab2, section("Financial Assistant"):
         if len(st.session_state.messages) == 0:
             family_name = st.session_state.family_data['family_name']
             income = st.session_state.family_data['total_monthly_income']
@@ -780,10 +909,10 @@ What would you like to discuss today?"""
         
         display_chat_interface()
     
-    with tab3:
+    with tab3, section("Manage Data"):
         display_data_management()
     
-    with tab4:
+    with tab4, section("Reports"):
         st.subheader("Financial Reports & Analytics")
         
         # Summary metrics from database
@@ -794,61 +923,54 @@ What would you like to discuss today?"""
         with col1:
             st.markdown("#### Monthly Budget Overview")
             current_month = datetime.now().strftime("%Y-%m")
-            budget_data = get_family_data(family_id, "BudgetAllocations")
             
-            if budget_data:
-                current_month_data = [item for item in budget_data if item.get('year_month') == current_month]
-                if current_month_data:
-                    total_allocated = sum(float(item.get('allocated_amount', 0)) for item in current_month_data)
-                    total_spent = sum(float(item.get('spent_amount', 0)) for item in current_month_data)
-                    remaining = total_allocated - total_spent
-                    
-                    st.metric("Total Allocated", f"${total_allocated:,.2f}")
-                    st.metric("Total Spent", f"${total_spent:,.2f}")
-                    st.metric("Remaining", f"${remaining:,.2f}")
-                    
-                    # Budget categories chart
-                    if len(current_month_data) > 0:
-                        categories = [item.get('category', 'Unknown') for item in current_month_data]
-                        allocated = [float(item.get('allocated_amount', 0)) for item in current_month_data]
-                        
-                        chart_data = pd.DataFrame({
-                            'Category': categories,
-                            'Allocated': allocated
-                        })
-                        st.bar_chart(chart_data.set_index('Category'))
-                else:
-                    st.info(f"No budget allocations found for {current_month}")
+            # One precomputed rollup item instead of summing every budget row
+            rollup = get_budget_rollup(family_id, current_month)
+            categories = rollup_categories(rollup) if rollup else []
+            
+            if categories:
+                total_allocated = rollup.get('total_allocated', 0)
+                total_spent = rollup.get('total_spent', 0)
+                remaining = total_allocated - total_spent
+                
+                st.metric("Total Allocated", f"${total_allocated:,.2f}")
+                st.metric("Total Spent", f"${total_spent:,.2f}")
+                st.metric("Remaining", f"${remaining:,.2f}")
+                
+                # Budget categories chart
+                chart_data = pd.DataFrame({
+                    'Category': [category['category'] for category in categories],
+                    'Allocated': [category.get('allocated_amount', 0) for category in categories]
+                })
+                st.bar_chart(chart_data.set_index('Category'))
             else:
-                st.info("No budget data available. Add some budget allocations to see reports.")
+                st.info(f"No budget allocations found for {current_month}. Add some budget allocations to see reports.")
         
         with col2:
             st.markdown("#### Asset Summary")
-            asset_data = get_family_data(family_id, "FamilyAssets")
             
-            if asset_data:
-                total_assets = sum(float(item.get('current_value', 0)) for item in asset_data)
+            # Totals, type and liquidity breakdowns in a single pass over the stream
+            total_assets = 0.0
+            asset_types = {}
+            liquidity_levels = {}
+            asset_fields = ('current_value', 'asset_type', 'liquidity')
+            for asset in iter_family_data(family_id, "FamilyAssets", attributes=asset_fields):
+                value = float(asset.get('current_value', 0))
+                total_assets += value
+                asset_type = asset.get('asset_type', 'Unknown')
+                asset_types[asset_type] = asset_types.get(asset_type, 0) + value
+                liquidity = asset.get('liquidity', 'Unknown')
+                liquidity_levels[liquidity] = liquidity_levels.get(liquidity, 0) + value
+            
+            if asset_types:
                 st.metric("Total Assets", f"${total_assets:,.2f}")
                 
                 # Asset breakdown by type
-                asset_types = {}
-                for asset in asset_data:
-                    asset_type = asset.get('asset_type', 'Unknown')
-                    value = float(asset.get('current_value', 0))
-                    asset_types[asset_type] = asset_types.get(asset_type, 0) + value
-                
-                if asset_types:
-                    asset_df = pd.DataFrame(list(asset_types.items()), columns=['Type', 'Value'])
-                    st.bar_chart(asset_df.set_index('Type'))
+                asset_df = pd.DataFrame(list(asset_types.items()), columns=['Type', 'Value'])
+                st.bar_chart(asset_df.set_index('Type'))
                 
                 # Liquidity breakdown
                 st.markdown("##### Liquidity Levels")
-                liquidity_levels = {}
-                for asset in asset_data:
-                    liquidity = asset.get('liquidity', 'Unknown')
-                    value = float(asset.get('current_value', 0))
-                    liquidity_levels[liquidity] = liquidity_levels.get(liquidity, 0) + value
-                
                 for level, value in liquidity_levels.items():
                     st.write(f"**{level}:** ${value:,.2f}")
             else:
@@ -858,38 +980,38 @@ What would you like to discuss today?"""
         
         # Goals Progress
         st.markdown("#### Financial Goals Progress")
-        goals_data = get_family_data(family_id, "FinancialGoals")
-        
-        if goals_data:
-            for goal in goals_data:
-                goal_name = goal.get('goal_name', 'Unknown Goal')
-                target = float(goal.get('target_amount', 0))
-                current = float(goal.get('current_amount', 0))
-                progress = (current / target * 100) if target > 0 else 0
-                
-                col1, col2, col3 = st.columns([3, 1, 1])
-                with col1:
-                    st.write(f"**{goal_name}**")
-                    st.progress(progress / 100)
-                with col2:
-                    st.metric("Progress", f"{progress:.1f}%")
-                with col3:
-                    st.metric("Remaining", f"${target - current:,.0f}")
-        else:
+        has_goals = False
+        
+        goal_fields = ('goal_name', 'target_amount', 'current_amount')
+        for goal in iter_family_data(family_id, "FinancialGoals", attributes=goal_fields):
+            has_goals = True
+            goal_name = goal.get('goal_name', 'Unknown Goal')
+            target = float(goal.get('target_amount', 0))
+            current = float(goal.get('current_amount', 0))
+            progress = (current / target * 100) if target > 0 else 0
+            
+            col1, col2, col3 = st.columns([3, 1, 1])
+            with col1:
+                st.write(f"**{goal_name}**")
+                st.progress(progress / 100)
+            with col2:
+                st.metric("Progress", f"{progress:.1f}%")
+            with col3:
+                st.metric("Remaining", f"${target - current:,.0f}")
+        
+        if not has_goals:
             st.info("No financial goals set. Add some goals to track your progress.")
         
         st.markdown("---")
         
         # Recent Transactions
         st.markdown("#### Recent Transactions")
-        transaction_data = get_family_data(family_id, "ExpenseTransactions")
+        # Newest first straight from the sort key: reads 10 items whatever the history size
+        sorted_transactions = get_recent_transactions(
+            family_id, 10, attributes=('description', 'amount', 'category', 'transaction_date')
+        )
         
-        if transaction_data:
-            # Sort by date (most recent first)
-            sorted_transactions = sorted(transaction_data, 
-                                       key=lambda x: x.get('transaction_date', ''), 
-                                       reverse=True)[:10]  # Show last 10
-            
+        if sorted_transactions:
             for transaction in sorted_transactions:
                 col1, col2, col3, col4 = st.columns([2, 1, 1, 2])
                 with col1:
@@ -903,7 +1025,7 @@ What would you like to discuss today?"""
         else:
             st.info("No transaction data available. Add some expense transactions to see recent activity.")
     
-    with tab5:
+    with tab5, section("Settings"):
         st.subheader("Account Settings")
         
         col1, col2 = st.columns(2)
@@ -943,18 +1065,14 @@ What would you like to discuss today?"""
                     st.session_state.family_data['risk_tolerance'] = new_risk
                     
                     try:
-                        dynamodb = init_dynamodb()
-                        table = dynamodb.Table('FamilyProfiles')
-                        table.update_item(
-                            Key={'family_id': st.session_state.family_id},
-                            UpdateExpression='SET total_monthly_income = :income, family_size = :size, risk_tolerance = :risk, updated_at = :updated',
-                            ExpressionAttributeValues={
-                                ':income': Decimal(str(new_income)),
-                                ':size': new_family_size,
-                                ':risk': new_risk,
-                                ':updated': datetime.utcnow().isoformat() + "Z"
-                            }
-                        )
+                        storage = init_storage()
+                        storage.update('FamilyProfiles', {'family_id': st.session_state.family_id}, set_values={
+                            'total_monthly_income': Decimal(str(new_income)),
+                            'family_size': new_family_size,
+                            'risk_tolerance': new_risk,
+                            'updated_at': datetime.utcnow().isoformat() + "Z"
+                        })
+                        record_write(storage, st.session_state.family_id, 'FamilyProfiles')
                         st.success("Profile updated successfully!")
                         time.sleep(1)
                         st.rerun()
@@ -963,6 +1081,97 @@ What would you like to discuss today?"""
         
         st.markdown("---")
         
+        # Shared data cache counters, for sizing FAMILY_CACHE_* settings
+        st.subheader("Data Cache")
+        with st.expander("Cache Statistics"):
+            cache_stats = family_cache.stats()
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            with col2:
+                st.metric("Hits", cache_stats['hits'])
+            with col3:
+                st.metric("Misses", cache_stats['misses'])
+            with col4:
+                st.metric("Entries", f"{cache_stats['entries']}/{cache_stats['max_entries']}")
+            st.caption(f"TTL {cache_stats['ttl_seconds']:.0f}s · "
+                       f"{cache_stats['evictions']} evictions · {cache_stats['invalidations']} invalidations")
+            # Financial answers reused until the family's data changes (answer_cache.py)
+            answers = answer_cache.stats()
+            st.caption(f"Answer cache: {answers['hits']} hits ({answers['hit_rate']:.0%}), {answers['misses']} misses, "
+                       f"{answers['stale']} recomputed after a data change · "
+                       f"{answers['entries']}/{answers['max_entries']} answers, TTL {answers['ttl_seconds']:.0f}s")
+        
+        with st.expander("AWS Connection Pools"):
+            # Shared clients from aws_clients.py; a client only shows up once it has been used
+            for service, usage in pool_stats().items():
+                st.write(f"**{service}**")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Requests", usage['requests'])
+                with col2:
+                    st.metric("In Flight (peak)", f"{usage['in_flight']} ({usage['peak_in_flight']})")
+                with col3:
+                    st.metric("Connections Opened", f"{usage['connections_opened']}/{usage['max_pool_connections']}")
+                with col4:
+                    st.metric("Idle Connections", usage['idle_connections'])
+        
+        with st.expander("DynamoDB Cost per Request"):
+            # Finished reruns and agent turns of this session from request_metrics.py, newest first;
+            # the same summaries are logged as JSON lines (REQUEST_METRICS_LOG)
+            requests = recent_requests(limit=30, session=st.session_state.metrics_session)
+            if requests:
+                st.dataframe(pd.DataFrame([{
+                    "Time": datetime.fromtimestamp(request['started_at']).strftime('%H:%M:%S'),
+                    "Request": f"Agent turn ({request['name']})" if request['kind'] == "agent_turn" else "Page render",
+                    "Calls": request['dynamodb']['calls'],
+                    "Read Units": request['dynamodb']['read_units'],
+                    "Write Units": request['dynamodb']['write_units'],
+                    "DynamoDB ms": request['dynamodb']['latency_ms'],
+                    # Finance tool reads answered from the turn's snapshot instead of DynamoDB or the cache
+                    "Reads Shared": request.get('family_reads', {}).get('reuses', 0),
+                    "LLM Calls": request['llm']['calls'],
+                    "LLM Calls Saved": request.get('llm_calls_saved', 0),
+                    "Input Tokens": request['llm']['input_tokens'],
+                    "Cache Read Tokens": request['llm']['cache_read_tokens'],
+                    "Cache Write Tokens": request['llm']['cache_write_tokens'],
+                    "First Token ms": request.get('first_token_ms'),
+                    "Total ms": request['duration_ms'],
+                } for request in requests]), hide_index=True, use_container_width=True)
+                
+                # Agent turns run inside a page render, so only renders are summed to avoid double counting
+                by_section = {}
+                for request in requests:
+                    if request['kind'] != "rerun":
+                        continue
+                    for name, usage in request['sections'].items():
+                        totals = by_section.setdefault(name, {"Tab / Tool": name, "Calls": 0, "Read Units": 0.0,
+                                                              "Write Units": 0.0, "DynamoDB ms": 0.0})
+                        totals["Calls"] += usage['calls']
+                        totals["Read Units"] += usage['read_units']
+                        totals["Write Units"] += usage['write_units']
+                        totals["DynamoDB ms"] += usage['latency_ms']
+                if by_section:
+                    st.write("**By tab and tool** (page renders above)")
+                    st.dataframe(pd.DataFrame(sorted(by_section.values(), key=lambda row: -row["Read Units"])).round(2),
+                                 hide_index=True, use_container_width=True)
+                st.caption("This page render is still running, so it shows up after the next one.")
+                
+                # Process-wide, all sessions
+                routing = router_stats()
+                st.caption(f"Query router: {sum(routing['turns'].values())} agent turns, "
+                           f"{routing['turns']['master']} through the Master agent; "
+                           f"{routing['llm_calls_saved']:.0f} LLM calls saved "
+                           f"({routing['llm_calls_saved_per_turn']:.2f} per turn).")
+                agents = master_pool.stats()
+                st.caption(f"Agent pool: {agents['live']} of {agents['max_agents']} session agents live, "
+                           f"{agents['in_use']} answering; {agents['created']} built, {agents['reused']} reused, "
+                           f"{agents['evicted_lru'] + agents['evicted_idle']} evicted.")
+            else:
+                st.info("No requests recorded yet in this session.")
+        
+        st.markdown("---")
+        
         # Data Export
         st.subheader("Data Export")
         with st.expander("Export Your Data"):
@@ -977,18 +1186,8 @@ What would you like to discuss today?"""
                 if export_type == "All Data":
                     all_data = {}
                     for table in ["BudgetAllocations", "ExpenseTransactions", "FamilyAssets", "FinancialGoals", "DecisionHistory"]:
-                        data = get_family_data(family_id, table)
-                        # Convert Decimals for JSON serialization
-                        converted_data = []
-                        for item in data:
-                            converted_item = {}
-                            for key, value in item.items():
-                                if isinstance(value, Decimal):
-                                    converted_item[key] = float(value)
-                                else:
-                                    converted_item[key] = value
-                            converted_data.append(converted_item)
-                        all_data[table] = converted_data
+                        # Items are read with float numbers, so they serialize as is
+                        all_data[table] = list(iter_family_data(family_id, table))
                     
                     st.download_button(
                         label="Download All Data (JSON)",
@@ -1006,21 +1205,9 @@ What would you like to discuss today?"""
                     }
                     
                     table_name = table_mapping[export_type]
-                    data = get_family_data(family_id, table_name)
+                    df = get_family_frame(family_id, table_name)
                     
-                    if data:
-                        # Convert Decimals to float for CSV
-                        display_data = []
-                        for item in data:
-                            display_item = {}
-                            for key, value in item.items():
-                                if isinstance(value, Decimal):
-                                    display_item[key] = float(value)
-                                else:
-                                    display_item[key] = value
-                            display_data.append(display_item)
-                        
-                        df = pd.DataFrame(display_data)
+                    if not df.empty:
                         csv = df.to_csv(index=False)
                         
                         st.download_button(
@@ -1044,56 +1231,19 @@ What would you like to discuss today?"""
             if delete_confirmation == "DELETE":
                 if st.button("Delete My Account", type="secondary"):
                     try:
-                        dynamodb = init_dynamodb()
+                        storage = init_storage()
+                        progress_bar = st.progress(0.0, text="Deleting your data...")
                         
-                        # Delete from all tables
-                        tables_to_clean = [
-                            "FamilyProfiles", "BudgetAllocations", "ExpenseTransactions", 
-                            "FamilyAssets", "FinancialGoals", "DecisionHistory"
-                        ]
+                        def show_progress(counts, finished):
+                            progress_bar.progress(
+                                finished / len(CHILD_TABLES),
+                                text=f"Deleted {sum(counts.values()):,} records "
+                                     f"({finished}/{len(CHILD_TABLES)} tables done)"
+                            )
                         
-                        for table_name in tables_to_clean:
-                            table = dynamodb.Table(table_name)
-                            
-                            # Get all items for this family
-                            try:
-                                if table_name == "FamilyProfiles":
-                                    table.delete_item(Key={'family_id': st.session_state.family_id})
-                                else:
-                                    response = table.query(
-                                        KeyConditionExpression='family_id = :fid',
-                                        ExpressionAttributeValues={':fid': st.session_state.family_id}
-                                    )
-                                    
-                                    # Delete each item
-                                    for item in response['Items']:
-                                        if table_name == "BudgetAllocations":
-                                            table.delete_item(Key={
-                                                'family_id': item['family_id'],
-                                                'category_month': item['category_month']
-                                            })
-                                        elif table_name == "ExpenseTransactions":
-                                            table.delete_item(Key={
-                                                'family_id': item['family_id'],
-                                                'transaction_date_id': item['transaction_date_id']
-                                            })
-                                        elif table_name == "FamilyAssets":
-                                            table.delete_item(Key={
-                                                'family_id': item['family_id'],
-                                                'asset_type_id': item['asset_type_id']
-                                            })
-                                        elif table_name == "FinancialGoals":
-                                            table.delete_item(Key={
-                                                'family_id': item['family_id'],
-                                                'goal_id': item['goal_id']
-                                            })
-                                        elif table_name == "DecisionHistory":
-                                            table.delete_item(Key={
-                                                'family_id': item['family_id'],
-                                                'decision_timestamp_id': item['decision_timestamp_id']
-                                            })
-                            except Exception as e:
-                                st.error(f"Error deleting from {table_name}: {str(e)}")
+                        # Pages through every table and batch-deletes them in parallel;
+                        # running it again after an interruption resumes the deletion
+                        delete_family_account(storage, st.session_state.family_id, progress=show_progress)
                         
                         st.success("Account deleted successfully. Redirecting...")
                         time.sleep(2)
@@ -1127,4 +1277,7 @@ if st.session_state.show_login:
     log_in()
 
 if st.session_state.show_success and st.session_state.family_id:
-    st.session_state.show_success = False
\ No newline at end of file
+    st.session_state.show_success = False
+
+# End of this script run's DynamoDB accounting (logged and shown under Settings)
+finish_request(st.session_state.rerun_metrics)
@@ -0,0 +1,119 @@
+"""
+Compact, token-capped encoding of tool results for the model.
+
+Whatever a tool returns is sent to the model on every later cycle of the
+turn, and the finance tools used to return indent=2 JSON of whole storage
+rows. They now return encode_tool_output(title, data, max_tokens):
+
+    Spending capacity: Food
+    {"requested_amount":250,"budget":{"allocated":500,"spent":200,"remaining":300},...}
+
+that is, a one-line title and minified JSON of `data`, where
+
+    - lists of records become tables: {"cols": [...], "rows": [[...], ...]}
+    - None, "" and empty lists/dicts are dropped
+    - numbers are rounded to cents and integral ones lose their ".0"
+
+The tools pick the fields they pass in. Above `max_tokens` (estimated like
+conversation.py, CHARS_PER_TOKEN characters a token) the longest table is
+cut to its first rows, with "more" holding the count and the column totals
+of the rows left out, until the result fits. Tables keep the tool's order,
+so the rows kept are the ones it ranked first. Past that the text itself
+is truncated.
+"""
+import json
+import os
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+from conversation import CHARS_PER_TOKEN
+
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv('TOOL_OUTPUT_MAX_TOKENS', '600'))
+TRUNCATED_NOTE = "…[truncated]"
+
+
+def _number(value):
+    value = round(float(value), 2)
+    return int(value) if value.is_integer() else value
+
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def table(records: Sequence[Dict[str, Any]], columns: Sequence[str] = None) -> Dict[str, Any]:
+    """Records as {"cols", "rows"}; columns default to every key, in order of first appearance."""
+    if columns is None:
+        columns = list(dict.fromkeys(name for record in records for name in record))
+    return {'cols': list(columns), 'rows': [[compact(record.get(name)) for name in columns] for record in records]}
+
+
+def compact(value):
+    """`value` with numbers rounded, empty values dropped and lists of records turned into tables."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return _number(value)
+    if isinstance(value, dict):
+        if 'cols' in value and 'rows' in value:
+            return value
+        return {key: compact(item) for key, item in value.items() if not _empty(item)}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, dict) for item in value):
+            return table(value)
+        return [compact(item) for item in value]
+    return str(value)
+
+
+def minify(data) -> str:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+# --- Capping ---
+
+def _tables(data, found=None) -> List[Dict[str, Any]]:
+    found = [] if found is None else found
+    if isinstance(data, dict):
+        if 'cols' in data and 'rows' in data:
+            found.append(data)
+        else:
+            for item in data.values():
+                _tables(item, found)
+    elif isinstance(data, list):
+        for item in data:
+            _tables(item, found)
+    return found
+
+
+def _cut(tbl: Dict[str, Any], keep: int):
+    """Keep the first `keep` rows; fold the rest into tbl["more"] (count and numeric column totals)."""
+    dropped, tbl['rows'] = tbl['rows'][keep:], tbl['rows'][:keep]
+    more = tbl.setdefault('more', {'rows': 0})
+    more['rows'] += len(dropped)
+    for index, name in enumerate(tbl['cols']):
+        values = [row[index] for row in dropped]
+        if values and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            more[name] = _number(more.get(name, 0) + sum(values))
+
+
+def encode_tool_output(title: str, data: Any, max_tokens: int = TOOL_OUTPUT_MAX_TOKENS) -> str:
+    """`title` and `data` compactly encoded (see the module docstring), within about `max_tokens`."""
+    data = compact(data)
+    text = f"{title}\n{minify(data)}"
+    while estimate_tokens(text) > max_tokens:
+        longest = max((tbl for tbl in _tables(data) if len(tbl['rows']) > 1),
+                      key=lambda tbl: len(minify(tbl['rows'])), default=None)
+        if longest is None:
+            break
+        # Drop about as many rows as the excess is long, from the end
+        excess = len(text) - max_tokens * CHARS_PER_TOKEN
+        row_chars = max(1, len(minify(longest['rows'])) // len(longest['rows']))
+        _cut(longest, max(1, len(longest['rows']) - -(-excess // row_chars)))
+        text = f"{title}\n{minify(data)}"
+    if estimate_tokens(text) > max_tokens:
+        text = text[:max_tokens * CHARS_PER_TOKEN - len(TRUNCATED_NOTE)] + TRUNCATED_NOTE
+    return text
@@ -0,0 +1,221 @@
+"""
+Bulk import of expense transactions from CSV / bank exports.
+
+    python transaction_import.py <family_id> <file.csv> [--workers 4] [--dry-run]
+
+Rows are validated column-wise with pandas, then written to
+ExpenseTransactions by parallel batch writers (on DynamoDB, 25 items per
+request, with unprocessed items resent by boto3). Transaction ids are derived from the row
+contents, so importing the same file twice overwrites instead of duplicating.
+Dates are read row by row, so one file may mix 2026-04-01, 04/01/2026
+(month first) and Apr 1 2026; rows whose date can't be read are rejected.
+New transactions are added to their budget rows' spent/remaining with one
+ADD per category and month, and the touched months' rollups are rebuilt.
+"""
+import argparse
+import contextvars
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Any
+
+import pandas as pd
+
+from budget_rollups import add_imported_spend, rebuild_family_rollups
+from family_cache import record_write
+from storage import StorageBackend, get_storage
+
+EXPENSE_CATEGORIES = [
+    "Housing", "Food", "Transportation", "Healthcare",
+    "Education", "Entertainment", "Utilities", "Insurance", "Other"
+]
+FAMILY_MEMBERS = ["Parent1", "Parent2", "Child1", "Child2", "Other"]
+NECESSITY_LEVELS = ["Essential", "Important", "Optional"]
+
+# Header spellings seen in bank exports -> ExpenseTransactions attribute
+COLUMN_ALIASES = {
+    'date': 'transaction_date',
+    'transaction date': 'transaction_date',
+    'transaction_date': 'transaction_date',
+    'posting date': 'transaction_date',
+    'posted date': 'transaction_date',
+    'amount': 'amount',
+    'debit': 'amount',
+    'withdrawal': 'amount',
+    'withdrawals': 'amount',
+    'description': 'description',
+    'details': 'description',
+    'memo': 'description',
+    'narrative': 'description',
+    'payee': 'description',
+    'category': 'category',
+    'subcategory': 'subcategory',
+    'family_member': 'family_member',
+    'family member': 'family_member',
+    'member': 'family_member',
+    'necessity_level': 'necessity_level',
+    'necessity level': 'necessity_level',
+    'necessity': 'necessity_level',
+}
+REQUIRED_COLUMNS = ['transaction_date', 'amount', 'description']
+
+BATCH_SIZE = 25
+
+
+@dataclass
+class ImportResult:
+    rows_read: int
+    written: int
+    rejected: pd.DataFrame
+    seconds: float
+
+    @property
+    def items_per_second(self) -> float:
+        return self.written / self.seconds if self.seconds else 0.0
+
+
+def read_transactions_file(source) -> pd.DataFrame:
+    """Read a CSV path or file-like object and map bank-export headers to ours."""
+    df = pd.read_csv(source, dtype=str, skipinitialspace=True)
+    renamed = {}
+    for column in df.columns:
+        target = COLUMN_ALIASES.get(column.strip().lower())
+        # First matching column wins, e.g. "Amount" over a later "Debit"
+        if target and target not in renamed.values():
+            renamed[column] = target
+    return df[list(renamed)].rename(columns=renamed)
+
+
+def validate_transactions(df: pd.DataFrame):
+    """
+    Clean and validate transaction rows without looping over them.
+
+    Returns:
+        (valid, rejected): DataFrames; rejected carries a `reason` column
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    df = df.copy()
+    # Parsed row by row: exports mix ISO and US dates (2026-04-01, 04/01/2026); 04/01 is month first
+    df['transaction_date'] = pd.to_datetime(
+        df['transaction_date'], format='mixed', errors='coerce'
+    ).dt.strftime('%Y-%m-%d')
+    amounts = df['amount'].astype(str).str.replace(r'[,$\s]', '', regex=True)
+    # Bank exports list debits as negatives; expenses are stored as positive amounts
+    df['amount'] = pd.to_numeric(amounts, errors='coerce').abs().round(2)
+    df['description'] = df['description'].fillna('').astype(str).str.strip()
+
+    defaults = {
+        'category': ('Other', EXPENSE_CATEGORIES),
+        'family_member': ('Other', FAMILY_MEMBERS),
+        'necessity_level': ('Important', NECESSITY_LEVELS),
+    }
+    for column, (default, allowed) in defaults.items():
+        if column not in df.columns:
+            df[column] = default
+        df[column] = df[column].fillna(default).astype(str).str.strip()
+        df.loc[~df[column].isin(allowed), column] = default
+    if 'subcategory' not in df.columns:
+        df['subcategory'] = 'General'
+    df['subcategory'] = df['subcategory'].fillna('').astype(str).str.strip().replace('', 'General')
+
+    reasons = pd.Series('', index=df.index)
+    reasons[df['transaction_date'].isna()] = 'invalid date'
+    reasons[(reasons == '') & (df['amount'].isna() | (df['amount'] <= 0))] = 'invalid amount'
+    reasons[(reasons == '') & (df['description'] == '')] = 'missing description'
+
+    rejected = df[reasons != ''].assign(reason=reasons[reasons != ''])
+    return df[reasons == ''], rejected
+
+
+def build_transaction_items(family_id: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Turn validated rows into ExpenseTransactions items with content-derived ids."""
+    columns = ['transaction_date', 'amount', 'category', 'subcategory',
+               'description', 'family_member', 'necessity_level']
+    if df.empty:
+        return []
+    df = df[columns].copy()
+    df['amount'] = df['amount'].map(lambda amount: f"{amount:.2f}")
+    fingerprint = df.astype(str).agg('|'.join, axis=1)
+    # Identical rows (two coffees on the same day) stay distinct via their occurrence number
+    occurrence = fingerprint.groupby(fingerprint).cumcount().astype(str)
+    digests = (family_id + '|' + fingerprint + '|' + occurrence).map(
+        lambda text: hashlib.sha1(text.encode()).hexdigest()[:10].upper()
+    )
+
+    items = []
+    for row, digest in zip(df.to_dict('records'), digests):
+        items.append({
+            "family_id": family_id,
+            "transaction_date_id": f"{row['transaction_date']}#TXN{digest}",
+            "amount": Decimal(row['amount']),
+            "category": row['category'],
+            "subcategory": row['subcategory'],
+            "description": row['description'],
+            "family_member": row['family_member'],
+            "necessity_level": row['necessity_level'],
+            "transaction_date": row['transaction_date']
+        })
+    return items
+
+
+def write_transactions(storage: StorageBackend, items: List[Dict[str, Any]], workers: int = 4) -> int:
+    """Write items with `workers` parallel batch writers; returns the number written."""
+    if not items:
+        return 0
+    chunk_size = max(BATCH_SIZE, -(-len(items) // workers))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="txn-import") as pool:
+        # In the caller's context, so request_metrics counts the writes for the rerun that started them
+        futures = [pool.submit(contextvars.copy_context().run, storage.batch_put, 'ExpenseTransactions', chunk)
+                   for chunk in chunks]
+        return sum(future.result() for future in futures)
+
+
+def import_transactions(storage: StorageBackend, family_id: str, source, workers: int = 4, dry_run: bool = False) -> ImportResult:
+    """Read, validate and bulk-write a transactions file for one family."""
+    start = time.perf_counter()
+    df = read_transactions_file(source)
+    valid, rejected = validate_transactions(df)
+    items = build_transaction_items(family_id, valid)
+    written = 0
+    if not dry_run:
+        months = {item['transaction_date'][:7] for item in items}
+        # Re-imported rows overwrite instead of adding up, so only new ones count towards budget spend
+        existing = {
+            row['transaction_date_id']
+            for year_month in months
+            for row in storage.query('ExpenseTransactions', family_id, begins_with=year_month,
+                                     attributes=('transaction_date_id',))
+        }
+        written = write_transactions(storage, items, workers=workers)
+        add_imported_spend(storage, (item for item in items if item['transaction_date_id'] not in existing))
+        rebuild_family_rollups(storage, family_id, months=months)
+        record_write(storage, family_id, 'ExpenseTransactions', 'BudgetAllocations')
+    return ImportResult(
+        rows_read=len(df),
+        written=written,
+        rejected=rejected,
+        seconds=time.perf_counter() - start
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import expense transactions for a family")
+    parser.add_argument('family_id')
+    parser.add_argument('csv_file')
+    parser.add_argument('--workers', type=int, default=4, help="Parallel batch writers")
+    parser.add_argument('--dry-run', action='store_true', help="Validate without writing")
+    args = parser.parse_args()
+
+    result = import_transactions(get_storage(), args.family_id, args.csv_file,
+                                 workers=args.workers, dry_run=args.dry_run)
+    print(f"Read {result.rows_read} rows, wrote {result.written} transactions "
+          f"in {result.seconds:.1f}s ({result.items_per_second:,.0f} items/s)")
+    if len(result.rejected):
+        print(f"Rejected {len(result.rejected)} rows:")
+        print(result.rejected['reason'].value_counts().to_string())